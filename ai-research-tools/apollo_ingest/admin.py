@@ -1,3 +1,60 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import (
+    Company,
+    CompanySearchSnapshot,
+    CreditLedger,
+    EnrichedPerson,
+    ExportJob,
+    OrganizationEnrichment,
+)
+
+
+@admin.register(EnrichedPerson)
+class EnrichedPersonAdmin(admin.ModelAdmin):
+    list_display = ("apollo_id", "fetched_at")
+    search_fields = ("apollo_id",)
+
+
+@admin.register(OrganizationEnrichment)
+class OrganizationEnrichmentAdmin(admin.ModelAdmin):
+    list_display = ("domain", "apollo_id", "fetched_at")
+    search_fields = ("domain", "apollo_id")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "pages_done",
+        "total_pages",
+        "companies_done",
+        "credits_spent",
+        "updated_at",
+    )
+    list_filter = ("status",)
+
+
+@admin.register(CreditLedger)
+class CreditLedgerAdmin(admin.ModelAdmin):
+    list_display = ("day", "credits", "updated_at")
+
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "domain",
+        "country",
+        "industry",
+        "estimated_num_employees",
+        "last_seen_at",
+    )
+    list_filter = ("country", "funding_stage")
+    search_fields = ("name", "domain", "apollo_id")
+
+
+@admin.register(CompanySearchSnapshot)
+class CompanySearchSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("key", "fetched_at")
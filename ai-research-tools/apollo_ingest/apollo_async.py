@@ -0,0 +1,374 @@
+"""
+asyncio versions of the apollo_service calls (httpx.AsyncClient).
+
+Same payloads, logging, rate limits and retries as apollo_service, but one event
+loop drives every request: concurrency costs a coroutine, not a thread. Used by
+the async views (served under ASGI, config/asgi.py).
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import weakref
+from typing import Optional
+
+import httpx
+
+from config.instrumentation import current_call, traced
+
+from .apollo_service import (
+    APOLLO_COMPANY_SEARCH_URL,
+    APOLLO_ORG_ENRICH_URL,
+    APOLLO_ORG_GET_URL,
+    APOLLO_PEOPLE_BULK_ENRICH_URL,
+    APOLLO_PEOPLE_SEARCH_URL,
+    APOLLO_TAGS_SEARCH_URL,
+    BULK_MATCH_BATCH_SIZE,
+    BULK_MATCH_MAX_IN_FLIGHT,
+    DEFAULT_TIMEOUT,
+    MAX_RETRIES,
+    _get_headers,
+    _log_apollo_request,
+    _log_apollo_response,
+)
+from .rate_limit import (
+    RETRY_STATUS_CODES,
+    backoff_delay,
+    get_bucket,
+    limiter_key_for_url,
+    parse_retry_after,
+)
+
+# Open connections per event loop (all Apollo hosts). Override via APOLLO_ASYNC_MAX_CONNECTIONS.
+ASYNC_MAX_CONNECTIONS = max(1, int(os.getenv("APOLLO_ASYNC_MAX_CONNECTIONS", "100")))
+# Those connections are split over this many clients: httpcore matches queued requests
+# to connections with a scan of the whole pool, so one big pool gets slow under load.
+ASYNC_CLIENT_SHARDS = max(
+    1, min(ASYNC_MAX_CONNECTIONS, int(os.getenv("APOLLO_ASYNC_CLIENT_SHARDS", "10")))
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _ClientShards:
+    """Small keep-alive clients handed out round-robin."""
+
+    def __init__(self):
+        per_shard = -(-ASYNC_MAX_CONNECTIONS // ASYNC_CLIENT_SHARDS)
+        limits = httpx.Limits(
+            max_connections=per_shard, max_keepalive_connections=per_shard
+        )
+        self.clients = [
+            httpx.AsyncClient(limits=limits, timeout=DEFAULT_TIMEOUT)
+            for _ in range(ASYNC_CLIENT_SHARDS)
+        ]
+        self._next = itertools.cycle(self.clients)
+
+    def next_client(self) -> httpx.AsyncClient:
+        return next(self._next)
+
+
+# One set per event loop: an AsyncClient's connections belong to the loop that opened them.
+_shards: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ClientShards]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Keep-alive client for the running event loop (round-robin over its shards)."""
+    loop = asyncio.get_running_loop()
+    shards = _shards.get(loop)
+    if shards is None:
+        shards = _ClientShards()
+        _shards[loop] = shards
+    return shards.next_client()
+
+
+async def close_async_client() -> None:
+    """Close the running loop's clients (e.g. before a script's asyncio.run() returns)."""
+    shards = _shards.pop(asyncio.get_running_loop(), None)
+    if shards is not None:
+        for client in shards.clients:
+            await client.aclose()
+
+
+def _note_response(r: httpx.Response, attempt: int) -> None:
+    """Fill in the traced call's HTTP fields (config.instrumentation)."""
+    call = current_call()
+    if call is not None:
+        call.method = r.request.method
+        call.note_response(
+            r.status_code, attempt, len(r.request.content or b""), len(r.content)
+        )
+
+
+# Transport errors raised before the request was sent (safe to resend any call).
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _not_processed(e: BaseException) -> bool:
+    """Async apollo_service._not_processed: connect errors and a final 429."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429
+    return isinstance(e, _CONNECT_ERRORS)
+
+
+async def _request_with_retry(
+    method: str,
+    url: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    idempotent: bool = True,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Async apollo_service._request_with_retry: same bucket, backoff and 429 handling,
+    and the same idempotent=False rule (retry connect errors and 429 only).
+    """
+    bucket = get_bucket(limiter_key_for_url(url))
+    call = current_call()
+    for attempt in range(MAX_RETRIES + 1):
+        if call is not None:
+            call.retries = attempt
+        wait = bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            r = await get_async_client().request(method, url, timeout=timeout, **kwargs)
+        except httpx.TransportError as e:
+            if attempt >= MAX_RETRIES or not (
+                idempotent or isinstance(e, _CONNECT_ERRORS)
+            ):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                "Apollo %s %s failed (%s); retry %s/%s in %.1fs",
+                method,
+                url,
+                e,
+                attempt + 1,
+                MAX_RETRIES,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            continue
+        if (
+            r.status_code not in RETRY_STATUS_CODES
+            or attempt >= MAX_RETRIES
+            or not (idempotent or r.status_code == 429)
+        ):
+            _note_response(r, attempt)
+            return r
+        retry_after = parse_retry_after(r.headers.get("Retry-After"))
+        delay = backoff_delay(attempt, retry_after)
+        logger.warning(
+            "Apollo %s %s returned %s; retry %s/%s in %.1fs",
+            method,
+            url,
+            r.status_code,
+            attempt + 1,
+            MAX_RETRIES,
+            delay,
+        )
+        if r.status_code == 429 and bucket.rate > 0:
+            # Every coroutine (and thread) on this endpoint waits, not just this one.
+            bucket.pause(delay)
+        else:
+            await asyncio.sleep(delay)
+    return r
+
+
+@traced(
+    "apollo",
+    "mixed_companies/search",
+    items=lambda data: len(data.get("organizations") or data.get("accounts") or []),
+    credits=1,
+)
+async def search_companies(payload: dict) -> dict:
+    """Async apollo_service.search_companies."""
+    headers = _get_headers()
+    _log_apollo_request(APOLLO_COMPANY_SEARCH_URL, headers, req_body=payload)
+    r = await _request_with_retry(
+        "POST", APOLLO_COMPANY_SEARCH_URL, json=payload, headers=headers
+    )
+    if r.status_code == 422:
+        try:
+            err_body = r.json()
+        except Exception:
+            err_body = r.text
+        raise RuntimeError(
+            "Apollo company search 422 (invalid payload): %s" % (err_body,)
+        )
+    r.raise_for_status()
+    data = r.json()
+    _log_apollo_response(APOLLO_COMPANY_SEARCH_URL, data)
+    return data
+
+
+@traced(
+    "apollo",
+    "mixed_people/api_search",
+    items=lambda data: len(data.get("people") or []),
+    credits=1,
+)
+async def search_people(payload: dict) -> dict:
+    """Async apollo_service.search_people."""
+    headers = _get_headers()
+    _log_apollo_request(APOLLO_PEOPLE_SEARCH_URL, headers, req_body=payload)
+    r = await _request_with_retry(
+        "POST", APOLLO_PEOPLE_SEARCH_URL, json=payload, headers=headers
+    )
+    r.raise_for_status()
+    data = r.json()
+    _log_apollo_response(APOLLO_PEOPLE_SEARCH_URL, data)
+    return data
+
+
+@traced("apollo", "tags/search", items=lambda data: len(data.get("tags") or []))
+async def search_tags(q_tag_fuzzy_name: str) -> dict:
+    """Async apollo_service.search_tags."""
+    headers = _get_headers()
+    params = {"q_tag_fuzzy_name": (q_tag_fuzzy_name or "").strip() or ""}
+    _log_apollo_request(
+        APOLLO_TAGS_SEARCH_URL, headers, query_params=params, req_body={}
+    )
+    r = await _request_with_retry(
+        "POST",
+        APOLLO_TAGS_SEARCH_URL,
+        json={},
+        params=params,
+        headers=headers,
+        timeout=30,
+    )
+    r.raise_for_status()
+    data = r.json()
+    _log_apollo_response(APOLLO_TAGS_SEARCH_URL, data)
+    return data
+
+
+@traced("apollo", "organizations/enrich", items=lambda org: 1 if org else 0, credits=1)
+async def enrich_organization(domain: str = None, name: str = None) -> dict:
+    """Async apollo_service.enrich_organization."""
+    headers = _get_headers()
+    params = {}
+    if domain and str(domain).strip():
+        params["domain"] = str(domain).strip()
+    if name and str(name).strip():
+        params["name"] = str(name).strip()
+    if not params:
+        return {}
+    _log_apollo_request(APOLLO_ORG_ENRICH_URL, headers, query_params=params)
+    r = await _request_with_retry(
+        "GET", APOLLO_ORG_ENRICH_URL, params=params, headers=headers, timeout=30
+    )
+    r.raise_for_status()
+    org = r.json().get("organization") or {}
+    _log_apollo_response(
+        APOLLO_ORG_ENRICH_URL,
+        {"organization": org, "organizations": [org] if org else []},
+    )
+    return org
+
+
+@traced("apollo", "organizations/get", items=lambda org: 1 if org else 0, credits=1)
+async def get_organization(organization_id: str) -> dict:
+    """Async apollo_service.get_organization."""
+    org_id = str(organization_id or "").strip()
+    if not org_id:
+        return {}
+    url = APOLLO_ORG_GET_URL.format(organization_id=org_id)
+    headers = _get_headers()
+    _log_apollo_request(url, headers)
+    r = await _request_with_retry("GET", url, params={}, headers=headers, timeout=30)
+    r.raise_for_status()
+    org = r.json().get("organization") or {}
+    _log_apollo_response(url, {"organization": org, "organizations": [org] if org else []})
+    return org
+
+
+@traced("apollo", "people/bulk_match", items=len, credits=len)
+async def _enrich_people_batch(
+    batch: list[str], reveal_personal_emails: bool, reveal_phone_number: bool
+) -> list[dict]:
+    """One bulk_match call for up to 10 person ids. Returns matches[]."""
+    payload = {"details": [{"id": pid} for pid in batch]}
+    params = {
+        "reveal_personal_emails": str(reveal_personal_emails).lower(),
+        "reveal_phone_number": str(reveal_phone_number).lower(),
+    }
+    headers = _get_headers()
+    _log_apollo_request(
+        APOLLO_PEOPLE_BULK_ENRICH_URL,
+        headers,
+        query_params=params,
+        req_body=payload,
+    )
+    r = await _request_with_retry(
+        "POST",
+        APOLLO_PEOPLE_BULK_ENRICH_URL,
+        json=payload,
+        params=params,
+        headers=headers,
+        timeout=30,
+        idempotent=False,
+    )
+    r.raise_for_status()
+    data = r.json()
+    _log_apollo_response(APOLLO_PEOPLE_BULK_ENRICH_URL, data)
+    return data.get("matches") or []
+
+
+async def enrich_people_bulk(
+    person_ids: list[str],
+    reveal_personal_emails: bool = False,
+    reveal_phone_number: bool = False,
+    errors: Optional[list] = None,
+) -> dict[str, dict]:
+    """
+    Async apollo_service.enrich_people_bulk: batches of 10, at most
+    BULK_MATCH_MAX_IN_FLIGHT at a time; failed batches are logged / added to `errors`
+    (with "billed", as there).
+    """
+    ids_clean = [str(pid).strip() for pid in person_ids or [] if str(pid).strip()]
+    if not ids_clean:
+        return {}
+    batches = [
+        ids_clean[i : i + BULK_MATCH_BATCH_SIZE]
+        for i in range(0, len(ids_clean), BULK_MATCH_BATCH_SIZE)
+    ]
+    in_flight = asyncio.Semaphore(BULK_MATCH_MAX_IN_FLIGHT)
+
+    async def run(batch):
+        async with in_flight:
+            return await _enrich_people_batch(
+                batch, reveal_personal_emails, reveal_phone_number
+            )
+
+    results = await asyncio.gather(
+        *(run(batch) for batch in batches), return_exceptions=True
+    )
+    result_by_id = {}
+    for index, matches in enumerate(results):
+        if isinstance(matches, BaseException):
+            logger.warning(
+                "bulk_match batch %s/%s failed (%s ids): %s",
+                index + 1,
+                len(batches),
+                len(batches[index]),
+                matches,
+            )
+            if errors is not None:
+                errors.append(
+                    {
+                        "batch": index,
+                        "ids": batches[index],
+                        "error": str(matches),
+                        "billed": not _not_processed(matches),
+                    }
+                )
+            continue
+        for match in matches:
+            pid = (match or {}).get("id")
+            if pid is not None:
+                result_by_id[str(pid)] = match
+    return result_by_id
@@ -0,0 +1,563 @@
+"""
+Caches for Apollo results, so repeat searches and exports don't pay credits twice.
+
+- Enriched people (people/bulk_match) are stored in the database, keyed by Apollo person id.
+- Enriched organizations (technologies) use two levels: an in-process LRU with TTL,
+  then a database table indexed by normalized domain and Apollo org id (written in
+  batches, see flush_organizations).
+- Company search pages are kept briefly (minutes) in an in-process LRU, and in a
+  shared Django cache when one is configured, keyed by the canonical payload; for
+  longer (hours) as snapshots in the company warehouse (company_warehouse).
+- Batched people search pages (export) are kept the same way for minutes, so an
+  export started after its plan (/api/export/plan/) reuses the plan's search.
+
+All cache reads/writes fail soft: if the database is unavailable (e.g. a
+serverless deploy without a DB), callers just fall through to Apollo.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EnrichedPerson, OrganizationEnrichment
+from .payload_keys import payload_key
+
+logger = logging.getLogger(__name__)
+
+# How long an enriched person stays valid. 0 disables the cache.
+ENRICH_CACHE_TTL = timedelta(
+    days=float(os.getenv("APOLLO_ENRICH_CACHE_TTL_DAYS", "30"))
+)
+# Organization enrich results: database TTL, plus in-process LRU size/TTL.
+ORG_CACHE_TTL = timedelta(days=float(os.getenv("APOLLO_ORG_CACHE_TTL_DAYS", "7")))
+ORG_MEMORY_CACHE_SIZE = int(os.getenv("APOLLO_ORG_MEMORY_CACHE_SIZE", "2048"))
+ORG_MEMORY_CACHE_TTL = float(os.getenv("APOLLO_ORG_MEMORY_CACHE_TTL_SECONDS", "3600"))
+# Organization database writes are buffered and upserted this many at a time (and
+# after every export page, flush_organizations), not one statement per worker.
+ORG_CACHE_WRITE_BATCH = int(os.getenv("APOLLO_ORG_CACHE_WRITE_BATCH", "100"))
+# Company search responses: TTL in seconds (0 disables) and in-process LRU size. The
+# shared level is this Django cache alias, used only if it exists in settings.CACHES.
+COMPANY_SEARCH_CACHE_TTL = float(
+    os.getenv("APOLLO_COMPANY_SEARCH_CACHE_TTL_SECONDS", "300")
+)
+COMPANY_SEARCH_CACHE_SIZE = int(os.getenv("APOLLO_COMPANY_SEARCH_CACHE_SIZE", "256"))
+COMPANY_SEARCH_SHARED_CACHE = os.getenv("APOLLO_COMPANY_SEARCH_SHARED_CACHE", "apollo")
+# Batched people search responses: TTL in seconds (0 disables) and in-process LRU
+# size; shared level as for company search.
+PEOPLE_SEARCH_CACHE_TTL = float(
+    os.getenv("APOLLO_PEOPLE_SEARCH_CACHE_TTL_SECONDS", "900")
+)
+PEOPLE_SEARCH_CACHE_SIZE = int(os.getenv("APOLLO_PEOPLE_SEARCH_CACHE_SIZE", "256"))
+# Keep IN (...) lists under SQLite's bound-parameter limit.
+_DB_CHUNK = 500
+
+
+def _chunks(items: list, size: int = _DB_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+_people_stats_lock = threading.Lock()
+_people_stats = {"hits": 0, "misses": 0}
+
+
+def get_cached_people(person_ids: list) -> dict[str, dict]:
+    """Return person_id -> enriched match for ids cached within ENRICH_CACHE_TTL."""
+    ids = list({str(pid) for pid in person_ids if pid})
+    if not ids or ENRICH_CACHE_TTL.total_seconds() <= 0:
+        return {}
+    cutoff = timezone.now() - ENRICH_CACHE_TTL
+    found = {}
+    try:
+        for chunk in _chunks(ids):
+            rows = EnrichedPerson.objects.filter(
+                apollo_id__in=chunk, fetched_at__gte=cutoff
+            ).values_list("apollo_id", "data")
+            found.update(rows)
+    except DatabaseError as e:
+        logger.warning("Enrichment cache read failed: %s", e)
+        return {}
+    with _people_stats_lock:
+        _people_stats["hits"] += len(found)
+        _people_stats["misses"] += len(ids) - len(found)
+    return found
+
+
+def count_cached_people(person_ids: list) -> int:
+    """
+    How many of person_ids get_cached_people would return, without counting the
+    lookup in the hit/miss stats (planning).
+    """
+    ids = list({str(pid) for pid in person_ids if pid})
+    if not ids or ENRICH_CACHE_TTL.total_seconds() <= 0:
+        return 0
+    cutoff = timezone.now() - ENRICH_CACHE_TTL
+    try:
+        return sum(
+            EnrichedPerson.objects.filter(
+                apollo_id__in=chunk, fetched_at__gte=cutoff
+            ).count()
+            for chunk in _chunks(ids)
+        )
+    except DatabaseError as e:
+        logger.warning("Enrichment cache read failed: %s", e)
+        return 0
+
+
+def people_cache_stats() -> dict:
+    """Hit/miss counters (per person id) for the enriched people cache."""
+    with _people_stats_lock:
+        stats = dict(_people_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def store_enriched_people(enriched_by_id: dict) -> None:
+    """Upsert bulk_match results (person_id -> match) into the cache."""
+    if not enriched_by_id or ENRICH_CACHE_TTL.total_seconds() <= 0:
+        return
+    now = timezone.now()
+    rows = [
+        EnrichedPerson(apollo_id=str(pid), data=match, fetched_at=now)
+        for pid, match in enriched_by_id.items()
+        if pid and match
+    ]
+    try:
+        for chunk in _chunks(rows):
+            EnrichedPerson.objects.bulk_create(
+                chunk,
+                update_conflicts=True,
+                unique_fields=["apollo_id"],
+                update_fields=["data", "fetched_at"],
+            )
+    except DatabaseError as e:
+        logger.warning("Enrichment cache write failed: %s", e)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time-to-live (seconds)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+            return None
+
+    def peek(self, key):
+        """get() without refreshing the entry's LRU position or dropping it."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                return item[1]
+            return None
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_org_memory = TTLCache(ORG_MEMORY_CACHE_SIZE, ORG_MEMORY_CACHE_TTL)
+_org_pending_lock = threading.Lock()
+_org_pending = {}
+_org_flush_lock = threading.Lock()
+_org_stats_lock = threading.Lock()
+_org_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+
+def _count_org(key: str) -> None:
+    with _org_stats_lock:
+        _org_stats[key] += 1
+
+
+def normalize_domain(domain: Optional[str]) -> str:
+    """'https://www.Example.com/about' -> 'example.com'."""
+    d = (domain or "").strip().lower()
+    if "://" in d:
+        d = d.split("://", 1)[1]
+    d = d.split("/", 1)[0].split("?", 1)[0].split(":", 1)[0]
+    if d.startswith("www."):
+        d = d[4:]
+    return d
+
+
+def _org_memory_keys(organization_id=None, domain=None) -> list[str]:
+    keys = []
+    if organization_id:
+        keys.append("id:%s" % str(organization_id).strip())
+    if domain:
+        keys.append("domain:%s" % domain)
+    return keys
+
+
+def get_cached_organization(organization_id=None, domain=None) -> Optional[dict]:
+    """Cached organization for an Apollo org id and/or domain, or None on a miss."""
+    domain = normalize_domain(domain)
+    keys = _org_memory_keys(organization_id, domain)
+    if not keys:
+        return None
+    for key in keys:
+        org = _org_memory.get(key)
+        if org is not None:
+            _count_org("memory_hits")
+            return org
+    if ORG_CACHE_TTL.total_seconds() > 0:
+        cutoff = timezone.now() - ORG_CACHE_TTL
+        try:
+            row = None
+            if organization_id:
+                row = (
+                    OrganizationEnrichment.objects.filter(
+                        apollo_id=str(organization_id).strip(), fetched_at__gte=cutoff
+                    )
+                    .only("data")
+                    .first()
+                )
+            if row is None and domain:
+                row = (
+                    OrganizationEnrichment.objects.filter(
+                        domain=domain, fetched_at__gte=cutoff
+                    )
+                    .only("data")
+                    .first()
+                )
+        except DatabaseError as e:
+            logger.warning("Organization cache read failed: %s", e)
+            row = None
+        if row is not None:
+            _count_org("db_hits")
+            for key in keys:
+                _org_memory.set(key, row.data)
+            return row.data
+    _count_org("misses")
+    return None
+
+
+def is_organization_cached(organization_id=None, domain=None) -> bool:
+    """
+    Whether get_cached_organization would hit, without its side effects: no hit/miss
+    counting, no LRU refresh and nothing loaded into the in-process level (planning).
+    """
+    domain = normalize_domain(domain)
+    keys = _org_memory_keys(organization_id, domain)
+    if not keys:
+        return False
+    if any(_org_memory.peek(key) is not None for key in keys):
+        return True
+    if ORG_CACHE_TTL.total_seconds() <= 0:
+        return False
+    match = Q()
+    if organization_id:
+        match |= Q(apollo_id=str(organization_id).strip())
+    if domain:
+        match |= Q(domain=domain)
+    try:
+        return OrganizationEnrichment.objects.filter(
+            match, fetched_at__gte=timezone.now() - ORG_CACHE_TTL
+        ).exists()
+    except DatabaseError as e:
+        logger.warning("Organization cache read failed: %s", e)
+        return False
+
+
+def store_organization(org: dict, domain: Optional[str] = None) -> None:
+    """
+    Cache an organization enrich result under its Apollo id and normalized domain.
+    The in-process level is set right away; the database row is buffered until
+    ORG_CACHE_WRITE_BATCH are pending or flush_organizations() runs.
+    """
+    if not org:
+        return
+    org_id = str(org.get("id") or "").strip() or None
+    norm_domain = normalize_domain(org.get("primary_domain") or domain)
+    request_domain = normalize_domain(domain)
+    for key in set(
+        _org_memory_keys(org_id, norm_domain) + _org_memory_keys(None, request_domain)
+    ):
+        _org_memory.set(key, org)
+    _count_org("stores")
+    if ORG_CACHE_TTL.total_seconds() <= 0 or not (org_id or norm_domain):
+        return
+    row = OrganizationEnrichment(
+        apollo_id=org_id, domain=norm_domain, data=org, fetched_at=timezone.now()
+    )
+    with _org_pending_lock:
+        _org_pending[_org_memory_keys(org_id, norm_domain)[0]] = row
+        full = len(_org_pending) >= ORG_CACHE_WRITE_BATCH
+    if full:
+        flush_organizations()
+
+
+def flush_organizations() -> None:
+    """
+    Write the buffered organizations: one bulk upsert per _DB_CHUNK rows with an
+    Apollo id; rows without one update the id-less row of their domain (domain is not
+    unique) or add one, each on its own so one failure doesn't drop the rest. One
+    flush at a time, so export workers never race each other for the SQLite write lock.
+    """
+    with _org_flush_lock:
+        with _org_pending_lock:
+            rows = list(_org_pending.values())
+            _org_pending.clear()
+        if not rows:
+            return
+        try:
+            for chunk in _chunks([row for row in rows if row.apollo_id]):
+                OrganizationEnrichment.objects.bulk_create(
+                    chunk,
+                    update_conflicts=True,
+                    unique_fields=["apollo_id"],
+                    update_fields=["domain", "data", "fetched_at"],
+                )
+        except DatabaseError as e:
+            logger.warning("Organization cache write failed: %s", e)
+        for row in rows:
+            if row.apollo_id:
+                continue
+            try:
+                existing = (
+                    OrganizationEnrichment.objects.filter(
+                        domain=row.domain, apollo_id__isnull=True
+                    )
+                    .only("pk")
+                    .first()
+                )
+                if existing is not None:
+                    row.pk = existing.pk
+                    row.save(update_fields=["data", "fetched_at"])
+                else:
+                    row.save()
+            except DatabaseError as e:
+                logger.warning(
+                    "Organization cache write failed for %s: %s", row.domain, e
+                )
+
+
+def org_cache_stats() -> dict:
+    """Hit/miss counters for the organization cache (memory, database, network)."""
+    with _org_stats_lock:
+        stats = dict(_org_stats)
+    lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+    stats["memory_entries"] = len(_org_memory)
+    stats["hit_rate"] = (
+        (stats["memory_hits"] + stats["db_hits"]) / lookups if lookups else 0.0
+    )
+    return stats
+
+
+_company_search_memory = TTLCache(COMPANY_SEARCH_CACHE_SIZE, COMPANY_SEARCH_CACHE_TTL)
+_search_stats_lock = threading.Lock()
+_search_stats = {"memory_hits": 0, "shared_hits": 0, "warehouse_hits": 0, "misses": 0}
+
+
+def _count_search(key: str) -> None:
+    with _search_stats_lock:
+        _search_stats[key] += 1
+
+
+def _shared_search_cache():
+    if COMPANY_SEARCH_SHARED_CACHE not in getattr(settings, "CACHES", {}):
+        return None
+    return caches[COMPANY_SEARCH_SHARED_CACHE]
+
+
+def get_cached_company_search(payload: dict) -> Optional[dict]:
+    """
+    Cached mixed_companies/search response for this payload (treat as read-only), or
+    None. After the in-process / shared levels, a snapshot in the company warehouse
+    (company_warehouse.WAREHOUSE_MAX_AGE) also counts.
+    """
+    from .company_warehouse import get_company_page
+
+    key = "company_search:%s" % payload_key(payload)
+    if COMPANY_SEARCH_CACHE_TTL > 0:
+        response = _company_search_memory.get(key)
+        if response is not None:
+            _count_search("memory_hits")
+            return response
+        shared = _shared_search_cache()
+        if shared is not None:
+            try:
+                response = shared.get(key)
+            except Exception as e:
+                logger.warning("Company search cache read failed: %s", e)
+                response = None
+            if response is not None:
+                _count_search("shared_hits")
+                _company_search_memory.set(key, response)
+                return response
+    response = get_company_page(payload)
+    if response is not None:
+        _count_search("warehouse_hits")
+        _company_search_memory.set(key, response)
+        return response
+    _count_search("misses")
+    return None
+
+
+def store_company_search(payload: dict, response: dict) -> None:
+    """
+    Cache a company search response for COMPANY_SEARCH_CACHE_TTL seconds, and keep
+    its companies and page snapshot in the company warehouse.
+    """
+    from .company_warehouse import store_company_page
+
+    if not response:
+        return
+    store_company_page(payload, response)
+    if COMPANY_SEARCH_CACHE_TTL <= 0:
+        return
+    key = "company_search:%s" % payload_key(payload)
+    _company_search_memory.set(key, response)
+    shared = _shared_search_cache()
+    if shared is not None:
+        try:
+            shared.set(key, response, timeout=COMPANY_SEARCH_CACHE_TTL)
+        except Exception as e:
+            logger.warning("Company search cache write failed: %s", e)
+
+
+_people_search_memory = TTLCache(PEOPLE_SEARCH_CACHE_SIZE, PEOPLE_SEARCH_CACHE_TTL)
+_people_search_stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0}
+
+
+def _count_people_search(key: str) -> None:
+    with _search_stats_lock:
+        _people_search_stats[key] += 1
+
+
+def get_cached_people_search(payload: dict) -> Optional[dict]:
+    """Cached mixed_people/api_search response for this payload (read-only), or None."""
+    if PEOPLE_SEARCH_CACHE_TTL <= 0:
+        return None
+    key = "people_search:%s" % payload_key(payload)
+    response = _people_search_memory.get(key)
+    if response is not None:
+        _count_people_search("memory_hits")
+        return response
+    shared = _shared_search_cache()
+    if shared is not None:
+        try:
+            response = shared.get(key)
+        except Exception as e:
+            logger.warning("People search cache read failed: %s", e)
+            response = None
+        if response is not None:
+            _count_people_search("shared_hits")
+            _people_search_memory.set(key, response)
+            return response
+    _count_people_search("misses")
+    return None
+
+
+def store_people_search(payload: dict, response: dict) -> None:
+    """Cache a people search response for PEOPLE_SEARCH_CACHE_TTL seconds."""
+    if not response or PEOPLE_SEARCH_CACHE_TTL <= 0:
+        return
+    key = "people_search:%s" % payload_key(payload)
+    _people_search_memory.set(key, response)
+    shared = _shared_search_cache()
+    if shared is not None:
+        try:
+            shared.set(key, response, timeout=PEOPLE_SEARCH_CACHE_TTL)
+        except Exception as e:
+            logger.warning("People search cache write failed: %s", e)
+
+
+def people_search_cache_stats() -> dict:
+    """Hit/miss counters for the batched people search cache."""
+    with _search_stats_lock:
+        stats = dict(_people_search_stats)
+    hits = stats["memory_hits"] + stats["shared_hits"]
+    lookups = hits + stats["misses"]
+    stats["memory_entries"] = len(_people_search_memory)
+    stats["hit_rate"] = hits / lookups if lookups else 0.0
+    return stats
+
+
+def company_search_cache_stats() -> dict:
+    """Hit/miss counters for the company search cache."""
+    with _search_stats_lock:
+        stats = dict(_search_stats)
+    hits = stats["memory_hits"] + stats["shared_hits"] + stats["warehouse_hits"]
+    lookups = hits + stats["misses"]
+    stats["memory_entries"] = len(_company_search_memory)
+    stats["hit_rate"] = hits / lookups if lookups else 0.0
+    return stats
+
+
+def cache_metrics() -> list:
+    """Collector for config.metrics: lookups by cache and result, plus memory entries."""
+    org = org_cache_stats()
+    search = company_search_cache_stats()
+    people = people_cache_stats()
+    people_search = people_search_cache_stats()
+    lookups = [
+        ({"cache": "organization", "result": "memory_hit"}, org["memory_hits"]),
+        ({"cache": "organization", "result": "db_hit"}, org["db_hits"]),
+        ({"cache": "organization", "result": "miss"}, org["misses"]),
+        ({"cache": "company_search", "result": "memory_hit"}, search["memory_hits"]),
+        ({"cache": "company_search", "result": "shared_hit"}, search["shared_hits"]),
+        (
+            {"cache": "company_search", "result": "warehouse_hit"},
+            search["warehouse_hits"],
+        ),
+        ({"cache": "company_search", "result": "miss"}, search["misses"]),
+        ({"cache": "enriched_people", "result": "db_hit"}, people["hits"]),
+        ({"cache": "enriched_people", "result": "miss"}, people["misses"]),
+        (
+            {"cache": "people_search", "result": "memory_hit"},
+            people_search["memory_hits"],
+        ),
+        (
+            {"cache": "people_search", "result": "shared_hit"},
+            people_search["shared_hits"],
+        ),
+        ({"cache": "people_search", "result": "miss"}, people_search["misses"]),
+    ]
+    return [
+        ("apollo_cache_lookups_total", "counter", "Apollo cache lookups by result.", lookups),
+        (
+            "apollo_cache_memory_entries",
+            "gauge",
+            "Entries in the in-process cache levels.",
+            [
+                ({"cache": "organization"}, org["memory_entries"]),
+                ({"cache": "company_search"}, search["memory_entries"]),
+                ({"cache": "people_search"}, people_search["memory_entries"]),
+            ],
+        ),
+    ]
@@ -0,0 +1,136 @@
+"""
+Shared HTTP client for Apollo API calls.
+
+One urllib3 connection pool (keep-alive) is shared by every thread, so export
+workers reuse TCP/TLS connections instead of opening a new one per request.
+Each thread gets its own requests.Session (sessions are not thread-safe), but
+all sessions mount the same HTTPAdapter, so they draw from the same pool.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Pool size per host. Default: every export worker (EXPORT_MAX_WORKERS) can have
+# all of its bulk_match batches (APOLLO_BULK_MATCH_MAX_IN_FLIGHT) in flight.
+# Override via APOLLO_POOL_MAXSIZE.
+POOL_MAXSIZE = max(
+    1,
+    int(
+        os.getenv("APOLLO_POOL_MAXSIZE")
+        or int(os.getenv("EXPORT_MAX_WORKERS", "8"))
+        * int(os.getenv("APOLLO_BULK_MATCH_MAX_IN_FLIGHT", "4"))
+    ),
+)
+# Number of per-host pools kept (api.apollo.io + app.apollo.io).
+POOL_CONNECTIONS = 4
+
+
+class PoolStats:
+    """Thread-safe counters for connection pool usage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.new_connections = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            if waited > self.max_wait_seconds:
+                self.max_wait_seconds = waited
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits = max(0, self.checkouts - self.new_connections)
+            return {
+                "pool_maxsize": POOL_MAXSIZE,
+                "checkouts": self.checkouts,
+                "hits": hits,
+                "new_connections": self.new_connections,
+                "hit_rate": (hits / self.checkouts) if self.checkouts else 0.0,
+                "wait_seconds_total": round(self.wait_seconds, 4),
+                "wait_seconds_max": round(self.max_wait_seconds, 4),
+            }
+
+
+_pool_stats = PoolStats()
+
+
+class _MeteredPoolMixin:
+    """Records checkout wait time and new connections on a urllib3 pool."""
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        _pool_stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def _new_conn(self):
+        _pool_stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _MeteredHTTPConnectionPool(_MeteredPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _MeteredHTTPSConnectionPool(_MeteredPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _MeteredHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report usage to _pool_stats."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _MeteredHTTPConnectionPool,
+            "https": _MeteredHTTPSConnectionPool,
+        }
+
+
+# pool_block=True: when all connections are busy, wait for one instead of
+# opening (and then discarding) an extra connection.
+_adapter = _MeteredHTTPAdapter(
+    pool_connections=POOL_CONNECTIONS,
+    pool_maxsize=POOL_MAXSIZE,
+    pool_block=True,
+    max_retries=0,
+)
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Return this thread's Session (shares the process-wide connection pool)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        _local.session = session
+    return session
+
+
+def pool_stats() -> dict:
+    """Connection pool metrics: checkouts, hits (reused), new connections, wait time."""
+    return _pool_stats.snapshot()
+
+
+def reset_pool_stats() -> None:
+    _pool_stats.reset()
@@ -1,23 +1,71 @@
+import itertools
 import json
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 
 import requests
+from urllib3.exceptions import ConnectTimeoutError
 
-APOLLO_COMPANY_SEARCH_URL = "https://api.apollo.io/api/v1/mixed_companies/search"
+from config.instrumentation import context_submit, current_call, traced
+
+from .apollo_client import get_session
+from .rate_limit import (
+    RETRY_STATUS_CODES,
+    backoff_delay,
+    get_bucket,
+    limiter_key_for_url,
+    parse_retry_after,
+)
+from .payload_keys import payload_key
+from .single_flight import get_flight
+
+_DEFAULT_API_BASE_URL = "https://api.apollo.io/api/v1"
+_DEFAULT_TAGS_BASE_URL = "https://app.apollo.io/api/v1"
+# Point the client at a stand-in server (e.g. scripts/mock_apollo_server.py):
+# APOLLO_API_BASE_URL=http://127.0.0.1:8765/api/v1. Tags follow it unless
+# APOLLO_TAGS_BASE_URL is set too.
+APOLLO_API_BASE_URL = os.getenv("APOLLO_API_BASE_URL", _DEFAULT_API_BASE_URL).rstrip("/")
+APOLLO_TAGS_BASE_URL = os.getenv(
+    "APOLLO_TAGS_BASE_URL",
+    _DEFAULT_TAGS_BASE_URL
+    if APOLLO_API_BASE_URL == _DEFAULT_API_BASE_URL
+    else APOLLO_API_BASE_URL,
+).rstrip("/")
+
+APOLLO_COMPANY_SEARCH_URL = APOLLO_API_BASE_URL + "/mixed_companies/search"
 # mixed_people/search is deprecated and can return 422; api_search is the supported endpoint.
-APOLLO_PEOPLE_SEARCH_URL = "https://api.apollo.io/api/v1/mixed_people/api_search"
-APOLLO_PEOPLE_BULK_ENRICH_URL = "https://api.apollo.io/api/v1/people/bulk_match"
-APOLLO_ORG_ENRICH_URL = "https://api.apollo.io/api/v1/organizations/enrich"
-APOLLO_ORG_GET_URL = "https://api.apollo.io/api/v1/organizations/{organization_id}"
+APOLLO_PEOPLE_SEARCH_URL = APOLLO_API_BASE_URL + "/mixed_people/api_search"
+APOLLO_PEOPLE_BULK_ENRICH_URL = APOLLO_API_BASE_URL + "/people/bulk_match"
+APOLLO_ORG_ENRICH_URL = APOLLO_API_BASE_URL + "/organizations/enrich"
+APOLLO_ORG_GET_URL = APOLLO_API_BASE_URL + "/organizations/{organization_id}"
 # Undocumented: used to fetch industry/tag IDs for filters (e.g. industry_tags).
-APOLLO_TAGS_SEARCH_URL = "https://app.apollo.io/api/v1/tags/search"
+APOLLO_TAGS_SEARCH_URL = APOLLO_TAGS_BASE_URL + "/tags/search"
 
 # Timeout in seconds (Apollo can be slow on large result sets). Override via APOLLO_REQUEST_TIMEOUT.
 DEFAULT_TIMEOUT = int(os.getenv("APOLLO_REQUEST_TIMEOUT", "120"))
-MAX_RETRIES = 2
+# Retries on timeouts, connection errors, 429 and 5xx (bulk_match: connect errors and
+# 429 only, see _request_with_retry). Override via APOLLO_MAX_RETRIES.
+MAX_RETRIES = max(0, int(os.getenv("APOLLO_MAX_RETRIES", "4")))
+# bulk_match accepts at most 10 people per call; batches are sent concurrently.
+BULK_MATCH_BATCH_SIZE = 10
+BULK_MATCH_MAX_IN_FLIGHT = max(
+    1, int(os.getenv("APOLLO_BULK_MATCH_MAX_IN_FLIGHT", "4"))
+)
+
+# Full request dumps (masked headers, params, JSON body) for every Apollo call. Debug only:
+# it costs a json.dumps per call. Otherwise requests log at DEBUG, responses as one line.
+APOLLO_LOG_PAYLOADS = os.getenv("APOLLO_LOG_PAYLOADS", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Response lines for high-volume endpoints are logged at INFO for 1 call in N (DEBUG for the rest).
+APOLLO_LOG_SAMPLE_EVERY = max(1, int(os.getenv("APOLLO_LOG_SAMPLE_EVERY", "20")))
+_SAMPLED_ENDPOINTS = ("api_search", "bulk_match", "organizations")
+_log_sample_counters: dict = {}
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +83,12 @@ def _log_apollo_request(
     query_params: Optional[dict] = None,
     req_body: Optional[dict] = None,
 ):
-    """Log Apollo API call: endpoint, headers (key masked), query params, body."""
+    """Log an Apollo call. Headers (key masked), params and body only with APOLLO_LOG_PAYLOADS."""
+    if not APOLLO_LOG_PAYLOADS:
+        logger.debug("Apollo request %s", endpoint)
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
     log_headers = dict(headers)
     if "X-Api-Key" in log_headers:
         log_headers["X-Api-Key"] = _mask_api_key(log_headers["X-Api-Key"])
@@ -49,52 +102,60 @@ def _log_apollo_request(
     if req_body is not None:
         lines.append("Request body: %s" % json.dumps(req_body, sort_keys=True, default=str))
     lines.append("--------------------------------")
-    msg = "\n".join(lines)
-    logger.info(msg)
-    print(msg)
+    logger.info("\n".join(lines))
+
+
+def _log_sampled(endpoint: str) -> bool:
+    """True for 1 in APOLLO_LOG_SAMPLE_EVERY calls to a high-volume endpoint (always for others)."""
+    family = next((f for f in _SAMPLED_ENDPOINTS if f in endpoint), None)
+    if family is None or APOLLO_LOG_PAYLOADS:
+        return True
+    counter = _log_sample_counters.setdefault(family, itertools.count())
+    return next(counter) % APOLLO_LOG_SAMPLE_EVERY == 0
 
 
 def _log_apollo_response(endpoint: str, data: dict, extra: Optional[dict] = None):
-    """Log Apollo API response counts: companies, people, tags, or bulk_match."""
-    lines = ["-------- Apollo API response --------"]
-    if "mixed_companies" in endpoint or "mixed_companies/search" in endpoint:
+    """
+    One summary line per Apollo response (companies, people, tags, bulk_match,
+    organization): INFO when sampled, DEBUG otherwise. Nothing is computed when the
+    level is off.
+    """
+    level = logging.INFO if _log_sampled(endpoint) else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    if "mixed_companies" in endpoint:
         orgs = data.get("organizations") or data.get("accounts") or []
         total = (data.get("pagination") or {}).get("total_entries") or len(orgs)
-        lines.append("Endpoint: mixed_companies/search")
-        lines.append("Companies in this page: %s" % len(orgs))
-        lines.append("Total entries (pagination): %s" % total)
+        fmt, args = "mixed_companies/search: %s companies on this page, %s total", (
+            len(orgs),
+            total,
+        )
     elif "mixed_people" in endpoint or "api_search" in endpoint:
         people = data.get("people") or []
         pag = data.get("pagination") or {}
         total = pag.get("total_entries") or pag.get("total_count") or data.get("total_entries") or data.get("total_count") or len(people)
-        lines.append("Endpoint: mixed_people/api_search")
-        lines.append("People in this page: %s" % len(people))
-        lines.append("Total entries (pagination): %s" % total)
+        fmt, args = "mixed_people/api_search: %s people on this page, %s total", (
+            len(people),
+            total,
+        )
     elif "bulk_match" in endpoint or "people/bulk" in endpoint:
-        matches = data.get("matches") or []
-        lines.append("Endpoint: people/bulk_match")
-        lines.append("Enriched count: %s" % len(matches))
+        fmt, args = "people/bulk_match: %s enriched", (len(data.get("matches") or []),)
     elif "tags" in endpoint:
-        tags = data.get("tags") or []
-        lines.append("Endpoint: tags/search")
-        lines.append("Tags count: %s" % len(tags))
+        fmt, args = "tags/search: %s tags", (len(data.get("tags") or []),)
     elif "organizations/enrich" in endpoint or "/organizations/" in endpoint:
         orgs = data.get("organizations") or []
         org = data.get("organization") or (orgs[0] if orgs else {})
         tech_count = len(org.get("current_technologies") or org.get("technology_names") or [])
-        lines.append("Endpoint: organization enrich/get")
-        lines.append("Organization: %s" % (org.get("name") or org.get("id") or "?"))
-        lines.append("Technologies count: %s" % tech_count)
+        fmt, args = "organization enrich/get: %s, %s technologies", (
+            org.get("name") or org.get("id") or "?",
+            tech_count,
+        )
     else:
-        lines.append("Endpoint: %s" % endpoint)
-        lines.append("Response keys: %s" % list(data.keys())[:10])
+        fmt, args = "%s: response keys %s", (endpoint, list(data.keys())[:10])
     if extra:
-        for k, v in extra.items():
-            lines.append("%s: %s" % (k, v))
-    lines.append("--------------------------------")
-    msg = "\n".join(lines)
-    logger.info(msg)
-    print(msg)
+        fmt += " (%s)"
+        args += (", ".join("%s: %s" % (k, v) for k, v in extra.items()),)
+    logger.log(level, "Apollo " + fmt, *args)
 
 
 def _get_headers():
@@ -109,27 +170,115 @@ def _get_headers():
     }
 
 
-def _post_with_retry(
-    url: str, json: dict, headers: dict, timeout: int = DEFAULT_TIMEOUT
+def _note_response(r: requests.Response, attempt: int) -> None:
+    """Fill in the traced call's HTTP fields (config.instrumentation)."""
+    call = current_call()
+    if call is not None:
+        call.method = r.request.method
+        call.note_response(
+            r.status_code, attempt, len(r.request.body or b""), len(r.content)
+        )
+
+
+def _connect_failed(e: requests.exceptions.RequestException) -> bool:
+    """Whether the request failed before a connection was made (Apollo never saw it)."""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0] if e.args else None, "reason", None)
+    # NewConnectionError (refused, DNS) is a ConnectTimeoutError too.
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def _not_processed(e: Exception) -> bool:
+    """
+    Whether a failed call was never processed (so not billed) by Apollo: connect
+    errors, or a 429 left after the retries. Anything else may have been billed.
+    """
+    if isinstance(e, requests.exceptions.HTTPError):
+        return e.response is not None and e.response.status_code == 429
+    return isinstance(e, requests.exceptions.RequestException) and _connect_failed(e)
+
+
+def _request_with_retry(
+    method: str,
+    url: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    idempotent: bool = True,
+    **kwargs,
 ) -> requests.Response:
-    """POST with retries on read/connect timeout."""
-    last_error = None
+    """
+    Rate-limited request with retries on timeouts, connection errors, 429 and 5xx.
+    Waits on the endpoint's token bucket before every attempt. Backoff is exponential
+    with jitter; a 429 Retry-After pauses the whole endpoint budget for that long.
+    After the last attempt the final response is returned as-is (callers raise_for_status).
+
+    idempotent=False (calls billed per request, e.g. bulk_match): retries only when
+    Apollo cannot have processed the request, i.e. connect errors and 429. A read
+    timeout or 5xx may come after the credits were spent, so it is returned/raised.
+    """
+    bucket = get_bucket(limiter_key_for_url(url))
+    call = current_call()
     for attempt in range(MAX_RETRIES + 1):
+        if call is not None:
+            call.retries = attempt
+        bucket.acquire()
         try:
-            r = requests.post(url, json=json, headers=headers, timeout=timeout)
-            return r
+            r = get_session().request(method, url, timeout=timeout, **kwargs)
         except (
-            requests.exceptions.ReadTimeout,
-            requests.exceptions.ConnectTimeout,
+            requests.exceptions.Timeout,
+            requests.exceptions.ConnectionError,
         ) as e:
-            last_error = e
-            if attempt < MAX_RETRIES:
-                time.sleep(2)
-            else:
-                raise last_error
-    raise last_error
+            if attempt >= MAX_RETRIES or not (idempotent or _connect_failed(e)):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                "Apollo %s %s failed (%s); retry %s/%s in %.1fs",
+                method,
+                url,
+                e,
+                attempt + 1,
+                MAX_RETRIES,
+                delay,
+            )
+            time.sleep(delay)
+            continue
+        if (
+            r.status_code not in RETRY_STATUS_CODES
+            or attempt >= MAX_RETRIES
+            or not (idempotent or r.status_code == 429)
+        ):
+            _note_response(r, attempt)
+            return r
+        retry_after = parse_retry_after(r.headers.get("Retry-After"))
+        delay = backoff_delay(attempt, retry_after)
+        logger.warning(
+            "Apollo %s %s returned %s; retry %s/%s in %.1fs",
+            method,
+            url,
+            r.status_code,
+            attempt + 1,
+            MAX_RETRIES,
+            delay,
+        )
+        r.close()
+        if r.status_code == 429 and bucket.rate > 0:
+            # Every worker on this endpoint waits, not just this one.
+            bucket.pause(delay)
+        else:
+            time.sleep(delay)
+    return r
+
+
+def _post_with_retry(
+    url: str, json: dict, headers: dict, timeout: int = DEFAULT_TIMEOUT
+) -> requests.Response:
+    """POST with rate limiting and retries (see _request_with_retry)."""
+    return _request_with_retry(
+        "POST", url, timeout=timeout, json=json, headers=headers
+    )
 
 
+@traced("apollo", "tags/search", items=lambda data: len(data.get("tags") or []))
 def search_tags(q_tag_fuzzy_name: str) -> dict:
     """
     Search Apollo tags (e.g. industry tags). Undocumented endpoint; use to get tag IDs
@@ -144,7 +293,8 @@ def search_tags(q_tag_fuzzy_name: str) -> dict:
         query_params=params,
         req_body={},
     )
-    r = requests.post(
+    r = _request_with_retry(
+        "POST",
         APOLLO_TAGS_SEARCH_URL,
         json={},
         params=params,
@@ -160,24 +310,13 @@ def search_tags(q_tag_fuzzy_name: str) -> dict:
 def _get_with_retry(
     url: str, params: dict, headers: dict, timeout: int = DEFAULT_TIMEOUT
 ) -> requests.Response:
-    """GET with retries on read/connect timeout."""
-    last_error = None
-    for attempt in range(MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=timeout)
-            return r
-        except (
-            requests.exceptions.ReadTimeout,
-            requests.exceptions.ConnectTimeout,
-        ) as e:
-            last_error = e
-            if attempt < MAX_RETRIES:
-                time.sleep(2)
-            else:
-                raise last_error
-    raise last_error
+    """GET with rate limiting and retries (see _request_with_retry)."""
+    return _request_with_retry(
+        "GET", url, timeout=timeout, params=params, headers=headers
+    )
 
 
+@traced("apollo", "organizations/enrich", items=lambda org: 1 if org else 0, credits=1)
 def enrich_organization(domain: str = None, name: str = None) -> dict:
     """Enrich one organization by domain and/or name. Returns organization dict."""
     headers = _get_headers()
@@ -200,6 +339,7 @@ def enrich_organization(domain: str = None, name: str = None) -> dict:
     return org
 
 
+@traced("apollo", "organizations/get", items=lambda org: 1 if org else 0, credits=1)
 def get_organization(organization_id: str) -> dict:
     """Get complete organization info by Apollo organization ID."""
     org_id = str(organization_id or "").strip()
@@ -217,7 +357,22 @@ def get_organization(organization_id: str) -> dict:
 
 
 def search_companies(payload: dict) -> dict:
-    """Search for companies using Apollo API. Consumes Apollo credits."""
+    """
+    Search for companies using Apollo API. Consumes Apollo credits, unless an
+    identical search is already in flight: then its result is shared (single_flight).
+    """
+    return get_flight("search_companies").do(
+        payload_key(payload), lambda: _search_companies(payload)
+    )
+
+
+@traced(
+    "apollo",
+    "mixed_companies/search",
+    items=lambda data: len(data.get("organizations") or data.get("accounts") or []),
+    credits=1,
+)
+def _search_companies(payload: dict) -> dict:
     headers = _get_headers()
     _log_apollo_request(APOLLO_COMPANY_SEARCH_URL, headers, req_body=payload)
     r = _post_with_retry(APOLLO_COMPANY_SEARCH_URL, payload, headers)
@@ -236,7 +391,22 @@ def search_companies(payload: dict) -> dict:
 
 
 def search_people(payload: dict) -> dict:
-    """Search for people/contacts using Apollo API. Consumes Apollo credits."""
+    """
+    Search for people/contacts using Apollo API. Consumes Apollo credits, unless an
+    identical search is already in flight (see search_companies).
+    """
+    return get_flight("search_people").do(
+        payload_key(payload), lambda: _search_people(payload)
+    )
+
+
+@traced(
+    "apollo",
+    "mixed_people/api_search",
+    items=lambda data: len(data.get("people") or []),
+    credits=1,
+)
+def _search_people(payload: dict) -> dict:
     headers = _get_headers()
     _log_apollo_request(APOLLO_PEOPLE_SEARCH_URL, headers, req_body=payload)
     r = _post_with_retry(APOLLO_PEOPLE_SEARCH_URL, payload, headers)
@@ -246,51 +416,98 @@ def search_people(payload: dict) -> dict:
     return data
 
 
+@traced("apollo", "people/bulk_match", items=len, credits=len)
+def _enrich_people_batch(
+    batch: list[str], reveal_personal_emails: bool, reveal_phone_number: bool
+) -> list[dict]:
+    """One bulk_match call for up to 10 person ids. Returns matches[]."""
+    payload = {"details": [{"id": pid} for pid in batch]}
+    params = {
+        "reveal_personal_emails": str(reveal_personal_emails).lower(),
+        "reveal_phone_number": str(reveal_phone_number).lower(),
+    }
+    headers = _get_headers()
+    _log_apollo_request(
+        APOLLO_PEOPLE_BULK_ENRICH_URL,
+        headers,
+        query_params=params,
+        req_body=payload,
+    )
+    r = _request_with_retry(
+        "POST",
+        APOLLO_PEOPLE_BULK_ENRICH_URL,
+        json=payload,
+        params=params,
+        headers=headers,
+        timeout=30,
+        idempotent=False,
+    )
+    r.raise_for_status()
+    data = r.json()
+    _log_apollo_response(APOLLO_PEOPLE_BULK_ENRICH_URL, data)
+    return data.get("matches") or []
+
+
 def enrich_people_bulk(
     person_ids: list[str],
     reveal_personal_emails: bool = False,
     reveal_phone_number: bool = False,
+    errors: Optional[list] = None,
 ) -> dict[str, dict]:
     """
-    Enrich up to 10 people at a time via bulk_match. Returns dict of person_id -> enriched person (email, linkedin_url, etc.).
-    Consumes credits. Skips empty ids; batches of 10.
+    Enrich people via bulk_match (10 ids per call). Returns dict of person_id -> enriched person (email, linkedin_url, etc.).
+    Consumes credits. Skips empty ids. Batches run concurrently, at most BULK_MATCH_MAX_IN_FLIGHT at a time.
+    A failed batch does not fail the others; it is logged and, if `errors` is given,
+    appended to it as {"batch": index, "ids": [...], "error": "...", "billed": bool}
+    (billed False only when Apollo never processed it, see _not_processed).
     """
     if not person_ids:
         return {}
     ids_clean = [str(pid).strip() for pid in person_ids if str(pid).strip()]
     if not ids_clean:
         return {}
+    batches = [
+        ids_clean[i : i + BULK_MATCH_BATCH_SIZE]
+        for i in range(0, len(ids_clean), BULK_MATCH_BATCH_SIZE)
+    ]
     result_by_id = {}
-    for i in range(0, len(ids_clean), 10):
-        batch = ids_clean[i : i + 10]
-        payload = {"details": [{"id": pid} for pid in batch]}
-        params = {
-            "reveal_personal_emails": str(reveal_personal_emails).lower(),
-            "reveal_phone_number": str(reveal_phone_number).lower(),
+    workers = min(BULK_MATCH_MAX_IN_FLIGHT, len(batches))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_index = {
+            context_submit(
+                executor,
+                _enrich_people_batch,
+                batch,
+                reveal_personal_emails,
+                reveal_phone_number,
+            ): index
+            for index, batch in enumerate(batches)
         }
-        headers = _get_headers()
-        _log_apollo_request(
-            APOLLO_PEOPLE_BULK_ENRICH_URL,
-            headers,
-            query_params=params,
-            req_body=payload,
-        )
-        try:
-            r = requests.post(
-                APOLLO_PEOPLE_BULK_ENRICH_URL,
-                json=payload,
-                params=params,
-                headers=headers,
-                timeout=30,
-            )
-            r.raise_for_status()
-            data = r.json()
-            _log_apollo_response(APOLLO_PEOPLE_BULK_ENRICH_URL, data)
-            for match in data.get("matches") or []:
-                pid = match.get("id")
+        for future in as_completed(future_to_index):
+            index = future_to_index[future]
+            try:
+                matches = future.result()
+            except Exception as e:
+                # Don't fail the whole flow if enrichment fails for a batch
+                logger.warning(
+                    "bulk_match batch %s/%s failed (%s ids): %s",
+                    index + 1,
+                    len(batches),
+                    len(batches[index]),
+                    e,
+                )
+                if errors is not None:
+                    errors.append(
+                        {
+                            "batch": index,
+                            "ids": batches[index],
+                            "error": str(e),
+                            "billed": not _not_processed(e),
+                        }
+                    )
+                continue
+            for match in matches:
+                pid = (match or {}).get("id")
                 if pid is not None:
                     result_by_id[str(pid)] = match
-        except Exception:
-            # Don't fail the whole flow if enrichment fails for a batch
-            pass
     return result_by_id
@@ -2,4 +2,27 @@ from django.apps import AppConfig
 
 
 class ApolloIngestConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'apollo_ingest'
+
+    def ready(self):
+        # Console log records queued by settings.LOGGING are written by this listener.
+        from config.log_handlers import start_log_listeners
+
+        start_log_listeners()
+
+        # Industry tag index for /api/tags/search/ (in memory, built from INDUSTRIES_LIST).
+        from .tag_index import get_tag_index
+
+        get_tag_index()
+
+        # Cache, warehouse and single-flight counters on /metrics (read at scrape time).
+        from config.metrics import register_collector
+
+        from .apollo_cache import cache_metrics
+        from .company_warehouse import warehouse_metrics
+        from .single_flight import single_flight_metrics
+
+        register_collector(cache_metrics)
+        register_collector(warehouse_metrics)
+        register_collector(single_flight_metrics)
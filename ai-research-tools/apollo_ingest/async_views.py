@@ -0,0 +1,403 @@
+"""
+Async versions of the company search, people search and export-selected endpoints.
+
+Same request/response shapes as the DRF views in views.py (DRF's APIView is
+sync-only, so these are plain Django async views). Apollo calls go through
+apollo_async, so a single event loop keeps hundreds of requests in flight without
+a thread per call. Serve with an ASGI server (config/asgi.py) to get that benefit;
+under WSGI Django runs each view in its own short-lived event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_http_methods
+
+from . import apollo_async
+from .apollo_cache import (
+    flush_organizations,
+    get_cached_company_search,
+    get_cached_organization,
+    get_cached_people,
+    store_company_search,
+    store_enriched_people,
+    store_organization,
+)
+from .export_writer import ExportWriter
+from .records import person_records
+from .serializers import CompanySearchSerializer, PeopleSearchSerializer
+from .views import (
+    CREDITS_COMPANY_SEARCH,
+    CREDITS_ORG_ENRICH,
+    CREDITS_PEOPLE_SEARCH,
+    PEOPLE_PER_COMPANY_MAX,
+    _billed_enrich_credits,
+    _company_country_display,
+    _export_error_bundle,
+    _format_organization_technologies,
+    _merge_enriched_into_people,
+    build_apollo_payload,
+    build_people_payload,
+    log_apollo_credits,
+    normalize_companies,
+    normalize_people,
+    people_total_entries,
+)
+
+logger = logging.getLogger(__name__)
+
+# Companies fetched concurrently by the async export (coroutines, not threads).
+# Apollo request rate is still capped per endpoint by rate_limit.py.
+EXPORT_ASYNC_MAX_COMPANIES = max(
+    1, int(os.getenv("EXPORT_ASYNC_MAX_COMPANIES", "64"))
+)
+
+# Cache reads/writes use the ORM: run them in Django's thread for sync code.
+_get_cached_people = sync_to_async(get_cached_people)
+_store_enriched_people = sync_to_async(store_enriched_people)
+_get_cached_organization = sync_to_async(get_cached_organization)
+_store_organization = sync_to_async(store_organization)
+_flush_organizations = sync_to_async(flush_organizations)
+# Company search cache: shared (network) cache backend, then the company warehouse (ORM).
+_get_cached_company_search = sync_to_async(get_cached_company_search)
+_store_company_search = sync_to_async(store_company_search)
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+async def enrich_people(people: list) -> tuple[int, int]:
+    """Async views._enrich_people: cache first, bulk_match for misses. Returns (credits, cache hits)."""
+    ids = list(dict.fromkeys(str(p["id"]) for p in people if p.get("id")))
+    if not ids:
+        return 0, 0
+    enriched_by_id = await _get_cached_people(ids)
+    cached = len(enriched_by_id)
+    misses = [pid for pid in ids if pid not in enriched_by_id]
+    enrich_credits = 0
+    if misses:
+        enrich_errors = []
+        fetched = await apollo_async.enrich_people_bulk(misses, errors=enrich_errors)
+        await _store_enriched_people(fetched)
+        enriched_by_id.update(fetched)
+        enrich_credits = _billed_enrich_credits(misses, enrich_errors)
+    _merge_enriched_into_people(people, enriched_by_id)
+    return enrich_credits, cached
+
+
+async def fetch_people_for_company(
+    organization_id,
+    domain,
+    job_titles=None,
+    seniorities=None,
+    max_people=None,
+) -> tuple[list, int, int]:
+    """
+    Async views.fetch_people_for_company: all pages up to max_people (later pages
+    concurrently, each enriched as it arrives), unfiltered fallback when the filters
+    match nobody. Returns (people, credits, contacts truncated by the cap).
+    """
+    max_people = PEOPLE_PER_COMPANY_MAX if max_people is None else max(1, max_people)
+    per_page = min(100, max_people)
+    search_calls = 0
+    enrich_credits = 0
+    cached = 0
+    truncated = 0
+    people = []
+    for titles, levels in ((job_titles, seniorities), (None, None)):
+        payload = {
+            "per_page": per_page,
+            "organization_id": organization_id and str(organization_id).strip() or None,
+            "domains": (domain or "").strip() or None,
+            "job_titles": titles or [],
+            "seniorities": levels or [],
+        }
+
+        async def fetch_page(page: int):
+            response = await apollo_async.search_people(
+                build_people_payload(dict(payload, page=page))
+            )
+            room = max_people - (page - 1) * per_page
+            page_people = person_records((response.get("people") or [])[:room])
+            page_credits, page_cached = await enrich_people(page_people)
+            return page, page_people, page_credits, page_cached, response
+
+        _page, first, page_credits, page_cached, response = await fetch_page(1)
+        search_calls += 1
+        enrich_credits += page_credits
+        cached += page_cached
+        total_entries = people_total_entries(response)
+        if total_entries is None:
+            total_entries = len(response.get("people") or [])
+        last_page = -(-min(total_entries, max_people) // per_page)
+        pages = {1: first}
+        if first and last_page > 1:
+            for result in await asyncio.gather(
+                *(fetch_page(p) for p in range(2, last_page + 1))
+            ):
+                page, page_people, page_credits, page_cached, _response = result
+                pages[page] = page_people
+                enrich_credits += page_credits
+                cached += page_cached
+            search_calls += last_page - 1
+        people = [p for page in sorted(pages) for p in pages[page]]
+        truncated = max(0, total_entries - len(people))
+        if people or not (job_titles or seniorities):
+            break
+    total_credits = search_calls * CREDITS_PEOPLE_SEARCH + enrich_credits
+    if people:
+        log_apollo_credits(
+            "async get_people_for_company (org_id=%s)"
+            % (organization_id or domain or "?"),
+            total_credits,
+            detail=f"search={search_calls} enrich={enrich_credits} ({len(people)} contacts, {cached} cached)",
+        )
+    return people, total_credits, truncated
+
+
+async def fetch_company_technologies(
+    organization_id=None, domain=None, name=None
+) -> tuple[str, int]:
+    """Async views._fetch_company_technologies (organization cache first)."""
+    cached = await _get_cached_organization(
+        organization_id=organization_id, domain=domain
+    )
+    if cached is not None:
+        return _format_organization_technologies(cached), 0
+    org = {}
+    credits = 0
+    try:
+        if domain:
+            org = await apollo_async.enrich_organization(domain=domain, name=name)
+            credits = CREDITS_ORG_ENRICH if org else 0
+        if not org and organization_id:
+            org = await apollo_async.get_organization(str(organization_id))
+            credits = CREDITS_ORG_ENRICH if org else 0
+        elif not org and name:
+            org = await apollo_async.enrich_organization(name=name)
+            credits = CREDITS_ORG_ENRICH if org else 0
+    except Exception as e:
+        logger.warning(
+            "Technologies fetch failed for id=%s domain=%s name=%s: %s",
+            organization_id,
+            domain,
+            name,
+            e,
+        )
+    if org:
+        await _store_organization(org, domain=domain)
+    if credits:
+        log_apollo_credits(
+            "organizations/enrich (export technologies)",
+            credits,
+            detail=name or domain or organization_id or "?",
+        )
+    return _format_organization_technologies(org), credits
+
+
+async def fetch_export_company_bundle(
+    company: dict, job_titles: list, seniorities: list
+) -> dict:
+    """Async views._fetch_export_company_bundle: technologies and people fetched together."""
+    cid = company.get("id")
+    cname = company.get("name") or "company"
+    cdomain = (company.get("domain") or company.get("primary_domain") or "").strip()
+    people = company.get("people") if isinstance(company.get("people"), list) else []
+    server_fetched = not people
+
+    async def no_people():
+        return people, 0, 0
+
+    tech_result, people_result = await asyncio.gather(
+        fetch_company_technologies(
+            organization_id=cid, domain=cdomain or None, name=cname
+        ),
+        fetch_people_for_company(cid, cdomain or None, job_titles, seniorities)
+        if server_fetched
+        else no_people(),
+        return_exceptions=True,
+    )
+    errors = []
+    technologies, tech_credits = "", 0
+    if isinstance(tech_result, Exception):
+        errors.append("technologies: %s" % tech_result)
+        logger.warning("Export tech failed id=%s name=%s: %s", cid, cname, tech_result)
+    else:
+        technologies, tech_credits = tech_result
+    people_credits, truncated = 0, 0
+    if isinstance(people_result, Exception):
+        errors.append("people: %s" % people_result)
+        logger.warning(
+            "Export people failed id=%s name=%s: %s", cid, cname, people_result
+        )
+        people = []
+    else:
+        people, people_credits, truncated = people_result
+    return {
+        "cname": cname,
+        "company_country": _company_country_display(company),
+        "technologies": technologies,
+        "people": people,
+        "people_truncated": truncated,
+        "tech_credits": tech_credits,
+        "people_credits": people_credits,
+        "server_fetched": server_fetched,
+        "error": "; ".join(errors),
+    }
+
+
+async def aiter_export_bundles(companies: list, job_titles: list, seniorities: list):
+    """All companies fetched concurrently (EXPORT_ASYNC_MAX_COMPANIES at once); bundles yielded in order."""
+    slots = asyncio.Semaphore(EXPORT_ASYNC_MAX_COMPANIES)
+
+    async def run(company):
+        async with slots:
+            try:
+                return await fetch_export_company_bundle(
+                    company, job_titles, seniorities
+                )
+            except Exception as e:
+                logger.warning(
+                    "Export worker failed for %s: %s", company.get("name") or "company", e
+                )
+                return _export_error_bundle(company, str(e))
+
+    tasks = [asyncio.ensure_future(run(company)) for company in companies]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await _flush_organizations()
+
+
+async def _aiter_export_zip(companies: list, job_titles: list, seniorities: list):
+    writer = ExportWriter()
+    chunks = writer.iter_zip()
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    try:
+        yield next(chunks)
+        async for bundle in aiter_export_bundles(companies, job_titles, seniorities):
+            writer.append_bundle(bundle)
+        # Saving the workbooks is blocking file I/O: keep it off the event loop.
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        chunks.close()
+
+
+@require_http_methods(["POST"])
+async def async_company_search_view(request):
+    """Async /api/companies/search/."""
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    serializer = CompanySearchSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    try:
+        data = dict(serializer.validated_data)
+        data.setdefault("page", 1)
+        data.setdefault("per_page", 25)
+        payload = build_apollo_payload(data)
+        response = await _get_cached_company_search(payload)
+        cached = response is not None
+        if not cached:
+            response = await apollo_async.search_companies(payload)
+            await _store_company_search(payload, response)
+        raw_list = response.get("organizations") or response.get("accounts") or []
+        companies = normalize_companies(raw_list)
+        pagination = response.get("pagination", {})
+        log_apollo_credits(
+            request.path,
+            0 if cached else CREDITS_COMPANY_SEARCH,
+            detail="cached search" if cached else "",
+        )
+        return JsonResponse(
+            {
+                "companies": companies,
+                "total_count": pagination.get("total_entries", len(companies)),
+                "page": pagination.get("page", 1),
+                "per_page": pagination.get("per_page", 25),
+            }
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+async def async_people_search_view(request):
+    """Async /api/people/search/ (one page, enriched)."""
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    serializer = PeopleSearchSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    try:
+        response = await apollo_async.search_people(
+            build_people_payload(serializer.validated_data)
+        )
+        people = normalize_people(response.get("people", []))
+        pagination = response.get("pagination", {})
+        total_count = (
+            pagination.get("total_entries")
+            or pagination.get("total_count")
+            or response.get("total_entries")
+            or response.get("total_count")
+            or 0
+        )
+        enrich_credits, cached = await enrich_people(people)
+        log_apollo_credits(
+            request.path,
+            CREDITS_PEOPLE_SEARCH + enrich_credits,
+            detail=f"search=1 enrich={enrich_credits} ({len(people)} contacts, {cached} cached)",
+        )
+        return JsonResponse(
+            {
+                "people": people,
+                "total_count": total_count,
+                "page": pagination.get("page", 1),
+                "per_page": pagination.get("per_page", 25),
+            }
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@ensure_csrf_cookie
+async def async_export_companies_view(request):
+    """Async /api/export/companies/: same body and ZIP, companies fetched on the event loop."""
+    body = _json_body(request)
+    if body is None:
+        return HttpResponse("Invalid JSON", status=400)
+    companies = body.get("companies") or []
+    if not companies:
+        return HttpResponse("No companies selected", status=400)
+    logger.info(
+        "Async export: %s company(ies), up to %s concurrently",
+        len(companies),
+        min(EXPORT_ASYNC_MAX_COMPANIES, len(companies)),
+    )
+    response = StreamingHttpResponse(
+        _aiter_export_zip(
+            companies, body.get("job_titles") or [], body.get("seniorities") or []
+        ),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = 'attachment; filename="companies_export.zip"'
+    return response
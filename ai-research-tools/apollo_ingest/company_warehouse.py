@@ -0,0 +1,279 @@
+"""
+Local company warehouse: what Apollo's company search returned, kept in the database.
+
+- Every company of a mixed_companies/search page is upserted (one bulk statement
+  per page) into Company, with the filter columns indexed: domain, country,
+  industry, employee count, revenue, funding stage; keywords as a list.
+- Each page is kept as a CompanySearchSnapshot (company ids in Apollo's order +
+  pagination), keyed by the canonical payload (payload_keys).
+
+get_company_page() answers a repeat search page from those two tables when its
+snapshot is at most WAREHOUSE_MAX_AGE old: apollo_cache checks it after the
+in-process / shared caches and before calling Apollo, so repeat filter combinations
+cost no credits for WAREHOUSE_MAX_AGE instead of minutes. query_companies() filters
+the warehouse itself by the indexed columns; warehouse_search adds full-text search
+and facets on top of company_queryset().
+
+Fails soft like apollo_cache: on database errors callers just go to Apollo.
+"""
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .apollo_cache import _chunks, normalize_domain
+from .models import Company, CompanySearchSnapshot
+from .payload_keys import payload_key
+from .records import company_search_text
+
+logger = logging.getLogger(__name__)
+
+WAREHOUSE_ENABLED = os.getenv("APOLLO_WAREHOUSE", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+# Oldest snapshot that may answer a search page. 0 = store only, always ask Apollo.
+WAREHOUSE_MAX_AGE = timedelta(
+    hours=float(os.getenv("APOLLO_WAREHOUSE_MAX_AGE_HOURS", "24"))
+)
+_COMPANY_UPDATE_FIELDS = [
+    "name",
+    "domain",
+    "country",
+    "industry",
+    "estimated_num_employees",
+    "annual_revenue",
+    "funding_stage",
+    "keywords",
+    "search_text",
+    "data",
+    "last_seen_at",
+]
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stale": 0, "pages_stored": 0, "companies_stored": 0}
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_none(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _company_row(acc: dict, now) -> Optional[Company]:
+    apollo_id = str(acc.get("id") or "").strip()
+    if not apollo_id:
+        return None
+    employees = _int_or_none(acc.get("estimated_num_employees"))
+    return Company(
+        apollo_id=apollo_id,
+        name=(acc.get("name") or "")[:255],
+        domain=normalize_domain(acc.get("primary_domain"))[:255],
+        country=(acc.get("organization_country") or acc.get("country") or "")[:128],
+        industry=(acc.get("industry") or "")[:255],
+        estimated_num_employees=employees if employees and employees > 0 else None,
+        annual_revenue=_float_or_none(acc.get("organization_revenue")),
+        funding_stage=(acc.get("latest_funding_stage") or "")[:64],
+        keywords=[
+            str(k).strip().lower() for k in acc.get("keywords") or [] if str(k).strip()
+        ],
+        search_text=company_search_text(acc),
+        data=acc,
+        first_seen_at=now,
+        last_seen_at=now,
+    )
+
+
+def store_company_page(payload: dict, response: dict) -> None:
+    """Upsert the companies of a company search response and snapshot the page."""
+    if not WAREHOUSE_ENABLED or not response:
+        return
+    raw_list = response.get("organizations") or response.get("accounts") or []
+    now = timezone.now()
+    rows = {}
+    for acc in raw_list:
+        row = _company_row(acc, now)
+        if row is not None:
+            rows[row.apollo_id] = row
+    # A page with companies Apollo sent without an id can't be rebuilt locally.
+    complete = len(rows) == len({str(acc.get("id") or "") for acc in raw_list})
+    try:
+        with transaction.atomic():
+            for chunk in _chunks(list(rows.values())):
+                Company.objects.bulk_create(
+                    chunk,
+                    update_conflicts=True,
+                    unique_fields=["apollo_id"],
+                    update_fields=_COMPANY_UPDATE_FIELDS,
+                )
+            if complete:
+                CompanySearchSnapshot.objects.update_or_create(
+                    key=payload_key(payload),
+                    defaults={
+                        "payload": dict(payload),
+                        "company_ids": [str(acc["id"]).strip() for acc in raw_list],
+                        "pagination": response.get("pagination") or {},
+                        "fetched_at": now,
+                    },
+                )
+    except DatabaseError as e:
+        logger.warning("Company warehouse write failed: %s", e)
+        return
+    _count("pages_stored")
+    _count("companies_stored", len(rows))
+
+
+def get_company_page(
+    payload: dict, max_age: Optional[timedelta] = None
+) -> Optional[dict]:
+    """
+    The company search response for this payload rebuilt from the warehouse
+    ({"organizations", "accounts", "pagination"}), if its snapshot is at most max_age
+    (default WAREHOUSE_MAX_AGE) old; else None.
+    """
+    max_age = WAREHOUSE_MAX_AGE if max_age is None else max_age
+    if not WAREHOUSE_ENABLED or max_age.total_seconds() <= 0:
+        return None
+    try:
+        snapshot = (
+            CompanySearchSnapshot.objects.filter(key=payload_key(payload))
+            .only("company_ids", "pagination", "fetched_at")
+            .first()
+        )
+        if snapshot is None:
+            _count("misses")
+            return None
+        if snapshot.fetched_at < timezone.now() - max_age:
+            _count("stale")
+            return None
+        ids = snapshot.company_ids or []
+        data = {}
+        for chunk in _chunks(ids):
+            data.update(
+                Company.objects.filter(apollo_id__in=chunk).values_list(
+                    "apollo_id", "data"
+                )
+            )
+    except DatabaseError as e:
+        logger.warning("Company warehouse read failed: %s", e)
+        return None
+    if any(cid not in data for cid in ids):
+        _count("misses")
+        return None
+    _count("hits")
+    return {
+        "organizations": [data[cid] for cid in ids],
+        "accounts": [],
+        "pagination": snapshot.pagination or {},
+    }
+
+
+def company_queryset(
+    countries: Optional[list] = None,
+    industries: Optional[list] = None,
+    employees_min: Optional[int] = None,
+    employees_max: Optional[int] = None,
+    revenue_min: Optional[float] = None,
+    revenue_max: Optional[float] = None,
+    funding_stages: Optional[list] = None,
+    keywords: Optional[list] = None,
+    domains: Optional[list] = None,
+    max_age: Optional[timedelta] = None,
+):
+    """
+    Companies in the warehouse matching every given filter, seen within max_age
+    (default WAREHOUSE_MAX_AGE; 0 = any age). Text filters match case-insensitively;
+    revenue is in dollars (organization_revenue).
+    """
+    max_age = WAREHOUSE_MAX_AGE if max_age is None else max_age
+    qs = Company.objects.all()
+    if max_age.total_seconds() > 0:
+        qs = qs.filter(last_seen_at__gte=timezone.now() - max_age)
+    if countries:
+        qs = qs.filter(_iexact_any("country", countries))
+    if industries:
+        qs = qs.filter(_iexact_any("industry", industries))
+    if funding_stages:
+        qs = qs.filter(funding_stage__in=funding_stages)
+    if domains:
+        qs = qs.filter(domain__in=[normalize_domain(d) for d in domains])
+    if employees_min is not None:
+        qs = qs.filter(estimated_num_employees__gte=employees_min)
+    if employees_max is not None:
+        qs = qs.filter(estimated_num_employees__lte=employees_max)
+    if revenue_min is not None:
+        qs = qs.filter(annual_revenue__gte=revenue_min)
+    if revenue_max is not None:
+        qs = qs.filter(annual_revenue__lte=revenue_max)
+    for keyword in keywords or []:
+        qs = qs.filter(keywords__icontains=str(keyword).strip().lower())
+    return qs
+
+
+def query_companies(limit: int = 100, offset: int = 0, **filters) -> tuple[list, int]:
+    """
+    company_queryset(**filters) as (raw Apollo rows [offset:offset + limit], total
+    matches).
+    """
+    qs = company_queryset(**filters)
+    total = qs.count()
+    rows = list(qs.values_list("data", flat=True)[offset : offset + limit])
+    return rows, total
+
+
+def _iexact_any(field: str, values: list) -> Q:
+    condition = Q()
+    for value in values:
+        condition |= Q(**{field + "__iexact": str(value).strip()})
+    return condition
+
+
+def warehouse_stats() -> dict:
+    """Snapshot hit/miss counters and pages/companies stored by this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["stale"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def warehouse_metrics() -> list:
+    """Collector for config.metrics: snapshot lookups by result, pages/companies stored."""
+    stats = warehouse_stats()
+    return [
+        (
+            "company_warehouse_lookups_total",
+            "counter",
+            "Company search pages looked up in the warehouse (stale = older than max age).",
+            [({"result": key}, stats[key]) for key in ("hits", "misses", "stale")],
+        ),
+        (
+            "company_warehouse_stored_total",
+            "counter",
+            "Company search pages and companies upserted into the warehouse.",
+            [
+                ({"kind": "pages"}, stats["pages_stored"]),
+                ({"kind": "companies"}, stats["companies_stored"]),
+            ],
+        ),
+    ]
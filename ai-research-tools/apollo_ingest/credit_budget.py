@@ -0,0 +1,383 @@
+"""
+Credit budgets for exports: plan first, then stop before the budget is overrun.
+
+plan_export() predicts calls and credits for an export-all from its first company
+page: pagination.total_entries, the batched people search of that page, and how much
+of it the enrichment / organization caches already cover.
+
+CreditBudget enforces a per-export limit (APOLLO_EXPORT_CREDIT_BUDGET) and a per-day
+limit (APOLLO_DAILY_CREDIT_BUDGET), 0 = no limit. Export code runs under
+use_budget(budget); every call site that spends credits reserves its worst case
+first (credit_hold) and settles what it actually used afterwards, so reserved +
+spent never goes over the limit. A reservation that does not fit raises
+CreditBudgetExceeded and marks the budget exhausted: the export stops early and the
+file written so far is returned with a note. Outside an export credit_hold is a no-op.
+
+The daily ledger (models.CreditLedger) counts every credit passed to
+log_apollo_credits, UI searches included. Increments are buffered in memory and
+flushed every CREDIT_LEDGER_FLUSH_SECONDS (not from async code, which cannot use
+the ORM directly; the next sync caller flushes).
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from config.metrics import CREDIT_BUDGET_STOPS
+
+from .apollo_cache import count_cached_people, is_organization_cached
+from .models import CreditLedger
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CREDIT_BUDGET = max(0, int(os.getenv("APOLLO_EXPORT_CREDIT_BUDGET", "0")))
+DAILY_CREDIT_BUDGET = max(0, int(os.getenv("APOLLO_DAILY_CREDIT_BUDGET", "0")))
+CREDIT_LEDGER_FLUSH_SECONDS = float(
+    os.getenv("APOLLO_CREDIT_LEDGER_FLUSH_SECONDS", "5")
+)
+
+BULK_MATCH_BATCH_SIZE = 10  # apollo_service.enrich_people_bulk
+
+
+class CreditBudgetExceeded(RuntimeError):
+    """A credit-spending call did not fit in the current budget."""
+
+
+# -- daily ledger --------------------------------------------------------------
+
+_ledger_lock = threading.Lock()
+_pending_credits: dict = {}  # day -> credits not yet written to CreditLedger
+_last_flush = 0.0
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def record_credits(credits: int) -> None:
+    """Add credits to today's ledger (buffered; see module docstring)."""
+    if not credits:
+        return
+    day = timezone.now().date()
+    with _ledger_lock:
+        _pending_credits[day] = _pending_credits.get(day, 0) + credits
+        due = time.monotonic() - _last_flush >= CREDIT_LEDGER_FLUSH_SECONDS
+    if due and not _in_event_loop():
+        flush_credits()
+
+
+def _add_to_ledger(day, credits: int) -> None:
+    updated = CreditLedger.objects.filter(day=day).update(
+        credits=F("credits") + credits
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            CreditLedger.objects.create(day=day, credits=credits)
+    except IntegrityError:
+        # Another process created today's row first.
+        CreditLedger.objects.filter(day=day).update(credits=F("credits") + credits)
+
+
+def flush_credits() -> None:
+    """Write buffered credits to CreditLedger. On DB errors they stay buffered."""
+    global _last_flush
+    with _ledger_lock:
+        pending = dict(_pending_credits)
+        _pending_credits.clear()
+        _last_flush = time.monotonic()
+    for day, credits in pending.items():
+        try:
+            _add_to_ledger(day, credits)
+        except (DatabaseError, SynchronousOnlyOperation) as e:
+            logger.warning(
+                "Credit ledger write failed (%s credits kept for retry): %s", credits, e
+            )
+            with _ledger_lock:
+                _pending_credits[day] = _pending_credits.get(day, 0) + credits
+
+
+def daily_credits_spent() -> int:
+    """Credits logged today: the ledger plus what this process has not flushed yet."""
+    day = timezone.now().date()
+    stored = 0
+    if not _in_event_loop():
+        try:
+            stored = (
+                CreditLedger.objects.filter(day=day)
+                .values_list("credits", flat=True)
+                .first()
+                or 0
+            )
+        except DatabaseError as e:
+            logger.warning("Credit ledger read failed: %s", e)
+    with _ledger_lock:
+        return stored + _pending_credits.get(day, 0)
+
+
+# -- enforcement ---------------------------------------------------------------
+
+
+class CreditBudget:
+    """
+    Per-export credit limit plus the daily limit. `spent` starts at credits already
+    used by this export (resumed jobs). Thread-safe; shared by all export workers.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        daily_limit: Optional[int] = None,
+        spent: int = 0,
+    ):
+        self.limit = EXPORT_CREDIT_BUDGET if limit is None else limit
+        self.daily_limit = DAILY_CREDIT_BUDGET if daily_limit is None else daily_limit
+        self.spent = spent
+        self.held = 0
+        self.exhausted = ""  # why the export has to stop, once a reservation failed
+        self._lock = threading.Lock()
+        self._daily = 0
+        self._daily_spent_base = 0
+        self._daily_at = None
+
+    def _daily_spent(self) -> int:
+        # The ledger is re-read every CREDIT_LEDGER_FLUSH_SECONDS (other exports and
+        # processes); in between, add what this export settled since the last read.
+        now = time.monotonic()
+        if (
+            self._daily_at is None
+            or now - self._daily_at >= CREDIT_LEDGER_FLUSH_SECONDS
+        ):
+            daily = daily_credits_spent()
+            with self._lock:
+                self._daily, self._daily_spent_base, self._daily_at = (
+                    daily,
+                    self.spent,
+                    now,
+                )
+        return self._daily + (self.spent - self._daily_spent_base)
+
+    def _stop(self, reason: str, budget: str) -> None:
+        if not self.exhausted:
+            self.exhausted = reason
+            CREDIT_BUDGET_STOPS.inc(budget=budget)
+            logger.warning("Export credit budget: %s (spent %s)", reason, self.spent)
+
+    def reserve(self, credits: int) -> None:
+        """Hold credits for a call about to be made, or raise CreditBudgetExceeded."""
+        if credits <= 0:
+            if self.exhausted:
+                raise CreditBudgetExceeded(self.exhausted)
+            return
+        daily = self._daily_spent() if self.daily_limit else 0
+        with self._lock:
+            if not self.exhausted:
+                if self.limit and self.spent + self.held + credits > self.limit:
+                    self._stop(
+                        "per-export credit budget of %s reached" % self.limit, "export"
+                    )
+                elif (
+                    self.daily_limit and daily + self.held + credits > self.daily_limit
+                ):
+                    self._stop(
+                        "daily credit budget of %s reached" % self.daily_limit, "daily"
+                    )
+                else:
+                    self.held += credits
+                    return
+            raise CreditBudgetExceeded(self.exhausted)
+
+    def settle(self, held: int, used: int) -> None:
+        """Release a reservation and count the credits the call actually used."""
+        with self._lock:
+            self.held -= max(0, held)
+            self.spent += used
+
+    def remaining(self) -> Optional[int]:
+        """Credits that can still be reserved (None = no limit)."""
+        left = []
+        if self.limit:
+            left.append(self.limit - self.spent - self.held)
+        if self.daily_limit:
+            left.append(self.daily_limit - self._daily_spent() - self.held)
+        return max(0, min(left)) if left else None
+
+    def status(self) -> dict:
+        return {
+            "export_limit": self.limit or None,
+            "daily_limit": self.daily_limit or None,
+            "spent": self.spent,
+            "daily_spent": self._daily_spent() if self.daily_limit else None,
+            "remaining": self.remaining(),
+            "exhausted": self.exhausted,
+        }
+
+
+class _Hold:
+    __slots__ = ("credits", "used")
+
+    def __init__(self, credits: int):
+        self.credits = credits
+        self.used = credits  # what the call cost; set lower when it turned out cheaper
+
+
+_current_budget: ContextVar[Optional[CreditBudget]] = ContextVar(
+    "apollo_credit_budget", default=None
+)
+
+
+def current_budget() -> Optional[CreditBudget]:
+    return _current_budget.get()
+
+
+@contextmanager
+def use_budget(budget: CreditBudget):
+    """Enforce budget on credit_hold calls in this context (and context_submit work)."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+@contextmanager
+def credit_hold(credits: int):
+    """
+    Reserve credits on the current budget around one Apollo call. Set hold.used to
+    what the call cost (cache hit: 0); on error the full reservation counts as spent.
+    """
+    hold = _Hold(credits)
+    budget = _current_budget.get()
+    if budget is None:
+        yield hold
+        return
+    budget.reserve(credits)
+    try:
+        yield hold
+    finally:
+        budget.settle(credits, hold.used)
+
+
+# -- planning ------------------------------------------------------------------
+
+
+def plan_export(
+    pagination: dict,
+    companies: list,
+    people_search_calls: int = 0,
+    start_page: int = 1,
+    budget: Optional[CreditBudget] = None,
+) -> dict:
+    """
+    Predict calls and credits for an export-all from one company page (dicts as built
+    for export, after the batched people search set prefetched_people;
+    people_search_calls = its api_search calls, cached or not). Covers the
+    pages from start_page on. Cache hit rates are measured on this page's companies
+    and people (peeked at: the cache stats and contents are left alone) and assumed
+    for the rest.
+    """
+    from .views import (
+        CREDITS_COMPANY_SEARCH,
+        CREDITS_ENRICH_PER_PERSON,
+        CREDITS_ORG_ENRICH,
+        CREDITS_PEOPLE_SEARCH,
+        EXPORT_COMPANY_PAGE_SIZE,
+        PEOPLE_PER_COMPANY_MAX,
+    )
+
+    sample = max(1, len(companies))
+    total = int(pagination.get("total_entries") or len(companies))
+    total_pages = int(
+        pagination.get("total_pages") or math.ceil(total / EXPORT_COMPANY_PAGE_SIZE)
+    )
+    skipped = (start_page - 1) * EXPORT_COMPANY_PAGE_SIZE
+    remaining = max(0, total - skipped)
+    pages = max(0, total_pages - start_page + 1)
+    scale = remaining / sample
+
+    org_hits = sum(
+        1
+        for c in companies
+        if is_organization_cached(organization_id=c.get("id"), domain=c.get("domain"))
+    )
+    batched = [c for c in companies if c.get("prefetched_people") is not None]
+    ids = [p["id"] for c in batched for p in c["prefetched_people"] if p.get("id")]
+    with_people = sum(1 for c in batched if c["prefetched_people"])
+    # Companies the batch found nobody for (or that were not batched) get their own
+    # people search; assume they then find as many contacts as the average company.
+    per_company_searches = len(companies) - with_people
+    contacts_per_company = (
+        len(ids) / with_people if with_people else PEOPLE_PER_COMPANY_MAX
+    )
+    people_hit_rate = count_cached_people(ids) / len(ids) if ids else 0.0
+    org_hit_rate = org_hits / sample if companies else 0.0
+
+    contacts = (len(ids) + per_company_searches * contacts_per_company) * scale
+    to_enrich = contacts * (1 - people_hit_rate)
+    calls = {
+        "company_search": pages,
+        "people_search": round(
+            people_search_calls * pages + per_company_searches * scale
+        ),
+        "bulk_match": math.ceil(to_enrich / BULK_MATCH_BATCH_SIZE),
+        "organizations_enrich": round(remaining * (1 - org_hit_rate)),
+    }
+    credits = {
+        "company_search": calls["company_search"] * CREDITS_COMPANY_SEARCH,
+        "people_search": calls["people_search"] * CREDITS_PEOPLE_SEARCH,
+        "enrich": math.ceil(to_enrich * CREDITS_ENRICH_PER_PERSON),
+        "organizations": calls["organizations_enrich"] * CREDITS_ORG_ENRICH,
+    }
+    credits["total"] = sum(credits.values())
+    budget = budget or current_budget() or CreditBudget()
+    status = budget.status()
+    status["fits"] = (
+        status["remaining"] is None or credits["total"] <= status["remaining"]
+    )
+    return {
+        "companies": remaining,
+        "pages": pages,
+        "start_page": start_page,
+        "contacts": round(contacts),
+        "cache_hit_rate": {
+            "people": round(people_hit_rate, 3),
+            "organizations": round(org_hit_rate, 3),
+        },
+        "calls": calls,
+        "credits": credits,
+        "budget": status,
+    }
+
+
+def budget_stop_note(budget: CreditBudget, writer, plan: Optional[dict] = None) -> str:
+    """Note written into a partial export (ExportWriter) when its budget ran out."""
+    note = "Export stopped early: %s after %s companies" % (
+        budget.exhausted,
+        writer.companies_written - writer.companies_failed,
+    )
+    if plan:
+        note += " of ~%s (planned ~%s credits)" % (
+            plan["companies"],
+            plan["credits"]["total"],
+        )
+    if writer.companies_failed:
+        note += (
+            "; %s companies have an Error and are incomplete" % writer.companies_failed
+        )
+    return note + ". This file is partial."
@@ -0,0 +1,266 @@
+"""
+Background export-all jobs.
+
+A job stores the search filters. A worker process (`python manage.py run_export_jobs`)
+claims queued jobs and runs the export-all pipeline, saving each finished company page
+(bundles + credits) as a checkpoint. A failed or interrupted job resumes after its
+last saved page instead of page 1. The ZIP is built from the saved pages on download,
+so nothing depends on the web request that started the job (serverless time limits).
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from config.instrumentation import call_group
+from config.metrics import EXPORT_JOBS
+
+from .credit_budget import CreditBudget, CreditBudgetExceeded, flush_credits, use_budget
+from .models import ExportJob, ExportJobPage
+from .records import as_dicts
+
+logger = logging.getLogger(__name__)
+
+# A running job not updated for this long is treated as dead (worker crashed/timed out)
+# and can be resumed or reclaimed by a worker.
+EXPORT_JOB_STALE_SECONDS = int(os.getenv("EXPORT_JOB_STALE_SECONDS", "600"))
+# While a job runs, its worker bumps updated_at this often (also in the middle of a
+# slow page), so a live job never looks stale.
+EXPORT_JOB_HEARTBEAT_SECONDS = max(
+    1,
+    int(
+        os.getenv(
+            "EXPORT_JOB_HEARTBEAT_SECONDS", str(max(1, EXPORT_JOB_STALE_SECONDS // 4))
+        )
+    ),
+)
+# Run jobs in a thread of the web process (runserver, no separate worker).
+EXPORT_JOBS_RUN_INLINE = os.getenv("EXPORT_JOBS_RUN_INLINE", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=EXPORT_JOB_STALE_SECONDS)
+
+
+def create_export_job(filters: dict) -> ExportJob:
+    """Queue an export-all job for the given (cleaned) company search filters."""
+    job = ExportJob.objects.create(filters=filters)
+    if EXPORT_JOBS_RUN_INLINE:
+        start_inline(job.pk)
+    return job
+
+
+def claim_job(job_id) -> bool:
+    """Atomically move a queued (or stale running) job to running. False if someone else has it."""
+    claimed = (
+        ExportJob.objects.filter(pk=job_id)
+        .filter(
+            Q(status=ExportJob.STATUS_QUEUED)
+            | Q(status=ExportJob.STATUS_RUNNING, updated_at__lt=_stale_cutoff())
+        )
+        .update(status=ExportJob.STATUS_RUNNING, error="", updated_at=timezone.now())
+    )
+    return claimed == 1
+
+
+def claim_next_job() -> Optional[ExportJob]:
+    """Claim the oldest queued job (or a stale running one). None if there is no work."""
+    candidates = ExportJob.objects.filter(
+        Q(status=ExportJob.STATUS_QUEUED)
+        | Q(status=ExportJob.STATUS_RUNNING, updated_at__lt=_stale_cutoff())
+    ).values_list("pk", flat=True)[:10]
+    for job_id in candidates:
+        if claim_job(job_id):
+            return ExportJob.objects.get(pk=job_id)
+    return None
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """Bump the running job's updated_at every EXPORT_JOB_HEARTBEAT_SECONDS until exit."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(EXPORT_JOB_HEARTBEAT_SECONDS):
+                try:
+                    ExportJob.objects.filter(
+                        pk=job_id, status=ExportJob.STATUS_RUNNING
+                    ).update(updated_at=timezone.now())
+                except DatabaseError as e:
+                    logger.warning("Export job %s heartbeat failed: %s", job_id, e)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(
+        target=beat, name="export-job-heartbeat-%s" % job_id, daemon=True
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _page_credits(item: dict) -> int:
+    from .views import CREDITS_COMPANY_SEARCH
+
+    return (
+        item.get("page_credits", CREDITS_COMPANY_SEARCH)
+        + (item.get("search_credits") or 0)
+        + sum(
+            (b.get("tech_credits") or 0) + (b.get("people_credits") or 0)
+            for b in item["bundles"]
+        )
+    )
+
+
+def run_export_job(job: ExportJob) -> None:
+    """
+    Run (or continue) a claimed job from the page after its checkpoint. Credits of
+    already saved pages count against the per-export budget; when a budget runs out,
+    the page in progress is not saved and the job fails with a resumable error.
+    """
+    from .views import _iter_export_pages
+
+    filters = job.filters or {}
+    job_titles = filters.get("job_titles") or []
+    seniorities = filters.get("seniorities") or []
+    start_page = job.last_page + 1
+    budget = CreditBudget(spent=job.credits_spent)
+    logger.info("Export job %s: starting at page %s", job.pk, start_page)
+    with (
+        call_group("job", "export %s" % job.pk),
+        use_budget(budget),
+        _heartbeat(job.pk),
+    ):
+        try:
+            for item in _iter_export_pages(
+                filters, job_titles, seniorities, start_page=start_page
+            ):
+                if item.get("plan"):
+                    ExportJob.objects.filter(pk=job.pk).update(plan=item["plan"])
+                if item.get("budget") or budget.exhausted:
+                    raise CreditBudgetExceeded(
+                        "%s; resume continues from page %s"
+                        % (budget.exhausted, item["page"])
+                    )
+                if item.get("error"):
+                    raise RuntimeError(
+                        "company search page %s: %s" % (item["page"], item["error"])
+                    )
+                # People are records in the pipeline; the checkpoint is JSON.
+                bundles = [
+                    dict(b, people=as_dicts(b.get("people") or []))
+                    for b in item["bundles"]
+                ]
+                credits = _page_credits(item)
+                total_pages = (item.get("pagination") or {}).get("total_pages")
+                with transaction.atomic():
+                    ExportJobPage.objects.update_or_create(
+                        job=job,
+                        page=item["page"],
+                        defaults={"bundles": bundles, "credits": credits},
+                    )
+                    ExportJob.objects.filter(pk=job.pk).update(
+                        last_page=item["page"],
+                        pages_done=F("pages_done") + 1,
+                        companies_done=F("companies_done") + len(bundles),
+                        credits_spent=F("credits_spent") + credits,
+                        total_pages=total_pages or F("total_pages"),
+                        updated_at=timezone.now(),
+                    )
+            ExportJob.objects.filter(pk=job.pk).update(
+                status=ExportJob.STATUS_DONE,
+                finished_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            EXPORT_JOBS.inc(outcome="done")
+            logger.info("Export job %s: done", job.pk)
+        except CreditBudgetExceeded as e:
+            EXPORT_JOBS.inc(outcome="budget")
+            logger.warning("Export job %s stopped: %s", job.pk, e)
+            ExportJob.objects.filter(pk=job.pk).update(
+                status=ExportJob.STATUS_FAILED,
+                error="Credit budget: %s" % e,
+                updated_at=timezone.now(),
+            )
+        except Exception as e:
+            EXPORT_JOBS.inc(outcome="failed")
+            logger.exception("Export job %s failed: %s", job.pk, e)
+            ExportJob.objects.filter(pk=job.pk).update(
+                status=ExportJob.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+            )
+        finally:
+            flush_credits()
+
+
+def _run_inline(job_id) -> None:
+    try:
+        if claim_job(job_id):
+            run_export_job(ExportJob.objects.get(pk=job_id))
+    finally:
+        connections.close_all()
+
+
+def start_inline(job_id) -> None:
+    """Run a job in a background thread of this process (EXPORT_JOBS_RUN_INLINE)."""
+    threading.Thread(
+        target=_run_inline, args=(job_id,), name="export-job-%s" % job_id, daemon=True
+    ).start()
+
+
+def resume_export_job(job: ExportJob) -> bool:
+    """Re-queue a failed (or stale running) job; it continues after its last saved page."""
+    resumed = (
+        ExportJob.objects.filter(pk=job.pk)
+        .filter(
+            Q(status=ExportJob.STATUS_FAILED)
+            | Q(status=ExportJob.STATUS_RUNNING, updated_at__lt=_stale_cutoff())
+        )
+        .update(status=ExportJob.STATUS_QUEUED, error="", updated_at=timezone.now())
+    )
+    if resumed and EXPORT_JOBS_RUN_INLINE:
+        start_inline(job.pk)
+    return resumed == 1
+
+
+def iter_job_bundles(job: ExportJob):
+    """Saved bundles of a job in page order, loading one page at a time."""
+    pages = job.pages.order_by("page").values_list("bundles", flat=True)
+    for bundles in pages.iterator(chunk_size=1):
+        yield from bundles
+
+
+def job_progress(job: ExportJob) -> dict:
+    """Progress payload for the job status endpoint."""
+    return {
+        "job_id": str(job.pk),
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "total_pages": job.total_pages,
+        "last_page": job.last_page,
+        "companies_done": job.companies_done,
+        "credits_spent": job.credits_spent,
+        "plan": job.plan,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "progress_url": reverse("api_export_job", args=[job.pk]),
+        "resume_url": reverse("api_export_job_resume", args=[job.pk]),
+        "download_url": reverse("export_job_download", args=[job.pk]),
+    }
@@ -0,0 +1,205 @@
+"""
+Streaming export: write-only Excel workbooks zipped straight into the HTTP response.
+
+Rows are written to openpyxl write-only sheets (backed by temp files, not kept in
+memory) as company bundles arrive. iter_zip() then streams the ZIP in chunks, so
+peak memory does not grow with the number of contacts exported.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from openpyxl import Workbook
+
+from config.metrics import (
+    EXPORT_BUNDLES,
+    EXPORT_ERRORS,
+    EXPORT_ROWS,
+    EXPORT_SECONDS,
+    EXPORTS,
+)
+
+CONTACTS_FILENAME = "companies_contacts.xlsx"
+TECHNOLOGIES_FILENAME = "companies_technologies.xlsx"
+CONTACTS_HEADER = [
+    "Company Name",
+    "Company Country",
+    "Name",
+    "Email",
+    "LinkedIn",
+    "Job Title",
+    "Seniority",
+    "Location",
+    "Error",
+]
+TECHNOLOGIES_HEADER = ["Company Name", "Technologies", "Error"]
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _format_person_location(p: dict) -> str:
+    return (
+        ", ".join(filter(None, [p.get("city"), p.get("state"), p.get("country")])) or ""
+    )
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer: zipfile writes into it, iter_zip() drains it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportWriter:
+    """Contacts + Technologies workbooks in write-only mode, streamed out as one ZIP."""
+
+    def __init__(self):
+        self.wb_contacts = Workbook(write_only=True)
+        self.ws_contacts = self.wb_contacts.create_sheet("Contacts")
+        self.ws_contacts.append(CONTACTS_HEADER)
+        self.wb_technologies = Workbook(write_only=True)
+        self.ws_tech = self.wb_technologies.create_sheet("Technologies")
+        self.ws_tech.column_dimensions["A"].width = 30
+        self.ws_tech.column_dimensions["B"].width = 120
+        self.ws_tech.append(TECHNOLOGIES_HEADER)
+        self.companies_written = 0
+        self.companies_failed = 0
+        self.contact_rows_written = 0
+        self.contacts_truncated = 0
+
+    def append_error(self, error: str) -> None:
+        """Export-level error (not tied to one company), e.g. a failed search page."""
+        self.ws_contacts.append(["", "", "", "", "", "", "", "", error])
+        EXPORT_ERRORS.inc()
+
+    def append_note(self, note: str) -> None:
+        """Export-level note in the last column, e.g. that the export stopped early."""
+        self.ws_contacts.append(["", "", "", "", "", "", "", "", note])
+
+    def append_bundle(self, bundle: dict) -> None:
+        """Write one company bundle into Contacts + Technologies sheets (error column if failed)."""
+        rows_before = self.contact_rows_written
+        self._append_bundle(bundle)
+        failed = bool((bundle.get("error") or "").strip())
+        self.companies_failed += failed
+        EXPORT_BUNDLES.inc(result="error" if failed else "ok")
+        EXPORT_ROWS.inc(self.contact_rows_written - rows_before, sheet="contacts")
+        EXPORT_ROWS.inc(sheet="technologies")
+
+    def _append_bundle(self, bundle: dict) -> None:
+        cname = bundle.get("cname") or ""
+        country = bundle.get("company_country") or ""
+        error = (bundle.get("error") or "").strip()
+        self.companies_written += 1
+        if error:
+            self.ws_contacts.append([cname, country, "", "", "", "", "", "", error])
+            self.ws_tech.append([cname, "", error])
+            self.contact_rows_written += 1
+            return
+        self.ws_tech.append([cname, bundle.get("technologies") or "", ""])
+        people = bundle.get("people") or []
+        if not people:
+            self.ws_contacts.append([cname, country, "", "", "", "", "", "", ""])
+            self.contact_rows_written += 1
+            return
+        for p in people:
+            self.ws_contacts.append(
+                [
+                    cname,
+                    country,
+                    p.get("name") or "",
+                    p.get("email") or "",
+                    p.get("linkedin_url") or "",
+                    p.get("title") or "",
+                    p.get("seniority") or "",
+                    _format_person_location(p),
+                    "",
+                ]
+            )
+        self.contact_rows_written += len(people)
+        truncated = bundle.get("people_truncated") or 0
+        if truncated:
+            self.contacts_truncated += truncated
+            self.ws_contacts.append(
+                [
+                    cname,
+                    country,
+                    "",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "%s more contacts not exported (per-company cap)" % truncated,
+                ]
+            )
+            self.contact_rows_written += 1
+
+    def iter_zip(self, fill=None, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Yield the export ZIP in chunks. If `fill` is given it is called with this
+        writer before the workbooks are saved (e.g. to run the export pipeline), after
+        the first ZIP bytes have already been sent, so the client gets its first byte
+        right away instead of when the whole export is done.
+        """
+        sink = _ZipSink()
+        tmp_dir = tempfile.mkdtemp(prefix="apollo_export_")
+        started = time.monotonic()
+        EXPORTS.inc(outcome="started")
+        try:
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+                contacts_entry = zf.open(CONTACTS_FILENAME, "w", force_zip64=True)
+                try:
+                    yield sink.drain()
+                    if fill is not None:
+                        fill(self)
+                except BaseException:
+                    # ZipFile refuses to close with an entry open, which would hide
+                    # the real error (or the client disconnect) behind a ValueError.
+                    contacts_entry.close()
+                    raise
+                for wb, name, entry in (
+                    (self.wb_contacts, CONTACTS_FILENAME, contacts_entry),
+                    (self.wb_technologies, TECHNOLOGIES_FILENAME, None),
+                ):
+                    path = os.path.join(tmp_dir, name)
+                    wb.save(path)
+                    if entry is None:
+                        entry = zf.open(name, "w", force_zip64=True)
+                    with entry, open(path, "rb") as src:
+                        while True:
+                            block = src.read(chunk_size)
+                            if not block:
+                                break
+                            entry.write(block)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                    os.remove(path)
+            yield sink.drain()
+        except GeneratorExit:
+            EXPORTS.inc(outcome="aborted")
+            raise
+        except BaseException:
+            EXPORTS.inc(outcome="failed")
+            raise
+        else:
+            EXPORTS.inc(outcome="completed")
+            EXPORT_SECONDS.observe(time.monotonic() - started)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
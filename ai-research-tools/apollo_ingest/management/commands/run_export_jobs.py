@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apollo_ingest.export_jobs import claim_next_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Worker for background export-all jobs: claims queued jobs and runs them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no queued job is left instead of polling.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls when idle (default 5).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Export worker started")
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+            self.stdout.write(
+                "Running export job %s (from page %s)" % (job.pk, job.last_page + 1)
+            )
+            run_export_job(job)
+            job.refresh_from_db()
+            self.stdout.write(
+                "Export job %s %s: %s pages, %s companies, %s credits"
+                % (
+                    job.pk,
+                    job.status,
+                    job.pages_done,
+                    job.companies_done,
+                    job.credits_spent,
+                )
+            )
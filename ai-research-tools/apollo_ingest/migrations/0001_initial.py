@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrichedPerson',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('apollo_id', models.CharField(max_length=64, unique=True)),
+                ('data', models.JSONField()),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-fetched_at'],
+            },
+        ),
+    ]
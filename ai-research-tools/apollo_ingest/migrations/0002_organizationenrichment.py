@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apollo_ingest', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationEnrichment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('apollo_id', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('domain', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('data', models.JSONField()),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-fetched_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apollo_ingest', '0003_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('credits', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='plan',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apollo_ingest', '0004_creditledger_exportjob_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanySearchSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('payload', models.JSONField()),
+                ('company_ids', models.JSONField(default=list)),
+                ('pagination', models.JSONField(default=dict)),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-fetched_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('apollo_id', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('domain', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('country', models.CharField(blank=True, db_index=True, max_length=128)),
+                ('industry', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('estimated_num_employees', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+                ('annual_revenue', models.FloatField(blank=True, db_index=True, null=True)),
+                ('funding_stage', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('keywords', models.JSONField(blank=True, default=list)),
+                ('data', models.JSONField()),
+                ('first_seen_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'companies',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['country', 'industry'], name='company_country_industry')],
+            },
+        ),
+    ]
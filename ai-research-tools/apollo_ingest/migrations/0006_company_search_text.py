@@ -0,0 +1,116 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:43
+
+from django.db import DatabaseError, migrations, models, transaction
+
+# SQLite: external-content FTS5 table over apollo_ingest_company.search_text, kept in
+# sync by triggers (bulk upserts fire the insert/update triggers).
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE apollo_ingest_company_fts USING fts5("
+    "search_text, content='apollo_ingest_company', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER apollo_ingest_company_fts_ai AFTER INSERT ON apollo_ingest_company BEGIN "
+    "INSERT INTO apollo_ingest_company_fts(rowid, search_text) VALUES (new.id, new.search_text); "
+    "END",
+    "CREATE TRIGGER apollo_ingest_company_fts_ad AFTER DELETE ON apollo_ingest_company BEGIN "
+    "INSERT INTO apollo_ingest_company_fts(apollo_ingest_company_fts, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); "
+    "END",
+    "CREATE TRIGGER apollo_ingest_company_fts_au AFTER UPDATE OF search_text ON apollo_ingest_company BEGIN "
+    "INSERT INTO apollo_ingest_company_fts(apollo_ingest_company_fts, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO apollo_ingest_company_fts(rowid, search_text) VALUES (new.id, new.search_text); "
+    "END",
+    "INSERT INTO apollo_ingest_company_fts(apollo_ingest_company_fts) VALUES ('rebuild')",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS apollo_ingest_company_fts_ai",
+    "DROP TRIGGER IF EXISTS apollo_ingest_company_fts_ad",
+    "DROP TRIGGER IF EXISTS apollo_ingest_company_fts_au",
+    "DROP TABLE IF EXISTS apollo_ingest_company_fts",
+]
+# Postgres: GIN index on the same expression warehouse_search matches against.
+POSTGRES_FTS = [
+    "CREATE INDEX apollo_ingest_company_search_tsv ON apollo_ingest_company "
+    "USING GIN (to_tsvector('simple', search_text))",
+]
+POSTGRES_FTS_DROP = ["DROP INDEX IF EXISTS apollo_ingest_company_search_tsv"]
+# HQ + office address fields of an Apollo company (searchable_location_string).
+LOCATION_FIELDS = (
+    "organization_raw_address",
+    "raw_address",
+    "organization_city",
+    "organization_state",
+    "organization_country",
+    "city",
+    "state",
+    "country",
+)
+BATCH_SIZE = 500
+
+
+def company_search_text(acc):
+    """records.company_search_text as of this migration (kept here, not imported)."""
+    location = " ".join(
+        str(acc[field]).strip() for field in LOCATION_FIELDS if acc.get(field)
+    ).lower()
+    parts = [acc.get("name"), acc.get("primary_domain"), acc.get("industry")]
+    parts.extend(acc.get("keywords") or [])
+    parts.append(location)
+    return " ".join(str(p).strip() for p in parts if p).lower()
+
+
+def fill_search_text(apps, schema_editor):
+    Company = apps.get_model("apollo_ingest", "Company")
+    batch = []
+    for company in Company.objects.only("id", "data").iterator(chunk_size=BATCH_SIZE):
+        company.search_text = company_search_text(company.data or {})
+        batch.append(company)
+        if len(batch) >= BATCH_SIZE:
+            Company.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Company.objects.bulk_update(batch, ["search_text"])
+
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def create_fts_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FTS)
+    elif vendor == "sqlite":
+        # SQLite builds without FTS5: no index, warehouse_search falls back to LIKE.
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                _run(schema_editor, SQLITE_FTS)
+        except DatabaseError:
+            pass
+
+
+def drop_fts_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FTS_DROP)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_FTS_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apollo_ingest', '0005_company_companysearchsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='search_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
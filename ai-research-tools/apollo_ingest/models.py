@@ -1,3 +1,153 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class EnrichedPerson(models.Model):
+    """Cached people/bulk_match result for one Apollo person id."""
+
+    apollo_id = models.CharField(max_length=64, unique=True)
+    data = models.JSONField()
+    fetched_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-fetched_at"]
+
+    def __str__(self):
+        return self.apollo_id
+
+
+class OrganizationEnrichment(models.Model):
+    """Cached organizations/enrich (or organizations/{id}) result."""
+
+    apollo_id = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    domain = models.CharField(max_length=255, blank=True, db_index=True)
+    data = models.JSONField()
+    fetched_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-fetched_at"]
+
+    def __str__(self):
+        return self.domain or self.apollo_id or "?"
+
+
+class ExportJob(models.Model):
+    """Background export-all run. Progress is checkpointed after every company page."""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True
+    )
+    filters = models.JSONField()
+    total_pages = models.PositiveIntegerField(null=True, blank=True)
+    # Checkpoint: last company page whose bundles are saved (resume starts after it).
+    last_page = models.PositiveIntegerField(default=0)
+    pages_done = models.PositiveIntegerField(default=0)
+    companies_done = models.PositiveIntegerField(default=0)
+    credits_spent = models.PositiveIntegerField(default=0)
+    # credit_budget.plan_export() estimate from the first page of the run.
+    plan = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return "%s (%s)" % (self.id, self.status)
+
+
+class ExportJobPage(models.Model):
+    """Finished company page of an ExportJob: the bundles written for that page."""
+
+    job = models.ForeignKey(ExportJob, on_delete=models.CASCADE, related_name="pages")
+    page = models.PositiveIntegerField()
+    bundles = models.JSONField()
+    credits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["job", "page"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "page"], name="unique_export_job_page"
+            )
+        ]
+
+
+class CreditLedger(models.Model):
+    """Estimated Apollo credits logged per (UTC) day, across the app. Daily budget source."""
+
+    day = models.DateField(unique=True)
+    credits = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-day"]
+
+    def __str__(self):
+        return "%s: %s" % (self.day, self.credits)
+
+
+class Company(models.Model):
+    """
+    Local warehouse: every company returned by mixed_companies/search, upserted in
+    bulk (company_warehouse). Filter columns are indexed; `data` is the raw Apollo row.
+    """
+
+    apollo_id = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    domain = models.CharField(max_length=255, blank=True, db_index=True)
+    country = models.CharField(max_length=128, blank=True, db_index=True)
+    industry = models.CharField(max_length=255, blank=True, db_index=True)
+    estimated_num_employees = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    annual_revenue = models.FloatField(null=True, blank=True, db_index=True)
+    funding_stage = models.CharField(max_length=64, blank=True, db_index=True)
+    keywords = models.JSONField(default=list, blank=True)
+    # Indexed for full-text search (warehouse_search): FTS5 on SQLite, tsvector on Postgres.
+    search_text = models.TextField(blank=True, default="")
+    data = models.JSONField()
+    first_seen_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "companies"
+        indexes = [
+            models.Index(fields=["country", "industry"], name="company_country_industry")
+        ]
+
+    def __str__(self):
+        return self.name or self.domain or self.apollo_id
+
+
+class CompanySearchSnapshot(models.Model):
+    """One company search page as Apollo answered it: ordered company ids + pagination."""
+
+    key = models.CharField(max_length=64, unique=True)
+    payload = models.JSONField()
+    company_ids = models.JSONField(default=list)
+    pagination = models.JSONField(default=dict)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-fetched_at"]
+
+    def __str__(self):
+        return "%s (page %s)" % (self.key[:12], self.payload.get("page"))
@@ -0,0 +1,73 @@
+"""
+Canonical form of Apollo search payloads, for cache and single-flight keys.
+
+Two payloads that Apollo answers the same way should get the same key: dict keys
+in a fixed order, list filters sorted and de-duplicated (Apollo treats them as
+sets), text filters stripped and case-folded, empty filters dropped.
+"""
+
+import hashlib
+import json
+
+# Free-text filters Apollo matches case-insensitively. IDs and codes keep their case.
+CASE_INSENSITIVE_KEYS = frozenset(
+    {
+        "q_organization_name",
+        "q_organization_domains_list",
+        "organization_locations",
+        "organization_not_locations",
+        "q_organization_keyword_tags",
+        "q_not_organization_keyword_tags",
+        "q_organization_job_titles",
+        "organization_job_locations",
+        "person_titles",
+        "person_locations",
+        "q_keywords",
+    }
+)
+
+
+def _canonical_scalar(value, fold: bool):
+    if isinstance(value, str):
+        value = value.strip()
+        return value.casefold() if fold else value
+    return value
+
+
+def _canonical_value(key: str, value):
+    fold = key in CASE_INSENSITIVE_KEYS
+    if isinstance(value, dict):
+        return canonical_payload(value)
+    if isinstance(value, (list, tuple, set)):
+        items = [_canonical_scalar(v, fold) for v in value]
+        items = [v for v in items if v not in (None, "")]
+        if all(isinstance(v, (str, int, float)) for v in items):
+            return sorted(set(items), key=lambda v: (type(v).__name__, v))
+        return items
+    return _canonical_scalar(value, fold)
+
+
+def canonical_payload(payload: dict) -> dict:
+    """Normalized copy of a search payload (see module docstring)."""
+    out = {}
+    for key in sorted(payload):
+        value = _canonical_value(key, payload[key])
+        if value in (None, "", [], {}):
+            continue
+        out[key] = value
+    return out
+
+
+class CanonicalPayload(dict):
+    """
+    A payload already in canonical form (built by payload_spec), so payload_key()
+    hashes it as is. Copies such as dict(payload, page=2) are plain dicts again.
+    """
+
+
+def payload_key(payload: dict) -> str:
+    """Stable hash of canonical_payload(payload)."""
+    if not isinstance(payload, CanonicalPayload):
+        payload = canonical_payload(payload)
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
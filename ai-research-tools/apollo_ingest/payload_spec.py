@@ -0,0 +1,179 @@
+"""
+Apollo search payloads from a declarative filter spec.
+
+COMPANY_FILTERS and PEOPLE_FILTERS list each search filter once: the form/serializer
+fields it reads, the Apollo key it fills, and how the value is parsed. compile_spec()
+turns a spec into a builder. The filter part of the payload is built once per
+distinct filter set (memoized, PAYLOAD_CACHE_SIZE entries) and only paging is
+applied per call, so an export-all does not re-parse its filters for every page.
+
+Builders return a payload_keys.CanonicalPayload: keys sorted, list filters sorted
+and de-duplicated, free text case-folded, empty filters dropped. Apollo answers
+the canonical form the same way (see payload_keys), so the payload that is sent is
+also its own cache / single-flight key and payload_key() does not canonicalize it
+again.
+"""
+
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from .payload_keys import CanonicalPayload, canonical_payload
+
+PAYLOAD_CACHE_SIZE = max(0, int(os.getenv("APOLLO_PAYLOAD_CACHE_SIZE", "256")))
+MAX_PER_PAGE = 100
+
+# key: Apollo payload key. sources: request fields read, in order. parse(*values)
+# gets one value per source and returns the Apollo value (None/empty = not sent).
+Filter = namedtuple("Filter", "key sources parse")
+
+
+def _items(value, sep=None) -> list:
+    """Stripped, non-empty items of a list, or of a string split on sep (sep=None: one item)."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        parts = value.split(sep) if sep else [value]
+    elif isinstance(value, (list, tuple, set)):
+        parts = value
+    else:
+        parts = [value]
+    return [str(p).strip() for p in parts if p is not None and str(p).strip()]
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else None
+
+
+def _csv(value) -> list:
+    return _items(value, ",")
+
+
+def _first(parse):
+    """Several request fields for the same filter: the first one that parses to a value."""
+
+    def first(*values):
+        for value in values:
+            parsed = parse(value)
+            if parsed:
+                return parsed
+        return None
+
+    return first
+
+
+def _employee_ranges(ranges, employees_min, employees_max) -> list:
+    # "min,max;min,max" or a list from the form; else one range from min/max.
+    if ranges:
+        return _items(ranges, ";")
+    if employees_min is None and employees_max is None:
+        return []
+    low = employees_min if employees_min is not None else 1
+    high = employees_max if employees_max is not None else 1000000
+    return ["%s,%s" % (low, high)]
+
+
+def _revenue_range(revenue_min, revenue_max):
+    # Values in millions, as entered in the form.
+    if revenue_min is None and revenue_max is None:
+        return None
+    return {
+        "min": revenue_min if revenue_min is not None else 0,
+        "max": revenue_max if revenue_max is not None else 999999,
+    }
+
+
+# mixed_companies/search. Job titles and seniorities are people filters: not sent.
+COMPANY_FILTERS = (
+    Filter("q_organization_name", ("company_name",), _text),
+    Filter("q_organization_domains_list", ("domains",), _csv),
+    Filter("organization_locations", ("locations_included",), _csv),
+    Filter("organization_not_locations", ("locations_excluded",), _csv),
+    Filter(
+        "organization_num_employees_ranges",
+        ("employee_ranges", "employees_min", "employees_max"),
+        _employee_ranges,
+    ),
+    Filter("revenue_range", ("revenue_min", "revenue_max"), _revenue_range),
+    Filter("q_organization_keyword_tags", ("organization_keyword",), _csv),
+    Filter("q_not_organization_keyword_tags", ("organization_keyword_exclude",), _csv),
+    Filter("organization_latest_funding_stage_cd", ("funding_stages",), _csv),
+    Filter(
+        "q_organization_job_titles",
+        ("q_organization_job_titles", "organization_job_titles"),
+        _first(_csv),
+    ),
+    Filter("organization_job_locations", ("organization_job_locations",), _csv),
+    Filter("lookalike_organization_ids", ("lookalike_organization_ids",), _csv),
+    Filter("organization_industry_tag_ids", ("industries",), _csv),
+    Filter("organization_not_industry_tag_ids", ("industries_exclude",), _csv),
+)
+
+# mixed_people/api_search. Seniorities are values (c_suite, vp, owner, ...).
+PEOPLE_FILTERS = (
+    Filter("organization_ids", ("organization_ids", "organization_id"), _first(_items)),
+    Filter("q_organization_domains_list", ("domains",), _csv),
+    Filter("person_titles", ("job_titles",), _items),
+    Filter("person_seniorities", ("seniorities",), _items),
+)
+
+
+def _freeze(value):
+    """Hashable stand-in for a request value (lists -> tuples), for the memo key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _paging(data: dict) -> dict:
+    try:
+        page = int(data.get("page") or 1)
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        per_page = min(int(data.get("per_page") or 25), MAX_PER_PAGE)
+    except (TypeError, ValueError):
+        per_page = 25
+    return {"page": max(1, page), "per_page": max(1, per_page)}
+
+
+def compile_spec(filters: tuple):
+    """
+    Builder for a filter spec: build(data) -> CanonicalPayload with the spec's filters
+    plus page/per_page (per_page at most MAX_PER_PAGE). Treat the result as read-only:
+    list values are shared by every payload of the same filter set.
+    """
+    sources = tuple(dict.fromkeys(s for f in filters for s in f.sources))
+    index = {source: i for i, source in enumerate(sources)}
+    plan = tuple((f.key, tuple(index[s] for s in f.sources), f.parse) for f in filters)
+
+    def filter_payload(values: tuple) -> dict:
+        payload = {}
+        for key, positions, parse in plan:
+            value = parse(*(values[i] for i in positions))
+            if value:
+                payload[key] = value
+        return canonical_payload(payload)
+
+    cached_filter_payload = lru_cache(maxsize=PAYLOAD_CACHE_SIZE)(filter_payload)
+
+    def build(data: dict) -> CanonicalPayload:
+        values = tuple(data.get(source) for source in sources)
+        try:
+            base = cached_filter_payload(tuple(_freeze(v) for v in values))
+        except TypeError:
+            # Unhashable request value: build without the memo.
+            base = filter_payload(values)
+        return CanonicalPayload(sorted({**base, **_paging(data)}.items()))
+
+    build.cache_info = cached_filter_payload.cache_info
+    build.cache_clear = cached_filter_payload.cache_clear
+    return build
+
+
+build_company_search_payload = compile_spec(COMPANY_FILTERS)
+build_people_search_payload = compile_spec(PEOPLE_FILTERS)
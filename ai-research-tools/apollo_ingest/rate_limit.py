@@ -0,0 +1,138 @@
+"""
+Process-wide rate limiting and retry backoff for Apollo API calls.
+
+Each Apollo endpoint family gets its own token bucket (requests per minute),
+shared by every thread in the process. A 429 from Apollo pauses that bucket
+for the Retry-After period so all workers back off together.
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+# Budgets in requests/minute. Override per endpoint via env, e.g.
+# APOLLO_RATE_LIMIT_BULK_MATCH=60. 0 disables limiting for that endpoint.
+DEFAULT_RATE_LIMITS = {
+    "mixed_companies": 100,
+    "api_search": 100,
+    "bulk_match": 100,
+    "organizations_enrich": 100,
+    "tags": 60,
+}
+# Bucket size = this many seconds of budget (allows short bursts).
+BURST_SECONDS = float(os.getenv("APOLLO_RATE_LIMIT_BURST_SECONDS", "10"))
+
+# Backoff for 429 / 5xx / timeouts: exponential with full jitter, capped.
+BACKOFF_BASE_SECONDS = float(os.getenv("APOLLO_BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("APOLLO_BACKOFF_MAX_SECONDS", "60"))
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes a token immediately and returns
+    how long the caller must wait before using it (0 if a token was available).
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds` (e.g. after a 429 Retry-After)."""
+        if seconds <= 0 or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            # Token debt sized so the next reserve() waits exactly `seconds`.
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+
+def _rate_for(key: str) -> float:
+    env_key = "APOLLO_RATE_LIMIT_%s" % key.upper()
+    return float(os.getenv(env_key, DEFAULT_RATE_LIMITS.get(key, 100)))
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(key: str) -> TokenBucket:
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(_rate_for(key))
+                _buckets[key] = bucket
+    return bucket
+
+
+def limiter_key_for_url(url: str) -> str:
+    """Map an Apollo URL to its rate limit budget."""
+    if "mixed_companies" in url:
+        return "mixed_companies"
+    if "api_search" in url or "mixed_people" in url:
+        return "api_search"
+    if "bulk_match" in url:
+        return "bulk_match"
+    if "/organizations" in url:
+        return "organizations_enrich"
+    if "tags" in url:
+        return "tags"
+    return "default"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds (delta-seconds or HTTP date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retry `attempt` (0-based). Retry-After wins when given."""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2**attempt))
+    return random.uniform(0, ceiling)
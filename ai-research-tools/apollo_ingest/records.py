@@ -0,0 +1,246 @@
+"""
+Compact row types for Apollo companies and people.
+
+Records are __slots__ classes (no per-row __dict__) built straight from the Apollo
+response. The export pipeline passes them through to ExportWriter as they are;
+to_dict() is only called at the edges that need JSON (API responses, saved
+ExportJobPage bundles).
+
+They support the dict operations the pipeline already uses (get, [key],
+[key] = value, in), so helpers such as _merge_enriched_into_people and the writer
+take either records or plain dicts (e.g. companies posted to /api/export/companies/).
+Keys outside FIELDS are rejected like a typo would be, not stored.
+"""
+
+
+class _Record:
+    __slots__ = ()
+    FIELDS: tuple = ()
+    _field_set = frozenset()
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value) -> None:
+        if key not in self._field_set:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self._field_set
+
+    def keys(self) -> tuple:
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.FIELDS)
+
+    def __repr__(self) -> str:
+        return "%s(id=%r, name=%r)" % (
+            type(self).__name__,
+            self.get("id"),
+            self.get("name"),
+        )
+
+
+class CompanyRecord(_Record):
+    """One company from mixed_companies/search (fields of the /api/companies/search/ rows)."""
+
+    FIELDS = (
+        "id",
+        "name",
+        "primary_domain",
+        "logo_url",
+        "industry",
+        "estimated_num_employees",
+        "city",
+        "state",
+        "country",
+        "linkedin_url",
+        "founded_year",
+        "annual_revenue",
+        "annual_revenue_printed",
+        "phone",
+        "website_url",
+    )
+    _field_set = frozenset(FIELDS)
+    # _location: the raw HQ + office address fields, joined only when a response needs
+    # searchable_location_string.
+    __slots__ = FIELDS + ("_location",)
+
+    @classmethod
+    def from_apollo(cls, acc: dict) -> "CompanyRecord":
+        get = acc.get
+        self = cls.__new__(cls)
+        self.id = get("id")
+        self.name = get("name")
+        self.primary_domain = get("primary_domain")
+        self.logo_url = get("logo_url")
+        self.industry = get("industry")
+        self.estimated_num_employees = get("estimated_num_employees")
+        self.city = get("organization_city") or get("city")
+        self.state = get("organization_state") or get("state")
+        self.country = get("organization_country") or get("country")
+        self.linkedin_url = get("linkedin_url")
+        self.founded_year = get("founded_year")
+        self.annual_revenue = get("organization_revenue")
+        self.annual_revenue_printed = get("organization_revenue_printed")
+        self.phone = get("phone")
+        self.website_url = get("website_url")
+        self._location = (
+            get("organization_raw_address"),
+            get("raw_address"),
+            get("organization_city"),
+            get("organization_state"),
+            get("organization_country"),
+            get("city"),
+            get("state"),
+            get("country"),
+        )
+        return self
+
+    @property
+    def searchable_location_string(self) -> str:
+        """All location-related fields (HQ + other offices), lowercased, for search/filter."""
+        return " ".join(str(p).strip() for p in self._location if p).lower()
+
+    def to_dict(self) -> dict:
+        row = super().to_dict()
+        row["searchable_location_string"] = self.searchable_location_string
+        return row
+
+
+class PersonRecord(_Record):
+    """One person from mixed_people/api_search; enrichment fills email etc. in place."""
+
+    FIELDS = (
+        "id",
+        "first_name",
+        "last_name",
+        "name",
+        "email",
+        "title",
+        "seniority",
+        "city",
+        "state",
+        "country",
+        "linkedin_url",
+        "phone_numbers",
+        "organization_name",
+    )
+    _field_set = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_apollo(cls, person: dict) -> "PersonRecord":
+        get = person.get
+        self = cls.__new__(cls)
+        self.id = get("id")
+        self.first_name = get("first_name")
+        self.last_name = get("last_name")
+        self.name = (
+            get("name") or f"{get('first_name', '')} {get('last_name', '')}".strip()
+        )
+        self.email = get("email")
+        self.title = get("title")
+        self.seniority = get("seniority")
+        self.city = get("city")
+        self.state = get("state")
+        self.country = get("country")
+        self.linkedin_url = get("linkedin_url")
+        phones = get("phone_numbers")
+        self.phone_numbers = (
+            [p.get("sanitized_number") or p.get("raw_number") for p in phones if p]
+            if phones
+            else []
+        )
+        org = get("organization")
+        self.organization_name = org.get("name") if org else None
+        return self
+
+
+class ExportCompany(_Record):
+    """
+    A company as the export workers take it: id, name, domain and location from a
+    search page or the selection, plus the people found for it by the batched search
+    (prefetched_people None = not batched or not covered by the batch: fetch per
+    company).
+    """
+
+    FIELDS = (
+        "id",
+        "name",
+        "domain",
+        "country",
+        "city",
+        "state",
+        "people",
+        "prefetched_people",
+        "prefetched_truncated",
+    )
+    _field_set = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+    def __init__(
+        self, id=None, name=None, domain=None, country=None, city=None, state=None
+    ):
+        self.id = id
+        self.name = name
+        self.domain = domain
+        self.country = country
+        self.city = city
+        self.state = state
+        self.people = None
+        self.prefetched_people = None
+        self.prefetched_truncated = 0
+
+    @classmethod
+    def from_company(cls, company: CompanyRecord) -> "ExportCompany":
+        return cls(
+            id=company.id,
+            name=company.name,
+            domain=company.primary_domain,
+            country=company.country,
+            city=company.city,
+        )
+
+
+def company_records(accounts: list) -> list:
+    """CompanyRecords for the organizations/accounts of a company search response."""
+    from_apollo = CompanyRecord.from_apollo
+    return [from_apollo(acc) for acc in accounts]
+
+
+def company_search_text(acc: dict) -> str:
+    """
+    Full-text document for one Apollo company (warehouse search index): name, domain,
+    industry, keywords and searchable_location_string, lowercased.
+    """
+    record = CompanyRecord.from_apollo(acc)
+    parts = [record.name, record.primary_domain, record.industry]
+    parts.extend(acc.get("keywords") or [])
+    parts.append(record.searchable_location_string)
+    return " ".join(str(p).strip() for p in parts if p).lower()
+
+
+def person_records(people: list) -> list:
+    """PersonRecords for the people of a people search response."""
+    from_apollo = PersonRecord.from_apollo
+    return [from_apollo(person) for person in people]
+
+
+def as_dicts(rows: list) -> list:
+    """Rows for JSON: records converted with to_dict(), dicts passed through."""
+    return [row.to_dict() if isinstance(row, _Record) else row for row in rows]
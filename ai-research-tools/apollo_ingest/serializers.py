@@ -128,6 +128,78 @@ class CompanySearchResponseSerializer(serializers.Serializer):
     per_page = serializers.IntegerField()
 
 
+class StoredCompanySearchSerializer(serializers.Serializer):
+    """Serializer for search over companies already stored locally (no Apollo call)."""
+
+    q = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text="Words matched (as prefixes) against name, domain, industry, keywords and location",
+    )
+    countries = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text="Country names as stored (values of facets.country)",
+    )
+    industries = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text="Industry names as stored (values of facets.industry), not tag IDs",
+    )
+    employee_bands = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text='Employee bands (values of facets.employees, e.g. "11,50")',
+    )
+    funding_stages = serializers.ListField(
+        child=serializers.CharField(), required=False, help_text="Funding stages"
+    )
+    revenue_min = serializers.IntegerField(
+        required=False, min_value=0, help_text="Minimum revenue in millions USD"
+    )
+    revenue_max = serializers.IntegerField(
+        required=False, help_text="Maximum revenue in millions USD"
+    )
+    max_age_hours = serializers.FloatField(
+        required=False,
+        min_value=0,
+        help_text="Only companies Apollo returned within this many hours (0 = any age)",
+    )
+    page = serializers.IntegerField(
+        required=False, default=1, min_value=1, help_text="Page number"
+    )
+    per_page = serializers.IntegerField(
+        required=False,
+        default=25,
+        min_value=1,
+        max_value=100,
+        help_text="Results per page (max 100)",
+    )
+
+
+class FacetCountSerializer(serializers.Serializer):
+    """One facet value and how many stored companies match it."""
+
+    value = serializers.CharField()
+    label = serializers.CharField(required=False)
+    count = serializers.IntegerField()
+
+
+class CompanyFacetsSerializer(serializers.Serializer):
+    """Facet counts of a stored company search."""
+
+    country = FacetCountSerializer(many=True)
+    industry = FacetCountSerializer(many=True)
+    employees = FacetCountSerializer(many=True)
+
+
+class StoredCompanySearchResponseSerializer(CompanySearchResponseSerializer):
+    """Serializer for stored company search response."""
+
+    facets = CompanyFacetsSerializer()
+    source = serializers.CharField()
+
+
 class PeopleSearchSerializer(serializers.Serializer):
     """Serializer for people/contacts search request."""
 
@@ -0,0 +1,121 @@
+"""
+Single-flight for Apollo searches: identical requests in flight at the same time
+share one upstream call (and its credit) instead of each calling Apollo.
+
+Requests are identical when their payloads have the same canonical key
+(payload_keys.payload_key). The first caller makes the call; the others wait and
+get a copy of its parsed response, or its exception.
+"""
+
+import copy
+import os
+import threading
+
+# Set APOLLO_SINGLE_FLIGHT=0 to send every request upstream.
+SINGLE_FLIGHT_ENABLED = os.getenv("APOLLO_SINGLE_FLIGHT", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+_local = threading.local()
+
+
+def joined_last_call() -> bool:
+    """True if this thread's last single-flight call shared another caller's result (no credit spent)."""
+    return getattr(_local, "joined", False)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.calls = 0
+        self.upstream = 0
+        self.saved = 0
+
+    def do(self, key: str, fn):
+        """Return fn(), unless a call with `key` is already running: then wait for it and share its result."""
+        if not SINGLE_FLIGHT_ENABLED:
+            _local.joined = False
+            return fn()
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.upstream += 1
+            else:
+                self.saved += 1
+        _local.joined = not leader
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Callers may modify what they get back; the leader keeps the original.
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "upstream": self.upstream, "saved": self.saved}
+
+
+_flights: dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = SingleFlight(name)
+            _flights[name] = flight
+        return flight
+
+
+def single_flight_stats() -> dict:
+    """name -> {calls, upstream, saved} for every single-flight group."""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+def single_flight_metrics() -> list:
+    """Collector for config.metrics: calls made upstream vs. shared per group."""
+    stats = single_flight_stats()
+    return [
+        (
+            "apollo_single_flight_calls_total",
+            "counter",
+            "Searches by single-flight group: upstream = sent to Apollo, saved = shared a call in flight.",
+            [
+                ({"group": name, "result": result}, counts[result])
+                for name, counts in sorted(stats.items())
+                for result in ("upstream", "saved")
+            ],
+        )
+    ]
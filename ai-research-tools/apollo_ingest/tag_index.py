@@ -0,0 +1,170 @@
+"""
+In-memory tag index for /api/tags/search/, so known industries never hit Apollo.
+
+Built once from companies_form.INDUSTRIES_LIST and grown with the tags Apollo's
+tags/search returns. Lookups use a word-prefix map plus a trigram map (typos,
+partial words). A query is answered locally when it has a prefix/exact hit or was
+already sent to Apollo once; anything else falls through to Apollo.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Fuzzy (trigram) matches below this similarity are dropped.
+MIN_TRIGRAM_SIMILARITY = 0.3
+# A local answer is confident with a word-prefix hit or better, or a close typo.
+CONFIDENT_SCORE = 0.8
+CONFIDENT_TRIGRAM_SIMILARITY = 0.6
+# Trigram scores are similarity * this, so they always rank below prefix hits.
+TRIGRAM_WEIGHT = 0.7
+# Remote queries remembered as "known" (answered from the index next time).
+MAX_REMOTE_QUERIES = 5000
+
+_NON_WORD = re.compile(r"[^\w&]+")
+
+
+def normalize_tag_text(text: str) -> str:
+    """'  Banking/Finance ' -> 'banking finance'."""
+    return " ".join(_NON_WORD.sub(" ", (text or "").casefold()).split())
+
+
+def _trigrams(text: str) -> set:
+    padded = "  %s " % text
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TagIndex:
+    """Thread-safe prefix + trigram index over Apollo tags (id -> tag dict)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags: dict[str, dict] = {}
+        self._names: dict[str, str] = {}
+        self._prefixes: dict[str, set] = {}
+        self._trigrams: dict[str, set] = {}
+        self._gram_counts: dict[str, int] = {}
+        self._remote_queries = OrderedDict()
+
+    def __len__(self):
+        return len(self._tags)
+
+    def add(self, tag: dict) -> bool:
+        """Index one tag ({"id", "cleaned_name", ...}). False if it has no id/name."""
+        tag_id = str(tag.get("id") or "").strip()
+        name = normalize_tag_text(
+            tag.get("cleaned_name") or tag.get("tag_name_unanalyzed_downcase") or ""
+        )
+        if not tag_id or not name:
+            return False
+        with self._lock:
+            if tag_id in self._tags:
+                # Already indexed: just keep any extra fields Apollo sent.
+                self._tags[tag_id] = {**self._tags[tag_id], **tag}
+                return True
+            self._tags[tag_id] = tag
+            self._names[tag_id] = name
+            words = name.split()
+            for start in range(len(words)):
+                phrase = " ".join(words[start:])
+                for end in range(1, len(phrase) + 1):
+                    self._prefixes.setdefault(phrase[:end], set()).add(tag_id)
+            grams = _trigrams(name)
+            self._gram_counts[tag_id] = len(grams)
+            for gram in grams:
+                self._trigrams.setdefault(gram, set()).add(tag_id)
+        return True
+
+    def learn(self, tags: list, query: Optional[str] = None) -> int:
+        """Merge tags from a remote tags/search answer; remember `query` as known. Returns tags added."""
+        added = sum(1 for tag in tags or [] if self.add(tag))
+        q = normalize_tag_text(query or "")
+        if q:
+            with self._lock:
+                self._remote_queries[q] = True
+                self._remote_queries.move_to_end(q)
+                while len(self._remote_queries) > MAX_REMOTE_QUERIES:
+                    self._remote_queries.popitem(last=False)
+        return added
+
+    def search(self, query: str, limit: int = 25) -> list[tuple[float, dict]]:
+        """(score, tag) best first. 1.0 exact, 0.9 name prefix, 0.8 word prefix, else trigram similarity."""
+        q = normalize_tag_text(query)
+        if not q:
+            return []
+        with self._lock:
+            scores = {}
+            for tag_id in self._prefixes.get(q, ()):
+                name = self._names[tag_id]
+                scores[tag_id] = 1.0 if name == q else 0.9 if name.startswith(q) else 0.8
+            if len(q) >= 3:
+                q_grams = _trigrams(q)
+                shared = {}
+                for gram in q_grams:
+                    for tag_id in self._trigrams.get(gram, ()):
+                        shared[tag_id] = shared.get(tag_id, 0) + 1
+                for tag_id, common in shared.items():
+                    if tag_id in scores:
+                        continue
+                    union = len(q_grams) + self._gram_counts[tag_id] - common
+                    similarity = common / union
+                    if similarity >= MIN_TRIGRAM_SIMILARITY:
+                        scores[tag_id] = round(similarity * TRIGRAM_WEIGHT, 4)
+            ranked = sorted(
+                scores.items(), key=lambda item: (-item[1], self._names[item[0]])
+            )[:limit]
+            return [(score, self._tags[tag_id]) for tag_id, score in ranked]
+
+    def lookup(self, query: str, limit: int = 25) -> tuple[list[dict], bool]:
+        """(tags, known): known = answer locally, no need to ask Apollo."""
+        results = self.search(query, limit=limit)
+        q = normalize_tag_text(query)
+        with self._lock:
+            asked_before = q in self._remote_queries
+        best = results[0][0] if results else 0.0
+        known = (
+            asked_before
+            or best >= CONFIDENT_SCORE
+            or best >= CONFIDENT_TRIGRAM_SIMILARITY * TRIGRAM_WEIGHT
+        )
+        return [tag for _, tag in results], known
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tags": len(self._tags),
+                "prefixes": len(self._prefixes),
+                "trigrams": len(self._trigrams),
+                "remote_queries": len(self._remote_queries),
+            }
+
+
+_index: Optional[TagIndex] = None
+_index_lock = threading.Lock()
+
+
+def _build_index() -> TagIndex:
+    from .companies_form import INDUSTRIES_LIST
+
+    index = TagIndex()
+    for tag_id, name in INDUSTRIES_LIST:
+        index.add(
+            {
+                "id": tag_id,
+                "cleaned_name": name,
+                "tag_name_unanalyzed_downcase": name.lower(),
+                "kind": "linkedin_industry",
+            }
+        )
+    return index
+
+
+def get_tag_index() -> TagIndex:
+    """Process-wide index, built on first use (AppConfig.ready builds it at startup)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build_index()
+    return _index
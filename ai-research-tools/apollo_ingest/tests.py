@@ -1,3 +1,102 @@
+import asyncio
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from . import async_views, views
+
+
+def _person(i: int, org: str) -> dict:
+    return {
+        "id": "p%s" % i,
+        "first_name": "Person",
+        "last_name": str(i),
+        "organization_id": org,
+    }
+
+
+class TopLevelTotalsTests(TestCase):
+    """
+    mixed_people/api_search may report total_entries at the top level, with no
+    pagination block: every later page must still be fetched.
+    """
+
+    def search(self, people):
+        calls = []
+
+        def search_people(payload):
+            page = payload.get("page") or 1
+            per_page = payload.get("per_page") or 100
+            calls.append(page)
+            return {
+                "people": people[(page - 1) * per_page : page * per_page],
+                "total_entries": len(people),
+            }
+
+        return search_people, calls
+
+    def test_company_pages(self):
+        search_people, calls = self.search([_person(i, "a") for i in range(210)])
+        stats = {}
+        with mock.patch.object(views, "search_people", search_people):
+            pages = dict(
+                views.iter_company_people_pages("a", None, max_people=250, stats=stats)
+            )
+        self.assertEqual(sorted(calls), [1, 2, 3])
+        self.assertEqual(sum(len(p) for p in pages.values()), 210)
+        self.assertEqual(stats["total_entries"], 210)
+        self.assertEqual(stats["truncated"], 0)
+
+    def test_company_pages_truncated(self):
+        search_people, calls = self.search([_person(i, "a") for i in range(210)])
+        stats = {}
+        with mock.patch.object(views, "search_people", search_people):
+            pages = dict(
+                views.iter_company_people_pages("a", None, max_people=150, stats=stats)
+            )
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(sum(len(p) for p in pages.values()), 150)
+        self.assertEqual(stats["truncated"], 60)
+
+    def test_async_company_pages(self):
+        search_people, calls = self.search([_person(i, "a") for i in range(210)])
+
+        async def search_people_async(payload):
+            return search_people(payload)
+
+        async def enrich_people(people):
+            return 0, 0
+
+        with mock.patch.object(
+            async_views.apollo_async, "search_people", search_people_async
+        ), mock.patch.object(async_views, "enrich_people", enrich_people):
+            people, _credits, truncated = asyncio.run(
+                async_views.fetch_people_for_company("a", None, max_people=150)
+            )
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(len(people), 150)
+        self.assertEqual(truncated, 60)
+
+    def test_batched_search(self):
+        people = (
+            [_person(i, "b") for i in range(100)]
+            + [_person(100 + i, "a") for i in range(25)]
+            + [_person(200 + i, "c") for i in range(25)]
+        )
+        search_people, calls = self.search(people)
+        with mock.patch.object(
+            views, "search_people", search_people
+        ), mock.patch.object(
+            views, "get_cached_people_search", lambda payload: None
+        ), mock.patch.object(
+            views, "store_people_search", lambda payload, r: None
+        ):
+            by_org, search_calls, _credits = views.fetch_people_for_companies(
+                ["a", "b", "c"], per_company=1000
+            )
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(search_calls, 2)
+        self.assertEqual(
+            {org: len(found) for org, found in by_org.items()},
+            {"a": 25, "b": 100, "c": 25},
+        )
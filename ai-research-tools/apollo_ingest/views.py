@@ -1,19 +1,48 @@
-import io
+import functools
 import logging
 import os
-import zipfile
+import queue
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from django.http import HttpResponse
+from datetime import timedelta
+from typing import Optional
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
-from openpyxl import Workbook
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
 
+from config.instrumentation import bind_context, context_submit
+from config.metrics import APOLLO_CREDITS
+
 from .companies_form import CompanySearchForm
+from .credit_budget import (
+    CreditBudget,
+    CreditBudgetExceeded,
+    budget_stop_note,
+    credit_hold,
+    current_budget,
+    flush_credits,
+    plan_export,
+    record_credits,
+    use_budget,
+)
+from .export_jobs import (
+    create_export_job,
+    iter_job_bundles,
+    job_progress,
+    resume_export_job,
+)
+from .export_writer import ExportWriter
+from .company_warehouse import store_company_page
+from .models import ExportJob
+from .payload_spec import build_company_search_payload, build_people_search_payload
+from .records import ExportCompany, company_records, person_records
 from .apollo_defaults import default_form_initial
 from .apollo_service import (
     search_companies,
@@ -23,6 +52,22 @@ from .apollo_service import (
     enrich_organization,
     get_organization,
 )
+from .apollo_client import pool_stats
+from .single_flight import joined_last_call, single_flight_stats
+from .tag_index import get_tag_index
+from .warehouse_search import search_stored_companies
+from .apollo_cache import (
+    flush_organizations,
+    get_cached_company_search,
+    get_cached_organization,
+    get_cached_people,
+    get_cached_people_search,
+    org_cache_stats,
+    store_company_search,
+    store_enriched_people,
+    store_organization,
+    store_people_search,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,18 +77,49 @@ CREDITS_PEOPLE_SEARCH = 1
 CREDITS_TAGS_SEARCH = 0
 CREDITS_ENRICH_PER_PERSON = 1  # bulk_match: ~1 credit per contact
 CREDITS_ORG_ENRICH = 1  # organization enrich/get: ~1 credit per company
-# Parallel Apollo calls during export (I/O-bound). Keep modest to avoid rate limits.
+# Parallel Apollo calls during export (I/O-bound). Request rate is capped per endpoint
+# by rate_limit.py (APOLLO_RATE_LIMIT_*), so this only bounds concurrency.
 EXPORT_MAX_WORKERS = max(1, int(os.getenv("EXPORT_MAX_WORKERS", "8")))
+EXPORT_COMPANY_PAGE_SIZE = 100  # Apollo company search page size for export-all
+# Export-all pipeline depth: company pages fetched ahead / kept in flight at once.
+EXPORT_PREFETCH_PAGES = max(1, int(os.getenv("EXPORT_PREFETCH_PAGES", "2")))
+# Batched people search in export: org ids per api_search query (0 or 1 = per company)
+# and max result pages per query.
+PEOPLE_BATCH_ORG_IDS = max(0, int(os.getenv("APOLLO_PEOPLE_BATCH_ORG_IDS", "25")))
+PEOPLE_BATCH_MAX_PAGES = max(1, int(os.getenv("APOLLO_PEOPLE_BATCH_MAX_PAGES", "25")))
+# Contacts exported per company (people search pages of 100, pages after the first
+# fetched concurrently). Contacts over the cap are counted and noted in the export.
+PEOPLE_PER_COMPANY_MAX = max(1, int(os.getenv("APOLLO_PEOPLE_PER_COMPANY_MAX", "100")))
+PEOPLE_PAGE_WORKERS = max(1, int(os.getenv("APOLLO_PEOPLE_PAGE_WORKERS", "4")))
+
+
+# Running total of everything passed to log_apollo_credits (benchmarks, diagnostics).
+_credits_lock = threading.Lock()
+_credits_logged = {"calls": 0, "credits": 0}
+
+
+def credits_logged(reset: bool = False) -> dict:
+    """{calls, credits} logged by log_apollo_credits in this process; reset=True zeroes it."""
+    with _credits_lock:
+        totals = dict(_credits_logged)
+        if reset:
+            _credits_logged.update(calls=0, credits=0)
+    return totals
 
 
 def log_apollo_credits(endpoint_label: str, credits: int, detail: str = ""):
     """Log Apollo credits consumed for this API request (estimated)."""
-    msg = f"====== {endpoint_label}  Credits: {credits} ======"
+    with _credits_lock:
+        _credits_logged["calls"] += 1
+        _credits_logged["credits"] += credits or 0
+    if credits:
+        # Label is the call site ("get_people_for_company", "/api/companies/search/"), not its ids.
+        APOLLO_CREDITS.inc(credits, source=endpoint_label.split(" ", 1)[0])
+        record_credits(credits)
     if detail:
-        msg += f"  ({detail})"
-    logger.info(msg)
-    # Also print so it shows in runserver console
-    print(msg)
+        logger.info("====== %s  Credits: %s ======  (%s)", endpoint_label, credits, detail)
+    else:
+        logger.info("====== %s  Credits: %s ======", endpoint_label, credits)
 
 
 from .serializers import (
@@ -51,307 +127,58 @@ from .serializers import (
     CompanySearchResponseSerializer,
     PeopleSearchSerializer,
     PeopleSearchResponseSerializer,
+    StoredCompanySearchSerializer,
+    StoredCompanySearchResponseSerializer,
 )
 
 
 def normalize_companies(accounts: list) -> list:
     """Normalize Apollo API response to consistent format for UI."""
-    companies = []
-    for acc in accounts:
-        # All location-related fields (HQ + other offices) for search/filter
-        loc_parts = [
-            acc.get("organization_raw_address"),
-            acc.get("raw_address"),
-            acc.get("organization_city"),
-            acc.get("organization_state"),
-            acc.get("organization_country"),
-            acc.get("city"),
-            acc.get("state"),
-            acc.get("country"),
-        ]
-        searchable_location_string = " ".join(
-            str(p).strip() for p in loc_parts if p
-        ).lower()
-
-        companies.append(
-            {
-                "id": acc.get("id"),
-                "name": acc.get("name"),
-                "primary_domain": acc.get("primary_domain"),
-                "logo_url": acc.get("logo_url"),
-                "industry": acc.get("industry"),
-                "estimated_num_employees": acc.get("estimated_num_employees"),
-                "city": acc.get("organization_city") or acc.get("city"),
-                "state": acc.get("organization_state") or acc.get("state"),
-                "country": acc.get("organization_country") or acc.get("country"),
-                "searchable_location_string": searchable_location_string,
-                "linkedin_url": acc.get("linkedin_url"),
-                "founded_year": acc.get("founded_year"),
-                "annual_revenue": acc.get("organization_revenue"),
-                "annual_revenue_printed": acc.get("organization_revenue_printed"),
-                "phone": acc.get("phone"),
-                "website_url": acc.get("website_url"),
-            }
-        )
-    return companies
+    return [c.to_dict() for c in company_records(accounts)]
 
 
 def build_apollo_payload(data: dict) -> dict:
     """
     Build Apollo mixed_companies/search payload (organization search only).
     Job titles and seniorities are for people search only — not sent here.
+    Filters: payload_spec.COMPANY_FILTERS (memoized per filter set, canonical form).
     """
-    page = data.get("page") or 1
-    per_page = data.get("per_page") or 25
-    try:
-        page = int(page) if page is not None else 1
-    except (TypeError, ValueError):
-        page = 1
-    try:
-        per_page = min(int(per_page), 100) if per_page is not None else 25
-    except (TypeError, ValueError):
-        per_page = 25
-    payload = {"page": page, "per_page": per_page}
-
-    # Organization name
-    company_name = data.get("company_name")
-    if company_name and company_name.strip():
-        payload["q_organization_name"] = company_name.strip()
-
-    # Domains → q_organization_domains_list (array)
-    domains = data.get("domains")
-    if domains:
-        domain_list = [d.strip() for d in domains.split(",") if d.strip()]
-        if domain_list:
-            payload["q_organization_domains_list"] = domain_list
-
-    # Locations include – Apollo format: organization_locations array (lowercase, e.g. ["pakistan"])
-    locations_included = data.get("locations_included")
-    if locations_included:
-        if isinstance(locations_included, str):
-            loc_list = [
-                x.strip().lower() for x in locations_included.split(",") if x.strip()
-            ]
-        else:
-            loc_list = [
-                str(x).strip().lower() for x in locations_included if str(x).strip()
-            ]
-        if loc_list:
-            payload["organization_locations"] = loc_list
-
-    # Locations exclude – Apollo format: organization_not_locations array (lowercase, e.g. ["india"])
-    locations_excluded = data.get("locations_excluded")
-    if locations_excluded:
-        if isinstance(locations_excluded, str):
-            loc_list = [
-                x.strip().lower() for x in locations_excluded.split(",") if x.strip()
-            ]
-        else:
-            loc_list = [
-                str(x).strip().lower() for x in locations_excluded if str(x).strip()
-            ]
-        if loc_list:
-            payload["organization_not_locations"] = loc_list
-
-    # Employee range → organization_num_employees_ranges (list of "min,max")
-    employee_ranges = data.get("employee_ranges")
-    emp_min = data.get("employees_min")
-    emp_max = data.get("employees_max")
-    if employee_ranges:
-        if isinstance(employee_ranges, str):
-            ranges = [x.strip() for x in employee_ranges.split(";") if x.strip()]
-            if ranges:
-                payload["organization_num_employees_ranges"] = ranges
-        elif isinstance(employee_ranges, list):
-            payload["organization_num_employees_ranges"] = employee_ranges
-    elif emp_min is not None or emp_max is not None:
-        min_val = emp_min if emp_min is not None else 1
-        max_val = emp_max if emp_max is not None else 1000000
-        payload["organization_num_employees_ranges"] = [f"{min_val},{max_val}"]
-    # Empty = no employee filter (user cleared the field intentionally)
-
-    # Revenue range → revenue_range { min, max } (values in millions as per form)
-    rev_min = data.get("revenue_min")
-    rev_max = data.get("revenue_max")
-    if rev_min is not None or rev_max is not None:
-        min_val = rev_min if rev_min is not None else 0
-        max_val = rev_max if rev_max is not None else 999999
-        payload["revenue_range"] = {"min": min_val, "max": max_val}
-
-    # Organization keyword tags
-    keyword_tags = data.get("organization_keyword")
-    if keyword_tags:
-        if isinstance(keyword_tags, str):
-            tag_list = [t.strip() for t in keyword_tags.split(",") if t.strip()]
-        else:
-            tag_list = [str(t).strip() for t in keyword_tags if str(t).strip()]
-        if tag_list:
-            payload["q_organization_keyword_tags"] = tag_list
-
-    # Organization keyword exclude (if supported by Apollo)
-    keyword_exclude = data.get("organization_keyword_exclude")
-    if keyword_exclude:
-        if isinstance(keyword_exclude, str):
-            ex_list = [t.strip() for t in keyword_exclude.split(",") if t.strip()]
-        else:
-            ex_list = [str(t).strip() for t in keyword_exclude if str(t).strip()]
-        if ex_list:
-            payload["q_not_organization_keyword_tags"] = ex_list
-
-    # Funding stages
-    funding_stages = data.get("funding_stages")
-    if funding_stages:
-        if isinstance(funding_stages, str):
-            stages = [s.strip() for s in funding_stages.split(",") if s.strip()]
-        else:
-            stages = [str(s).strip() for s in funding_stages if str(s).strip()]
-        if stages:
-            payload["organization_latest_funding_stage_cd"] = stages
-
-    # Organization job titles (company search filter)
-    org_job_titles = data.get("q_organization_job_titles") or data.get(
-        "organization_job_titles"
-    )
-    if org_job_titles:
-        if isinstance(org_job_titles, str):
-            org_job_titles = [t.strip() for t in org_job_titles.split(",") if t.strip()]
-        else:
-            org_job_titles = [str(t).strip() for t in org_job_titles if str(t).strip()]
-        if org_job_titles:
-            payload["q_organization_job_titles"] = org_job_titles
-
-    # Organization job locations
-    job_locs = data.get("organization_job_locations")
-    if job_locs:
-        if isinstance(job_locs, str):
-            job_locs = [t.strip() for t in job_locs.split(",") if t.strip()]
-        else:
-            job_locs = [str(t).strip() for t in job_locs if str(t).strip()]
-        if job_locs:
-            payload["organization_job_locations"] = job_locs
-
-    # Lookalike organization IDs (optional)
-    lookalike_ids = data.get("lookalike_organization_ids")
-    if lookalike_ids:
-        if isinstance(lookalike_ids, str):
-            lookalike_ids = [t.strip() for t in lookalike_ids.split(",") if t.strip()]
-        else:
-            lookalike_ids = [str(t).strip() for t in lookalike_ids if str(t).strip()]
-        if lookalike_ids:
-            payload["lookalike_organization_ids"] = lookalike_ids
-
-    # Industries: Apollo accepts organization_industry_tag_ids and organization_not_industry_tag_ids (ID arrays).
-    industry_ids = data.get("industries")
-    if industry_ids:
-        if isinstance(industry_ids, str):
-            industry_ids = [s.strip() for s in industry_ids.split(",") if s.strip()]
-        else:
-            industry_ids = [str(i).strip() for i in industry_ids if str(i).strip()]
-        if industry_ids:
-            payload["organization_industry_tag_ids"] = industry_ids
-    industry_exclude_ids = data.get("industries_exclude")
-    if industry_exclude_ids:
-        if isinstance(industry_exclude_ids, str):
-            industry_exclude_ids = [
-                s.strip() for s in industry_exclude_ids.split(",") if s.strip()
-            ]
-        else:
-            industry_exclude_ids = [
-                str(i).strip() for i in industry_exclude_ids if str(i).strip()
-            ]
-        if industry_exclude_ids:
-            payload["organization_not_industry_tag_ids"] = industry_exclude_ids
-
-    return payload
+    return build_company_search_payload(data)
 
 
 def normalize_people(people: list) -> list:
     """Normalize Apollo API response for people to consistent format for UI."""
-    contacts = []
-    for person in people:
-        # Get phone numbers
-        phone_numbers = []
-        if person.get("phone_numbers"):
-            phone_numbers = [
-                p.get("sanitized_number") or p.get("raw_number")
-                for p in person.get("phone_numbers", [])
-                if p
-            ]
+    return [p.to_dict() for p in person_records(people)]
 
-        contacts.append(
-            {
-                "id": person.get("id"),
-                "first_name": person.get("first_name"),
-                "last_name": person.get("last_name"),
-                "name": person.get("name")
-                or f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
-                "email": person.get("email"),
-                "title": person.get("title"),
-                "seniority": person.get("seniority"),
-                "city": person.get("city"),
-                "state": person.get("state"),
-                "country": person.get("country"),
-                "linkedin_url": person.get("linkedin_url"),
-                "phone_numbers": phone_numbers,
-                "organization_name": (
-                    person.get("organization", {}).get("name")
-                    if person.get("organization")
-                    else None
-                ),
-            }
-        )
-    return contacts
+
+def people_total_entries(response: dict) -> Optional[int]:
+    """
+    Total matches of a people search response, or None when Apollo sent no total.
+    Apollo may use total_entries or total_count, in pagination or (api_search) at the
+    top level.
+    """
+    pagination = response.get("pagination") or {}
+    for total in (
+        pagination.get("total_entries"),
+        pagination.get("total_count"),
+        response.get("total_entries"),
+        response.get("total_count"),
+    ):
+        if total is not None:
+            try:
+                return int(total)
+            except (TypeError, ValueError):
+                continue
+    return None
 
 
 def build_people_payload(data: dict) -> dict:
     """
     Build Apollo API payload for people search (api_search endpoint).
     Seniorities use 'value' (e.g. c_suite, vp). Avoids params that cause 422 on deprecated /search.
+    Filters: payload_spec.PEOPLE_FILTERS (memoized per filter set, canonical form).
     """
-    payload = {
-        "page": data.get("page", 1) or 1,
-        "per_page": data.get("per_page", 25) or 25,
-    }
-
-    # Organization ID (ensure string for Apollo)
-    org_id = data.get("organization_id")
-    if org_id and str(org_id).strip():
-        payload["organization_ids"] = [str(org_id).strip()]
-
-    org_ids = data.get("organization_ids")
-    if org_ids:
-        org_ids_clean = [str(oid).strip() for oid in org_ids if str(oid).strip()]
-        if org_ids_clean:
-            payload["organization_ids"] = org_ids_clean
-
-    # Domains (api_search accepts q_organization_domains_list)
-    domains = data.get("domains")
-    if domains:
-        domain_list = [d.strip() for d in domains.split(",") if d.strip()]
-        if domain_list:
-            payload["q_organization_domains_list"] = domain_list
-
-    # Job titles → person_titles (lowercase for Apollo mixed_people api_search)
-    job_titles = data.get("job_titles")
-    if job_titles:
-        if isinstance(job_titles, str):
-            job_titles = [job_titles]
-        job_titles = [
-            str(t).strip().lower() for t in job_titles if t and str(t).strip()
-        ]
-        if job_titles:
-            payload["person_titles"] = job_titles
-
-    # Seniorities → person_seniorities (value: c_suite, vp, owner, etc.)
-    seniorities = data.get("seniorities")
-    if seniorities:
-        if isinstance(seniorities, str):
-            seniorities = [seniorities]
-        seniorities = [s for s in seniorities if s and str(s).strip()]
-        if seniorities:
-            payload["person_seniorities"] = seniorities
-
-    return payload
+    return build_people_search_payload(data)
 
 
 def company_search_view(request):
@@ -397,7 +224,17 @@ class CompanySearchAPIView(APIView):
             # No server-side defaults: empty field = no filter sent to Apollo.
             # Defaults sirf UI form ki initial values se aate hain.
             payload = build_apollo_payload(data)
-            response = search_companies(payload)
+            # Same search within the last few minutes (paging back, re-run): no Apollo call.
+            response = get_cached_company_search(payload)
+            cached = response is not None
+            if not cached:
+                response = search_companies(payload)
+                store_company_search(payload, response)
+            credits, credits_detail = CREDITS_COMPANY_SEARCH, ""
+            if cached:
+                credits, credits_detail = 0, "cached search"
+            elif joined_last_call():
+                credits, credits_detail = 0, "shared identical in-flight search"
             organizations = response.get("organizations") or []
             accounts = response.get("accounts") or []
             raw_list = organizations if organizations else accounts
@@ -406,7 +243,8 @@ class CompanySearchAPIView(APIView):
             total_count = pagination.get("total_entries", len(companies))
             log_apollo_credits(
                 request.path or "/api/companies/search/",
-                CREDITS_COMPANY_SEARCH,
+                credits,
+                detail=credits_detail,
             )
 
             return Response(
@@ -423,10 +261,94 @@ class CompanySearchAPIView(APIView):
             )
 
 
+class StoredCompanySearchAPIView(APIView):
+    """
+    Search companies already stored in the local warehouse (every company Apollo's
+    search returned): full-text query plus country / industry / employee facets.
+    No Apollo call, no credits; new companies come in only through a company search.
+    """
+
+    @extend_schema(
+        request=StoredCompanySearchSerializer,
+        responses={200: StoredCompanySearchResponseSerializer},
+        description="Full-text and faceted search over stored companies (no Apollo credits)",
+        tags=["Companies"],
+    )
+    def post(self, request):
+        serializer = StoredCompanySearchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        revenue_min, revenue_max = data.get("revenue_min"), data.get("revenue_max")
+        max_age_hours = data.get("max_age_hours")
+        try:
+            result = search_stored_companies(
+                q=data.get("q") or "",
+                countries=data.get("countries"),
+                industries=data.get("industries"),
+                employee_bands=data.get("employee_bands"),
+                funding_stages=data.get("funding_stages"),
+                # Form values are in millions, stored revenue in dollars.
+                revenue_min=revenue_min * 1e6 if revenue_min is not None else None,
+                revenue_max=revenue_max * 1e6 if revenue_max is not None else None,
+                max_age=(
+                    timedelta(hours=max_age_hours) if max_age_hours is not None else None
+                ),
+                page=data["page"],
+                per_page=data["per_page"],
+            )
+        except DatabaseError as e:
+            logger.warning("Stored company search failed: %s", e)
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(
+            {
+                "companies": normalize_companies(result["companies"]),
+                "total_count": result["total_count"],
+                "page": data["page"],
+                "per_page": data["per_page"],
+                "facets": result["facets"],
+                "source": "warehouse",
+            }
+        )
+
+
+def _tags_search_response(request, q: str) -> Response:
+    """
+    Local tag index first (INDUSTRIES_LIST + tags learned from Apollo). Only queries
+    the index can't answer go to Apollo tags/search; its tags are merged into the index.
+    """
+    index = get_tag_index()
+    tags, known = index.lookup(q)
+    if known:
+        return Response({"tags": tags, "source": "local"})
+    try:
+        remote_tags = search_tags(q).get("tags", [])
+    except Exception as e:
+        if tags:
+            logger.warning("tags/search failed for %r, answering from local index: %s", q, e)
+            return Response({"tags": tags, "source": "local"})
+        return Response(
+            {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    log_apollo_credits(
+        request.path or "/api/tags/search/",
+        CREDITS_TAGS_SEARCH,
+    )
+    index.learn(remote_tags, query=q)
+    merged, _known = index.lookup(q)
+    seen = {str(tag.get("id")) for tag in merged}
+    merged += [tag for tag in remote_tags if str(tag.get("id")) not in seen]
+    return Response({"tags": merged, "source": "apollo"})
+
+
 class TagsSearchAPIView(APIView):
     """
-    Search Apollo tags (e.g. industry tags). Undocumented Apollo endpoint;
-    use to get tag IDs for company search filter_expression (industry_tags).
+    Search tags (e.g. industry tags) to get tag IDs for company search filters
+    (industry_tags). Answered from the local tag index when possible, otherwise from
+    Apollo's undocumented tags/search endpoint.
     """
 
     @extend_schema(
@@ -439,8 +361,8 @@ class TagsSearchAPIView(APIView):
                 "schema": {"type": "string"},
             }
         ],
-        responses={200: {"description": "tags[] from Apollo"}},
-        description="Search tags (industry etc.) to get IDs for filters. Uses Apollo undocumented POST /api/v1/tags/search",
+        responses={200: {"description": "tags[] (source: local index or apollo)"}},
+        description="Search tags (industry etc.) to get IDs for filters. Known industries are answered from a local index; other terms use Apollo undocumented POST /api/v1/tags/search",
         tags=["Companies"],
     )
     def get(self, request):
@@ -450,17 +372,7 @@ class TagsSearchAPIView(APIView):
                 {"error": "Query param 'q' required (e.g. ?q=software)"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        try:
-            data = search_tags(q)
-            log_apollo_credits(
-                request.path or "/api/tags/search/",
-                CREDITS_TAGS_SEARCH,
-            )
-            return Response({"tags": data.get("tags", [])})
-        except Exception as e:
-            return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return _tags_search_response(request, q)
 
     def post(self, request):
         q = (
@@ -471,17 +383,7 @@ class TagsSearchAPIView(APIView):
                 {"error": "Body 'q' or 'q_tag_fuzzy_name' required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        try:
-            data = search_tags(q)
-            log_apollo_credits(
-                request.path or "/api/tags/search/",
-                CREDITS_TAGS_SEARCH,
-            )
-            return Response({"tags": data.get("tags", [])})
-        except Exception as e:
-            return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return _tags_search_response(request, q)
 
 
 class PeopleSearchAPIView(APIView):
@@ -501,56 +403,51 @@ class PeopleSearchAPIView(APIView):
         try:
             payload = build_people_payload(serializer.validated_data)
             response = search_people(payload)
+            search_credits = 0 if joined_last_call() else CREDITS_PEOPLE_SEARCH
 
             # Apollo returns 'people' for people data (no email/linkedin from search)
             people = normalize_people(response.get("people", []))
             pagination = response.get("pagination", {})
             # Total count for badge & pagination (Apollo may use total_entries or total_count)
-            total_count = (
-                pagination.get("total_entries")
-                or pagination.get("total_count")
-                or response.get("total_entries")
-                or response.get("total_count")
-            )
-            if total_count is None:
-                total_count = 0
+            total_count = people_total_entries(response) or 0
 
             # Debug: why fewer contacts in UI vs raw Apollo? Show filters that narrow results.
-            titles_filter = payload.get("person_titles") or []
-            seniorities_filter = payload.get("person_seniorities") or []
-            debug_lines = [
-                "====== People search DEBUG ======",
-                "Org: id=%s domains=%s"
-                % (
-                    payload.get("organization_ids"),
-                    payload.get("q_organization_domains_list"),
-                ),
-                "Filters sent to Apollo: person_titles=%s | person_seniorities=%s"
-                % (titles_filter or "NONE", seniorities_filter or "NONE"),
-                "Apollo result: %s people on this page (page=%s, per_page=%s) | total matching filters: %s"
-                % (len(people), payload.get("page"), payload.get("per_page"), total_count),
-            ]
-            if titles_filter or seniorities_filter:
-                debug_lines.append(
-                    "NOTE: total %s = sirf filtered contacts. Job Titles/Seniorities filters hatao to org ke SAARE contacts milenge (Postman jaisa)."
-                    % total_count
-                )
-            debug_msg = "\n".join(debug_lines) + "\n================================="
-            logger.info(debug_msg)
-            print(debug_msg)
+            if logger.isEnabledFor(logging.DEBUG):
+                titles_filter = payload.get("person_titles") or []
+                seniorities_filter = payload.get("person_seniorities") or []
+                debug_lines = [
+                    "====== People search DEBUG ======",
+                    "Org: id=%s domains=%s"
+                    % (
+                        payload.get("organization_ids"),
+                        payload.get("q_organization_domains_list"),
+                    ),
+                    "Filters sent to Apollo: person_titles=%s | person_seniorities=%s"
+                    % (titles_filter or "NONE", seniorities_filter or "NONE"),
+                    "Apollo result: %s people on this page (page=%s, per_page=%s) | total matching filters: %s"
+                    % (
+                        len(people),
+                        payload.get("page"),
+                        payload.get("per_page"),
+                        total_count,
+                    ),
+                ]
+                if titles_filter or seniorities_filter:
+                    debug_lines.append(
+                        "NOTE: total %s = sirf filtered contacts. Job Titles/Seniorities filters hatao to org ke SAARE contacts milenge (Postman jaisa)."
+                        % total_count
+                    )
+                debug_msg = "\n".join(debug_lines) + "\n================================="
+                logger.debug(debug_msg)
 
             # Enrich each person to get email, linkedin_url, etc. (consumes credits)
             ids = [p["id"] for p in people if p.get("id")]
-            enrich_credits = 0
-            if ids:
-                enriched_by_id = enrich_people_bulk(ids)
-                _merge_enriched_into_people(people, enriched_by_id)
-                enrich_credits = len(ids) * CREDITS_ENRICH_PER_PERSON
-            total_credits = CREDITS_PEOPLE_SEARCH + enrich_credits
+            enrich_credits, cached = _enrich_people(people)
+            total_credits = search_credits + enrich_credits
             log_apollo_credits(
                 request.path or "/api/people/search/",
                 total_credits,
-                detail=f"search=1 enrich={enrich_credits} ({len(ids)} contacts)",
+                detail=f"search={search_credits} enrich={enrich_credits} ({len(ids)} contacts, {cached} cached)",
             )
 
             return Response(
@@ -567,6 +464,53 @@ class PeopleSearchAPIView(APIView):
             )
 
 
+def _billed_enrich_credits(ids: list, enrich_errors: list) -> int:
+    """
+    bulk_match credits for ids, excluding only the failed batches Apollo never
+    processed (connect errors, 429). A read timeout or 5xx may have been billed, so
+    those batches count as spent.
+    """
+    failed = sum(len(err.get("ids") or []) for err in enrich_errors)
+    unbilled = sum(
+        len(err.get("ids") or [])
+        for err in enrich_errors
+        if not err.get("billed", True)
+    )
+    if enrich_errors:
+        logger.warning(
+            "bulk_match: %s of %s batch(es) failed, %s contacts not enriched"
+            " (%s possibly billed)",
+            len(enrich_errors),
+            (len(ids) + 9) // 10,
+            failed,
+            failed - unbilled,
+        )
+    return max(0, len(ids) - unbilled) * CREDITS_ENRICH_PER_PERSON
+
+
+def _enrich_people(people: list) -> tuple[int, int]:
+    """
+    Fill email, linkedin, etc. into people in place. Reads the enrichment cache first;
+    only cache misses go to bulk_match (and are cached). Returns (credits used, cache hits).
+    """
+    ids = list(dict.fromkeys(str(p["id"]) for p in people if p.get("id")))
+    if not ids:
+        return 0, 0
+    enriched_by_id = get_cached_people(ids)
+    cached = len(enriched_by_id)
+    misses = [pid for pid in ids if pid not in enriched_by_id]
+    enrich_credits = 0
+    if misses:
+        enrich_errors = []
+        with credit_hold(len(misses) * CREDITS_ENRICH_PER_PERSON) as hold:
+            fetched = enrich_people_bulk(misses, errors=enrich_errors)
+            store_enriched_people(fetched)
+            enriched_by_id.update(fetched)
+            enrich_credits = hold.used = _billed_enrich_credits(misses, enrich_errors)
+    _merge_enriched_into_people(people, enriched_by_id)
+    return enrich_credits, cached
+
+
 def _merge_enriched_into_people(people: list, enriched_by_id: dict) -> None:
     """Merge enriched email, linkedin, seniority, location, phone into people in place."""
     for p in people:
@@ -603,36 +547,135 @@ def get_people_for_company(
     job_titles=None,
     seniorities=None,
     per_page=100,
+    max_people=None,
 ):
     """
     Same flow as PeopleSearchAPIView / frontend loadContacts: people search + enrich.
-    Returns list of normalized, enriched people for the given company.
+    Returns list of normalized, enriched people for the given company (all pages,
+    at most max_people; default PEOPLE_PER_COMPANY_MAX).
+    """
+    people, _credits = fetch_people_for_company(
+        organization_id,
+        domain,
+        job_titles=job_titles,
+        seniorities=seniorities,
+        per_page=per_page,
+        max_people=max_people,
+    )
+    return people
+
+
+def iter_company_people_pages(
+    organization_id,
+    domain,
+    job_titles=None,
+    seniorities=None,
+    per_page=100,
+    max_people=None,
+    stats: Optional[dict] = None,
+):
+    """
+    Yield (page, normalized people) for one company's people search, up to max_people
+    (default PEOPLE_PER_COMPANY_MAX). Page 1 is fetched first for total_entries
+    (people_total_entries); later pages are fetched concurrently and yielded as each
+    arrives (not in page order).
+    If `stats` is given it gets search_calls, total_entries and truncated (contacts
+    beyond max_people that were not fetched).
     """
+    max_people = PEOPLE_PER_COMPANY_MAX if max_people is None else max(1, max_people)
+    per_page = max(1, min(per_page, max_people))
+    stats = {} if stats is None else stats
+    stats.setdefault("search_calls", 0)
     payload = {
-        "page": 1,
         "per_page": per_page,
         "organization_id": organization_id and str(organization_id).strip() or None,
         "domains": (domain or "").strip() or None,
         "job_titles": job_titles or [],
         "seniorities": seniorities or [],
     }
-    people = []
-    search_calls = 1
-    try:
-        response = search_people(build_people_payload(payload))
-        people = normalize_people(response.get("people", []))
-        if not people and (job_titles or seniorities):
-            payload_no_filter = {
-                "page": 1,
-                "per_page": per_page,
-                "organization_id": payload["organization_id"],
-                "domains": payload["domains"],
-                "job_titles": [],
-                "seniorities": [],
+
+    def fetch_page(page: int) -> dict:
+        with credit_hold(CREDITS_PEOPLE_SEARCH):
+            return search_people(build_people_payload(dict(payload, page=page)))
+
+    response = fetch_page(1)
+    stats["search_calls"] += 1
+    raw_people = response.get("people") or []
+    people = person_records(raw_people[:max_people])
+    total_entries = people_total_entries(response)
+    if total_entries is None:
+        total_entries = len(raw_people)
+    stats["total_entries"] = total_entries
+    kept = len(people)
+    yield 1, people
+    last_page = -(-min(total_entries, max_people) // per_page)
+    if people and last_page > 1:
+        workers = min(PEOPLE_PAGE_WORKERS, last_page - 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_page = {
+                context_submit(executor, fetch_page, page): page
+                for page in range(2, last_page + 1)
             }
-            response2 = search_people(build_people_payload(payload_no_filter))
-            people = normalize_people(response2.get("people", []))
-            search_calls = 2
+            try:
+                for future in as_completed(future_to_page):
+                    page = future_to_page[future]
+                    stats["search_calls"] += 1
+                    room = max_people - (page - 1) * per_page
+                    page_people = person_records(
+                        (future.result().get("people") or [])[:room]
+                    )
+                    kept += len(page_people)
+                    yield page, page_people
+            finally:
+                for future in future_to_page:
+                    future.cancel()
+    stats["truncated"] = max(0, total_entries - kept)
+
+
+def fetch_people_for_company(
+    organization_id,
+    domain,
+    job_titles=None,
+    seniorities=None,
+    per_page=100,
+    max_people=None,
+    stats: Optional[dict] = None,
+) -> tuple[list, int]:
+    """
+    get_people_for_company that also returns the credits it used (search + enrich).
+    Each page is enriched as soon as it arrives while later pages are still loading.
+    If `stats` is given it gets truncated: contacts over max_people not returned.
+    """
+    stats = {} if stats is None else stats
+    search_calls = 0
+    enrich_credits = 0
+    cached = 0
+    try:
+        for titles, levels in ((job_titles, seniorities), (None, None)):
+            pages = {}
+            page_stats = {}
+            for page, page_people in iter_company_people_pages(
+                organization_id,
+                domain,
+                job_titles=titles,
+                seniorities=levels,
+                per_page=per_page,
+                max_people=max_people,
+                stats=page_stats,
+            ):
+                if page_people and any(p.get("id") for p in page_people):
+                    page_credits, page_cached = _enrich_people(page_people)
+                    enrich_credits += page_credits
+                    cached += page_cached
+                pages[page] = page_people
+            search_calls += page_stats.get("search_calls", 0)
+            stats["truncated"] = page_stats.get("truncated", 0)
+            people = [p for page in sorted(pages) for p in pages[page]]
+            # No one matches the filters: retry once without them.
+            if people or not (job_titles or seniorities):
+                break
+    except CreditBudgetExceeded:
+        raise
     except Exception as e:
         logger.exception(
             "get_people_for_company failed for org_id=%s domain=%s: %s",
@@ -641,27 +684,120 @@ def get_people_for_company(
             e,
         )
         raise
+    search_credits = search_calls * CREDITS_PEOPLE_SEARCH
+    total_credits = search_credits + enrich_credits
     if people:
-        ids = [p["id"] for p in people if p.get("id")]
-        if ids:
-            enriched_by_id = enrich_people_bulk(ids)
-            _merge_enriched_into_people(people, enriched_by_id)
-            enrich_credits = len(ids) * CREDITS_ENRICH_PER_PERSON
-            search_credits = search_calls * CREDITS_PEOPLE_SEARCH
-            total_credits = search_credits + enrich_credits
-            log_apollo_credits(
-                "get_people_for_company (org_id=%s)"
-                % (organization_id or domain or "?"),
-                total_credits,
-                detail=f"search={search_calls} enrich={enrich_credits} ({len(ids)} contacts)",
-            )
-    return people
+        detail = f"search={search_calls} enrich={enrich_credits} ({len(people)} contacts, {cached} cached)"
+        if stats["truncated"]:
+            detail += f", {stats['truncated']} over per-company cap"
+        log_apollo_credits(
+            "get_people_for_company (org_id=%s)" % (organization_id or domain or "?"),
+            total_credits,
+            detail=detail,
+        )
+    return people, total_credits
+
+
+def _person_organization_id(person: dict):
+    org_id = person.get("organization_id") or (person.get("organization") or {}).get(
+        "id"
+    )
+    return str(org_id) if org_id else None
 
 
-def _format_person_location(p: dict) -> str:
-    return (
-        ", ".join(filter(None, [p.get("city"), p.get("state"), p.get("country")])) or ""
+def fetch_people_for_companies(
+    organization_ids: list,
+    job_titles=None,
+    seniorities=None,
+    per_company=None,
+    truncated: Optional[dict] = None,
+) -> tuple[dict[str, list], int, int]:
+    """
+    Batched people search for export: one api_search query per chunk of
+    PEOPLE_BATCH_ORG_IDS organization ids, paginated (100/page, at most
+    PEOPLE_BATCH_MAX_PAGES pages), then split back out by each person's organization id.
+    Pages come from the people search cache when an earlier run (e.g. the export plan)
+    fetched them. Returns (org_id -> normalized people, not enriched, at most
+    per_company each (default PEOPLE_PER_COMPANY_MAX); search calls, cached or not;
+    search credits used). Orgs with no people after a
+    complete pagination map to []. The page count comes from the response's total
+    (people_total_entries); without one, a full page means there may be more. When a
+    chunk has more than PEOPLE_BATCH_MAX_PAGES pages, all its orgs map to None: any of
+    them may have people (or contacts over the cap) on pages not fetched, so each gets
+    its own search. If `truncated` is given it gets org_id -> contacts dropped by the
+    cap.
+    """
+    per_company = PEOPLE_PER_COMPANY_MAX if per_company is None else per_company
+    truncated = {} if truncated is None else truncated
+    per_page = 100
+    org_ids = list(dict.fromkeys(str(o).strip() for o in organization_ids if o))
+    by_org = {oid: [] for oid in org_ids}
+    search_calls = 0
+    cached_calls = 0
+    incomplete = 0
+    for i in range(0, len(org_ids), PEOPLE_BATCH_ORG_IDS):
+        chunk = org_ids[i : i + PEOPLE_BATCH_ORG_IDS]
+        page = 1
+        while True:
+            payload = build_people_payload(
+                {
+                    "page": page,
+                    "per_page": per_page,
+                    "organization_ids": chunk,
+                    "job_titles": job_titles or [],
+                    "seniorities": seniorities or [],
+                }
+            )
+            response = get_cached_people_search(payload)
+            if response is None:
+                with credit_hold(CREDITS_PEOPLE_SEARCH):
+                    response = search_people(payload)
+                store_people_search(payload, response)
+            else:
+                cached_calls += 1
+            search_calls += 1
+            raw_people = response.get("people") or []
+            for person, normalized in zip(raw_people, person_records(raw_people)):
+                org_id = _person_organization_id(person)
+                people = by_org.get(org_id)
+                if people is None:
+                    continue
+                if len(people) < per_company:
+                    people.append(normalized)
+                else:
+                    truncated[org_id] = truncated.get(org_id, 0) + 1
+            total = people_total_entries(response)
+            if total is not None:
+                more = page * per_page < total
+            else:
+                more = len(raw_people) >= per_page
+            if not raw_people or not more:
+                break
+            if page >= PEOPLE_BATCH_MAX_PAGES:
+                # Stopped before the last page: neither the people nor the truncated
+                # counts of this chunk are complete.
+                for org_id in chunk:
+                    by_org[org_id] = None
+                    truncated.pop(org_id, None)
+                incomplete += len(chunk)
+                break
+            page += 1
+    search_credits = (search_calls - cached_calls) * CREDITS_PEOPLE_SEARCH
+    found = sum(1 for people in by_org.values() if people)
+    log_apollo_credits(
+        "export people batch (%s orgs)" % len(org_ids),
+        search_credits,
+        detail="search=%s (%s cached), %s orgs with people, %s empty, %s past the"
+        " page limit (per-company fallback)"
+        % (
+            search_calls,
+            cached_calls,
+            found,
+            len(org_ids) - found - incomplete,
+            incomplete,
+        ),
     )
+    return by_org, search_calls, search_credits
 
 
 def _company_country_display(c: dict) -> str:
@@ -695,27 +831,37 @@ def _format_organization_technologies(org: dict) -> str:
 def _fetch_company_technologies(
     organization_id=None, domain=None, name=None
 ) -> tuple[str, int]:
-    """Fetch technologies for one company. Returns (formatted string, credits used)."""
+    """
+    Fetch technologies for one company. Returns (formatted string, credits used).
+    Known companies are answered from the organization cache (no network, 0 credits).
+    """
+    cached = get_cached_organization(organization_id=organization_id, domain=domain)
+    if cached is not None:
+        return _format_organization_technologies(cached), 0
     org = {}
     credits = 0
-    try:
-        if domain:
-            org = enrich_organization(domain=domain, name=name)
-            credits = CREDITS_ORG_ENRICH if org else 0
-        if not org and organization_id:
-            org = get_organization(str(organization_id))
-            credits = CREDITS_ORG_ENRICH if org else 0
-        elif not org and name:
-            org = enrich_organization(name=name)
-            credits = CREDITS_ORG_ENRICH if org else 0
-    except Exception as e:
-        logger.warning(
-            "Technologies fetch failed for id=%s domain=%s name=%s: %s",
-            organization_id,
-            domain,
-            name,
-            e,
-        )
+    with credit_hold(CREDITS_ORG_ENRICH) as hold:
+        try:
+            if domain:
+                org = enrich_organization(domain=domain, name=name)
+                credits = CREDITS_ORG_ENRICH if org else 0
+            if not org and organization_id:
+                org = get_organization(str(organization_id))
+                credits = CREDITS_ORG_ENRICH if org else 0
+            elif not org and name:
+                org = enrich_organization(name=name)
+                credits = CREDITS_ORG_ENRICH if org else 0
+        except Exception as e:
+            logger.warning(
+                "Technologies fetch failed for id=%s domain=%s name=%s: %s",
+                organization_id,
+                domain,
+                name,
+                e,
+            )
+        hold.used = credits
+    if org:
+        store_organization(org, domain=domain)
     if credits:
         log_apollo_credits(
             "organizations/enrich (export technologies)",
@@ -726,12 +872,18 @@ def _fetch_company_technologies(
 
 
 def _fetch_export_company_bundle(
-    company: dict, job_titles: list, seniorities: list
+    company: dict, job_titles: list, seniorities: list, max_people: Optional[int] = None
 ) -> dict:
-    """Fetch technologies + people for one company (used by parallel export workers)."""
+    """
+    Fetch technologies + people for one company (used by parallel export workers).
+    At most max_people contacts (default PEOPLE_PER_COMPANY_MAX).
+    """
     cid = company.get("id")
     cname = company.get("name") or "company"
     cdomain = (company.get("domain") or company.get("primary_domain") or "").strip()
+    budget = current_budget()
+    if budget is not None and budget.exhausted:
+        return _export_error_bundle(company, "not exported: %s" % budget.exhausted)
     errors = []
     technologies, tech_credits = "", 0
     try:
@@ -744,17 +896,42 @@ def _fetch_export_company_bundle(
         errors.append("technologies: %s" % e)
         logger.warning("Export tech failed id=%s name=%s: %s", cid, cname, e)
     people = company.get("people") if isinstance(company.get("people"), list) else []
+    # From fetch_people_for_companies (batched search): None = not batched or not
+    # covered by it (page limit), [] = the complete batch found nobody.
+    prefetched = company.get("prefetched_people")
     server_fetched = False
-    if not people:
+    people_credits = 0
+    people_stats = {}
+    if not people and prefetched:
+        server_fetched = True
+        people = prefetched
+        people_stats["truncated"] = company.get("prefetched_truncated") or 0
+        try:
+            people_credits, cached = _enrich_people(people)
+            if people_credits:
+                log_apollo_credits(
+                    "export enrich (org_id=%s)" % (cid or cdomain or "?"),
+                    people_credits,
+                    detail="%s contacts, %s cached" % (len(people), cached),
+                )
+        except Exception as e:
+            errors.append("people: %s" % e)
+            logger.warning("Export enrich failed id=%s name=%s: %s", cid, cname, e)
+    elif not people and (prefetched is None or job_titles or seniorities):
         server_fetched = True
         try:
             logger.info("Export: fetching people for company id=%s name=%s", cid, cname)
-            people = get_people_for_company(
+            # Batch already ran the filtered search and found nobody: go straight
+            # to the unfiltered fallback.
+            batched_empty = prefetched is not None
+            people, people_credits = fetch_people_for_company(
                 organization_id=cid,
                 domain=cdomain or None,
-                job_titles=job_titles,
-                seniorities=seniorities,
+                job_titles=[] if batched_empty else job_titles,
+                seniorities=[] if batched_empty else seniorities,
                 per_page=100,
+                max_people=max_people,
+                stats=people_stats,
             )
         except Exception as e:
             errors.append("people: %s" % e)
@@ -765,116 +942,371 @@ def _fetch_export_company_bundle(
         "company_country": _company_country_display(company),
         "technologies": technologies,
         "people": people,
+        "people_truncated": people_stats.get("truncated") or 0,
         "tech_credits": tech_credits,
+        "people_credits": people_credits,
         "server_fetched": server_fetched,
         "error": "; ".join(errors),
     }
 
 
-def _fetch_export_bundles_parallel(
-    companies: list, job_titles: list, seniorities: list
-) -> list[dict]:
-    """Promise.all equivalent in Python: fetch all companies concurrently."""
+def _export_error_bundle(company: dict, error: str) -> dict:
+    """Bundle for a company whose export worker failed (written to the Error column)."""
+    return {
+        "cname": company.get("name") or "company",
+        "company_country": _company_country_display(company),
+        "technologies": "",
+        "people": [],
+        "people_truncated": 0,
+        "tech_credits": 0,
+        "people_credits": 0,
+        "server_fetched": False,
+        "error": error,
+    }
+
+
+def _safe_fetch_export_company_bundle(
+    company: dict, job_titles: list, seniorities: list, max_people: Optional[int] = None
+) -> dict:
+    """
+    _fetch_export_company_bundle that never raises (worker errors become error
+    bundles). Runs on export worker threads: the database connections the caches
+    opened on this thread are closed when the company is done, since Django only
+    closes them for request threads.
+    """
+    try:
+        return _fetch_export_company_bundle(company, job_titles, seniorities, max_people)
+    except Exception as e:
+        logger.warning(
+            "Export worker failed for %s: %s", company.get("name") or "company", e
+        )
+        return _export_error_bundle(company, str(e))
+    finally:
+        connections.close_all()
+
+
+def _iter_export_bundles_parallel(companies: list, job_titles: list, seniorities: list):
+    """Promise.all equivalent in Python: fetch all companies concurrently, yield bundles in order."""
     if not companies:
-        return []
+        return
     workers = min(EXPORT_MAX_WORKERS, len(companies))
-    results: list[dict | None] = [None] * len(companies)
     with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_index = {
-            executor.submit(
-                _fetch_export_company_bundle, company, job_titles, seniorities
-            ): index
-            for index, company in enumerate(companies)
-        }
-        for future in as_completed(future_to_index):
-            index = future_to_index[future]
+        futures = [
+            context_submit(
+                executor,
+                _safe_fetch_export_company_bundle,
+                company,
+                job_titles,
+                seniorities,
+            )
+            for company in companies
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            flush_organizations()
+
+
+def _prefetch_company_people(
+    companies: list, job_titles: list, seniorities: list, max_people: Optional[int] = None
+) -> tuple[int, int]:
+    """
+    Batched people search for one page of companies; sets company["prefetched_people"]
+    (at most max_people each, default PEOPLE_PER_COMPANY_MAX; None for companies the
+    batch could not cover, see fetch_people_for_companies). Returns (search calls,
+    search credits). On failure companies are left as-is (per-company search).
+    """
+    if PEOPLE_BATCH_ORG_IDS <= 1:
+        return 0, 0
+    org_ids = [c["id"] for c in companies if c.get("id")]
+    if not org_ids:
+        return 0, 0
+    truncated = {}
+    try:
+        by_org, calls, credits = fetch_people_for_companies(
+            org_ids, job_titles, seniorities, per_company=max_people, truncated=truncated
+        )
+    except CreditBudgetExceeded as e:
+        logger.info("Export people batch skipped: %s", e)
+        return 0, 0
+    except Exception as e:
+        logger.warning("Export people batch failed, using per-company search: %s", e)
+        return 0, 0
+    for company in companies:
+        if company.get("id"):
+            company["prefetched_people"] = by_org.get(str(company["id"]))
+            company["prefetched_truncated"] = truncated.get(str(company["id"]), 0)
+    return calls, credits
+
+
+def _log_export_plan(plan: dict) -> None:
+    budget = plan["budget"]
+    logger.info(
+        "Export plan: ~%s companies, %s pages, ~%s contacts | calls %s | credits %s"
+        " | cache hit rate %s | budget remaining %s",
+        plan["companies"],
+        plan["pages"],
+        plan["contacts"],
+        plan["calls"],
+        plan["credits"],
+        plan["cache_hit_rate"],
+        "unlimited" if budget["remaining"] is None else budget["remaining"],
+    )
+    if not budget["fits"]:
+        logger.warning(
+            "Export plan: ~%s credits over the remaining budget (%s); export will stop early",
+            plan["credits"]["total"],
+            budget["remaining"],
+        )
+
+
+def _export_companies(raw_list: list) -> list:
+    """ExportCompany rows as the export workers take them, from a company search page."""
+    return [ExportCompany.from_company(c) for c in company_records(raw_list)]
+
+
+def _search_export_page(page_data: dict) -> tuple[dict, int]:
+    """
+    One export-all company search page: (response, credits used). A page still in the
+    company search cache (e.g. page 1 after export_plan_view) or warehouse costs nothing.
+    New pages go to the company warehouse only (not the in-process cache).
+    """
+    payload = build_apollo_payload(page_data)
+    response = get_cached_company_search(payload)
+    if response is not None:
+        return response, 0
+    with credit_hold(CREDITS_COMPANY_SEARCH) as hold:
+        response = search_companies(payload)
+        if joined_last_call():
+            hold.used = 0
+    store_company_page(payload, response)
+    return response, hold.used
+
+
+def _put_until_stopped(out_queue: queue.Queue, stop: threading.Event, item) -> bool:
+    """Put item on a bounded export queue; False if the export was stopped meanwhile."""
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _prefetch_company_pages(
+    out_queue: queue.Queue,
+    stop: threading.Event,
+    data: dict,
+    start_page: int = 1,
+    job_titles: list = None,
+    seniorities: list = None,
+) -> None:
+    """
+    Producer for export-all: fetch Apollo company search pages (plus one batched
+    people search per page) into out_queue (bounded, so at most EXPORT_PREFETCH_PAGES
+    pages wait ahead of the workers). Puts {"page", "companies", "pagination",
+    "page_credits", "search_credits"} per page (the first one also gets "plan", see
+    credit_budget.plan_export), {"page", "error"} on failure ("budget": True when the
+    credit budget ran out), then None when done.
+    """
+
+    def put(item) -> bool:
+        return _put_until_stopped(out_queue, stop, item)
+
+    page = start_page
+    total_companies = 0
+    budget = current_budget()
+    try:
+        while not stop.is_set():
+            if budget is not None and budget.exhausted:
+                put({"page": page, "error": budget.exhausted, "budget": True})
+                break
+            page_data = dict(data)
+            page_data["page"] = page
+            page_data["per_page"] = EXPORT_COMPANY_PAGE_SIZE
             try:
-                results[index] = future.result()
+                apollo_resp, page_credits = _search_export_page(page_data)
+            except CreditBudgetExceeded as e:
+                put({"page": page, "error": str(e), "budget": True})
+                break
             except Exception as e:
-                company = companies[index]
-                cname = company.get("name") or "company"
-                logger.warning("Export worker failed for %s: %s", cname, e)
-                results[index] = {
-                    "cname": cname,
-                    "company_country": _company_country_display(company),
-                    "technologies": "",
-                    "people": [],
-                    "tech_credits": 0,
-                    "server_fetched": False,
-                    "error": str(e),
-                }
-    return [bundle for bundle in results if bundle is not None]
+                logger.exception(
+                    "Export all: company search page %s failed: %s", page, e
+                )
+                put({"page": page, "error": str(e)})
+                break
 
+            raw_list = (
+                apollo_resp.get("organizations") or apollo_resp.get("accounts") or []
+            )
+            if not raw_list:
+                break
+
+            companies = _export_companies(raw_list)
+            total_companies += len(companies)
+            logger.info(
+                "====== Export all: Apollo page %s (%s companies this page, %s so far) ======",
+                page,
+                len(companies),
+                total_companies,
+            )
+            log_apollo_credits(
+                "export_all/companies page=%s" % page,
+                page_credits,
+                detail="%s companies%s"
+                % (len(companies), "" if page_credits else ", cached search"),
+            )
+            search_calls, search_credits = _prefetch_company_people(
+                companies, job_titles or [], seniorities or []
+            )
+            pagination = apollo_resp.get("pagination") or {}
+            item = {
+                "page": page,
+                "companies": companies,
+                "pagination": pagination,
+                "page_credits": page_credits,
+                "search_credits": search_credits,
+            }
+            if page == start_page:
+                item["plan"] = plan_export(
+                    pagination, companies, search_calls, start_page=start_page
+                )
+                _log_export_plan(item["plan"])
+            if not put(item):
+                break
+            total_pages = int(pagination.get("total_pages") or page)
+            if page >= total_pages:
+                break
+            page += 1
+    finally:
+        put(None)
+        connections.close_all()
+
+
+def _prefetch_selected_pages(
+    out_queue: queue.Queue,
+    stop: threading.Event,
+    companies: list,
+    job_titles: list = None,
+    seniorities: list = None,
+    max_people: Optional[int] = None,
+) -> None:
+    """
+    Producer for export selected: the selected companies in pages of
+    EXPORT_COMPANY_PAGE_SIZE, each with one batched people search, into out_queue.
+    Same items as _prefetch_company_pages, without pagination/page_credits.
+    """
 
-def _append_export_bundle_rows(ws_contacts, ws_tech, bundle: dict) -> None:
-    """Write one company bundle into Contacts + Technologies sheets (error column if failed)."""
-    cname = bundle.get("cname") or ""
-    country = bundle.get("company_country") or ""
-    error = (bundle.get("error") or "").strip()
-    if error:
-        ws_contacts.append([cname, country, "", "", "", "", "", "", error])
-        ws_tech.append([cname, "", error])
-        return
-    ws_tech.append([cname, bundle.get("technologies") or "", ""])
-    people = bundle.get("people") or []
-    if not people:
-        ws_contacts.append([cname, country, "", "", "", "", "", "", ""])
-        return
-    for p in people:
-        ws_contacts.append(
-            [
-                cname,
-                country,
-                p.get("name") or "",
-                p.get("email") or "",
-                p.get("linkedin_url") or "",
-                p.get("title") or "",
-                p.get("seniority") or "",
-                _format_person_location(p),
-                "",
-            ]
-        )
+    def put(item) -> bool:
+        return _put_until_stopped(out_queue, stop, item)
 
+    budget = current_budget()
+    try:
+        for start in range(0, len(companies), EXPORT_COMPANY_PAGE_SIZE):
+            page = start // EXPORT_COMPANY_PAGE_SIZE + 1
+            if stop.is_set():
+                break
+            if budget is not None and budget.exhausted:
+                put({"page": page, "error": budget.exhausted, "budget": True})
+                break
+            chunk = companies[start : start + EXPORT_COMPANY_PAGE_SIZE]
+            _calls, search_credits = _prefetch_company_people(
+                chunk, job_titles or [], seniorities or [], max_people=max_people
+            )
+            if not put({"page": page, "companies": chunk, "search_credits": search_credits}):
+                break
+    finally:
+        put(None)
+        connections.close_all()
 
-def _build_export_workbooks():
-    wb_contacts = Workbook()
-    ws = wb_contacts.active
-    ws.title = "Contacts"
-    ws.append(
-        [
-            "Company Name",
-            "Company Country",
-            "Name",
-            "Email",
-            "LinkedIn",
-            "Job Title",
-            "Seniority",
-            "Location",
-            "Error",
-        ]
+
+def _iter_export_pipeline(
+    produce, job_titles: list, seniorities: list, max_people: Optional[int] = None
+):
+    """
+    Run an export producer (produce(out_queue, stop) in its own thread) and fetch
+    bundles for the companies of each page it puts. Yields the pages in order with
+    "bundles" added, or the producer's {"page", "error"} item (last item).
+
+    One long-lived executor keeps EXPORT_MAX_WORKERS busy across page boundaries: the
+    next page's companies are submitted before the current page is drained. Memory
+    stays bounded by the prefetch queue plus EXPORT_PREFETCH_PAGES pages of in-flight
+    bundles.
+    """
+    pages = queue.Queue(maxsize=EXPORT_PREFETCH_PAGES)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=bind_context(produce),
+        args=(pages, stop),
+        name="export-page-prefetch",
+        daemon=True,
+    )
+    executor = ThreadPoolExecutor(
+        max_workers=EXPORT_MAX_WORKERS, thread_name_prefix="export-worker"
+    )
+    pending = deque()
+
+    def drain_oldest() -> dict:
+        item = pending.popleft()
+        item["bundles"] = [future.result() for future in item.pop("futures")]
+        flush_organizations()
+        return item
+
+    producer.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is None:
+                break
+            if item.get("error"):
+                while pending:
+                    yield drain_oldest()
+                yield item
+                return
+            item["futures"] = [
+                context_submit(
+                    executor,
+                    _safe_fetch_export_company_bundle,
+                    company,
+                    job_titles,
+                    seniorities,
+                    max_people,
+                )
+                for company in item["companies"]
+            ]
+            pending.append(item)
+            if len(pending) >= EXPORT_PREFETCH_PAGES:
+                yield drain_oldest()
+        while pending:
+            yield drain_oldest()
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        flush_organizations()
+
+
+def _iter_export_pages(
+    data: dict, job_titles: list, seniorities: list, start_page: int = 1
+):
+    """
+    Pipelined export-all. Yields one dict per company search page, in page order:
+    {"page", "companies", "pagination", "page_credits", "search_credits", "bundles"}
+    or {"page", "error"} (last item). A producer thread prefetches company pages
+    (_prefetch_company_pages) while workers fetch bundles (_iter_export_pipeline).
+    """
+    return _iter_export_pipeline(
+        functools.partial(
+            _prefetch_company_pages,
+            data=data,
+            start_page=start_page,
+            job_titles=job_titles,
+            seniorities=seniorities,
+        ),
+        job_titles,
+        seniorities,
     )
-    wb_technologies = Workbook()
-    ws_tech = wb_technologies.active
-    ws_tech.title = "Technologies"
-    ws_tech.append(["Company Name", "Technologies", "Error"])
-    ws_tech.column_dimensions["A"].width = 30
-    ws_tech.column_dimensions["B"].width = 120
-    return wb_contacts, ws, wb_technologies, ws_tech
-
-
-def _zip_export_workbooks(wb_contacts, wb_technologies) -> bytes:
-    contacts_buffer = io.BytesIO()
-    wb_contacts.save(contacts_buffer)
-    contacts_buffer.seek(0)
-    technologies_buffer = io.BytesIO()
-    wb_technologies.save(technologies_buffer)
-    technologies_buffer.seek(0)
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("companies_contacts.xlsx", contacts_buffer.getvalue())
-        zf.writestr("companies_technologies.xlsx", technologies_buffer.getvalue())
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
 
 
 @require_http_methods(["POST"])
@@ -915,19 +1347,170 @@ def export_companies_view(request):
         fetch_count,
         min(EXPORT_MAX_WORKERS, len(companies)),
     )
-    wb_contacts, ws, wb_technologies, ws_tech = _build_export_workbooks()
-    bundles = _fetch_export_bundles_parallel(companies, job_titles, seniorities)
-    for bundle in bundles:
-        _append_export_bundle_rows(ws, ws_tech, bundle)
-    response = HttpResponse(
-        _zip_export_workbooks(wb_contacts, wb_technologies),
-        content_type="application/zip",
+
+    def fill(writer):
+        budget = CreditBudget()
+        # Once the budget runs out, the remaining companies come back right away
+        # as "not exported" rows; companies already fetched are still written.
+        with use_budget(budget):
+            for bundle in _iter_export_bundles_parallel(
+                companies, job_titles, seniorities
+            ):
+                writer.append_bundle(bundle)
+        if budget.exhausted:
+            writer.append_note(budget_stop_note(budget, writer))
+        flush_credits()
+
+    response = StreamingHttpResponse(
+        ExportWriter().iter_zip(fill), content_type="application/zip"
     )
     response["Content-Disposition"] = 'attachment; filename="companies_export.zip"'
     return response
 
 
-EXPORT_COMPANY_PAGE_SIZE = 100  # Apollo company search page size for export-all
+def _selected_export_companies(items: list) -> list:
+    """ExportCompany rows from the selection ({id, domain, name, country, city}), de-duplicated."""
+    companies = []
+    seen = set()
+    for c in items:
+        if not isinstance(c, dict):
+            continue
+        cid = str(c.get("id") or "").strip() or None
+        domain = (c.get("domain") or "").strip()
+        key = cid or domain.lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        companies.append(
+            ExportCompany(
+                id=cid,
+                name=(c.get("name") or "").strip() or domain or cid,
+                domain=domain,
+                country=c.get("country") or "",
+                city=c.get("city") or "",
+            )
+        )
+    return companies
+
+
+@require_http_methods(["POST"])
+@ensure_csrf_cookie
+def export_selected_view(request):
+    """
+    Export selected companies in one request: the client sends only the selection and
+    the people filters, the server does the rest and streams the ZIP (same files as
+    export_companies_view).
+
+    JSON body: {"companies": [{"id", "domain", "name", "country", "city"}, ...],
+    "job_titles": [...], "seniorities": [...], "per_company": 25}. Each company needs
+    an id or a domain; per_company caps contacts per company (default and maximum
+    PEOPLE_PER_COMPANY_MAX).
+
+    Runs the export-all pipeline over the selection: one batched people search per
+    EXPORT_COMPANY_PAGE_SIZE companies, then enrichment and technologies on
+    EXPORT_MAX_WORKERS workers.
+    """
+    import json
+
+    try:
+        body = json.loads(request.body)
+    except Exception:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(body, dict) or not isinstance(body.get("companies"), list):
+        return JsonResponse({"error": "companies must be a list"}, status=400)
+    companies = _selected_export_companies(body["companies"])
+    if not companies:
+        return JsonResponse({"error": "No companies selected"}, status=400)
+    job_titles = [str(t) for t in body.get("job_titles") or [] if str(t).strip()]
+    seniorities = [str(s) for s in body.get("seniorities") or [] if str(s).strip()]
+    try:
+        per_company = int(body.get("per_company") or PEOPLE_PER_COMPANY_MAX)
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "per_company must be a number"}, status=400)
+    per_company = max(1, min(per_company, PEOPLE_PER_COMPANY_MAX))
+    logger.info(
+        "Export selected: %s company(ies) | %s contacts/company max | workers=%s",
+        len(companies),
+        per_company,
+        min(EXPORT_MAX_WORKERS, len(companies)),
+    )
+
+    def fill(writer):
+        budget = CreditBudget()
+        # As in export_companies_view, pages already in flight when the budget runs
+        # out are still written (paid bundles, then "not exported" rows).
+        with use_budget(budget):
+            for item in _iter_export_pipeline(
+                functools.partial(
+                    _prefetch_selected_pages,
+                    companies=companies,
+                    job_titles=job_titles,
+                    seniorities=seniorities,
+                    max_people=per_company,
+                ),
+                job_titles,
+                seniorities,
+                max_people=per_company,
+            ):
+                if item.get("error"):
+                    break
+                for bundle in item["bundles"]:
+                    writer.append_bundle(bundle)
+        if budget.exhausted:
+            writer.append_note(budget_stop_note(budget, writer))
+        flush_credits()
+        logger.info(
+            "Export selected done: %s companies, %s contact rows",
+            writer.companies_written,
+            writer.contact_rows_written,
+        )
+
+    response = StreamingHttpResponse(
+        ExportWriter().iter_zip(fill), content_type="application/zip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="companies_export.zip"'
+    return response
+
+
+@require_http_methods(["POST"])
+@ensure_csrf_cookie
+def export_plan_view(request):
+    """
+    Predicted calls and credits for exporting everything matching the current filters
+    (same form POST as export_all_matching_view), checked against the credit budgets.
+    Runs page 1 of the company search and its batched people search, both cached so
+    the export started next reuses them instead of paying again; those credits are
+    reported as planning_credits.
+    """
+    form = CompanySearchForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"error": form.errors}, status=400)
+    data = dict(form.cleaned_data, page=1, per_page=EXPORT_COMPANY_PAGE_SIZE)
+    payload = build_apollo_payload(data)
+    try:
+        response = get_cached_company_search(payload)
+        search_credits = 0
+        if response is None:
+            response = search_companies(payload)
+            store_company_search(payload, response)
+            search_credits = 0 if joined_last_call() else CREDITS_COMPANY_SEARCH
+        companies = _export_companies(
+            response.get("organizations") or response.get("accounts") or []
+        )
+        people_calls, people_credits = _prefetch_company_people(
+            companies, data.get("job_titles") or [], data.get("seniorities") or []
+        )
+        log_apollo_credits(
+            request.path or "/export/plan/",
+            search_credits,
+            detail="company search page 1 for the export plan",
+        )
+        plan = plan_export(response.get("pagination") or {}, companies, people_calls)
+    except Exception as e:
+        logger.exception("Export plan failed: %s", e)
+        return JsonResponse({"error": str(e)}, status=500)
+    plan["planning_credits"] = search_credits + people_credits
+    return JsonResponse(plan)
 
 
 @require_http_methods(["POST"])
@@ -935,9 +1518,11 @@ EXPORT_COMPANY_PAGE_SIZE = 100  # Apollo company search page size for export-all
 def export_all_matching_view(request):
     """
     Export ALL companies matching current search filters.
-    Django form POST (not DRF) — browser waits for the file download.
+    Django form POST (not DRF) — browser waits for the file download, which is
+    streamed (write-only workbooks, StreamingHttpResponse) so memory stays flat.
     Internally paginates Apollo company search at 100/page until done.
     Per-company errors are written to the Error column; export continues.
+    Stops early, with a note in the file, when a credit budget runs out (credit_budget).
     """
     form = CompanySearchForm(request.POST)
     if not form.is_valid():
@@ -949,59 +1534,141 @@ def export_all_matching_view(request):
     data = form.cleaned_data
     job_titles = data.get("job_titles") or []
     seniorities = data.get("seniorities") or []
-    wb_contacts, ws, wb_technologies, ws_tech = _build_export_workbooks()
 
-    page = 1
-    total_companies = 0
-    while True:
-        page_data = dict(data)
-        page_data["page"] = page
-        page_data["per_page"] = EXPORT_COMPANY_PAGE_SIZE
-        try:
-            apollo_resp = search_companies(build_apollo_payload(page_data))
-        except Exception as e:
-            logger.exception("Export all: company search page %s failed: %s", page, e)
-            ws.append(["", "", "", "", "", "", "", "", "company search page %s: %s" % (page, e)])
-            break
+    def fill(writer):
+        page = 0
+        plan = None
+        budget = CreditBudget()
+        with use_budget(budget):
+            for item in _iter_export_pages(data, job_titles, seniorities):
+                plan = item.get("plan") or plan
+                if item.get("error"):
+                    if not item.get("budget"):
+                        writer.append_error(
+                            "company search page %s: %s" % (item["page"], item["error"])
+                        )
+                    break
+                page = item["page"]
+                for bundle in item["bundles"]:
+                    writer.append_bundle(bundle)
+                if budget.exhausted:
+                    break
+        if budget.exhausted:
+            writer.append_note(budget_stop_note(budget, writer, plan))
+        flush_credits()
+        logger.info(
+            "====== Export all done: %s companies across %s page(s) ======",
+            writer.companies_written,
+            page,
+        )
+        if writer.contacts_truncated:
+            logger.info(
+                "Export all: %s contacts over the per-company cap (%s) not exported",
+                writer.contacts_truncated,
+                PEOPLE_PER_COMPANY_MAX,
+            )
+        logger.info("Export all: Apollo connection pool %s", pool_stats())
+        logger.info("Export all: organization cache %s", org_cache_stats())
+        logger.info("Export all: single-flight %s", single_flight_stats())
 
-        raw_list = apollo_resp.get("organizations") or apollo_resp.get("accounts") or []
-        if not raw_list:
-            break
+    response = StreamingHttpResponse(
+        ExportWriter().iter_zip(fill), content_type="application/zip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="companies_export_all.zip"'
+    return response
 
-        companies = [
-            {
-                "id": c.get("id"),
-                "name": c.get("name"),
-                "domain": c.get("primary_domain"),
-                "country": c.get("country"),
-                "city": c.get("city"),
-            }
-            for c in normalize_companies(raw_list)
-        ]
-        total_companies += len(companies)
-        print(
-            "====== Export all: Apollo page %s (%s companies this page, %s so far) ======"
-            % (page, len(companies), total_companies)
-        )
-        log_apollo_credits(
-            "export_all/companies page=%s" % page,
-            CREDITS_COMPANY_SEARCH,
-            detail="%s companies" % len(companies),
-        )
 
-        for bundle in _fetch_export_bundles_parallel(companies, job_titles, seniorities):
-            _append_export_bundle_rows(ws, ws_tech, bundle)
+@require_http_methods(["POST"])
+@ensure_csrf_cookie
+def export_job_create_view(request):
+    """
+    Start a background export-all job for the current search filters (same form POST
+    as export_all_matching_view). Returns the job id and progress/download URLs;
+    the job runs in `manage.py run_export_jobs` (or inline with EXPORT_JOBS_RUN_INLINE=1).
+    """
+    form = CompanySearchForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"error": form.errors}, status=400)
+    job = create_export_job(dict(form.cleaned_data))
+    return JsonResponse(job_progress(job), status=202)
+
 
-        pagination = apollo_resp.get("pagination") or {}
-        total_pages = int(pagination.get("total_pages") or page)
-        if page >= total_pages:
-            break
-        page += 1
+class ExportJobAPIView(APIView):
+    """Progress of a background export-all job."""
 
-    print("====== Export all done: %s companies across %s page(s) ======" % (total_companies, page))
-    response = HttpResponse(
-        _zip_export_workbooks(wb_contacts, wb_technologies),
-        content_type="application/zip",
+    @extend_schema(
+        responses={
+            200: {"description": "Job status, pages/companies done, credits spent"}
+        },
+        description="Progress of a background export-all job",
+        tags=["Export"],
+    )
+    def get(self, request, job_id):
+        job = ExportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response(
+                {"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(job_progress(job))
+
+
+class ExportJobResumeAPIView(APIView):
+    """Resume a failed (or stalled) export job from its last finished page."""
+
+    @extend_schema(
+        request=None,
+        responses={200: {"description": "Job re-queued"}},
+        description="Resume a failed or stalled export job after its last saved page",
+        tags=["Export"],
+    )
+    def post(self, request, job_id):
+        job = ExportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response(
+                {"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if not resume_export_job(job):
+            return Response(
+                {
+                    "error": "Job is %s; only failed or stalled jobs can be resumed"
+                    % job.status
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        job.refresh_from_db()
+        return Response(job_progress(job))
+
+
+@require_http_methods(["GET"])
+def export_job_download_view(request, job_id):
+    """
+    Download the ZIP of a background export job, built from its saved pages.
+    An unfinished job downloads what is saved so far, with a note in the Error column.
+    """
+    job = ExportJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return HttpResponse(
+            "Export job not found", status=404, content_type="text/plain"
+        )
+
+    def fill(writer):
+        for bundle in iter_job_bundles(job):
+            writer.append_bundle(bundle)
+        if job.status != ExportJob.STATUS_DONE:
+            writer.append_error(
+                "Partial export (job %s): %s of %s page(s) saved%s"
+                % (
+                    job.status,
+                    job.pages_done,
+                    job.total_pages or "?",
+                    "; " + job.error if job.error else "",
+                )
+            )
+
+    response = StreamingHttpResponse(
+        ExportWriter().iter_zip(fill), content_type="application/zip"
+    )
+    response["Content-Disposition"] = (
+        'attachment; filename="companies_export_job_%s.zip"' % job.pk
     )
-    response["Content-Disposition"] = 'attachment; filename="companies_export_all.zip"'
     return response
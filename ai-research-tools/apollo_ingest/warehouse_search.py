@@ -0,0 +1,245 @@
+"""
+Full-text and faceted search over the company warehouse (no Apollo calls, no credits).
+
+Company.search_text (name, domain, industry, keywords, searchable_location_string)
+is indexed by migration 0006:
+- SQLite: FTS5 table apollo_ingest_company_fts (external content, kept in sync by
+  triggers), ranked with bm25.
+- Postgres (USE_POSTGRES=1): GIN index on to_tsvector('simple', search_text), ranked
+  with ts_rank.
+Every word of the query matches as a prefix ("soft berl" finds "Software ... Berlin").
+Without an index (other backends, SQLite without FTS5) words match as substrings.
+
+Facets count the matching companies by country, industry and employee band. A
+facet's counts ignore its own selection and apply the others (pick several countries,
+the country list stays complete).
+"""
+
+import logging
+import re
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from django.db import DatabaseError, connection
+from django.db.models import BooleanField, Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .company_warehouse import _iexact_any, company_queryset
+from .models import Company
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "apollo_ingest_company_fts"
+FTS_TRIGGERS = (
+    "apollo_ingest_company_fts_ai",
+    "apollo_ingest_company_fts_ad",
+    "apollo_ingest_company_fts_au",
+)
+MAX_QUERY_TERMS = 8
+FACET_LIMIT = 25
+# (value, label, min, max): value is Apollo's "min,max" employee range format.
+EMPLOYEE_BANDS = (
+    ("1,10", "1-10", 1, 10),
+    ("11,50", "11-50", 11, 50),
+    ("51,200", "51-200", 51, 200),
+    ("201,500", "201-500", 201, 500),
+    ("501,1000", "501-1,000", 501, 1000),
+    ("1001,5000", "1,001-5,000", 1001, 5000),
+    ("5001,10000", "5,001-10,000", 5001, 10000),
+    ("10001,1000000", "10,001+", 10001, None),
+)
+_BANDS = {value: (low, high) for value, _label, low, high in EMPLOYEE_BANDS}
+
+_index_lock = threading.Lock()
+_index_ready = None
+
+
+def _fts_index_ready() -> bool:
+    """Whether this database has the migration 0006 full-text index (checked once)."""
+    global _index_ready
+    if _index_ready is not None:
+        return _index_ready
+    with _index_lock:
+        if _index_ready is None:
+            ready = connection.vendor == "postgresql"
+            if connection.vendor == "sqlite":
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                            (FTS_TABLE,) + FTS_TRIGGERS,
+                        )
+                        found = {row[0] for row in cursor.fetchall()}
+                except DatabaseError as e:
+                    logger.warning("Company full-text index check failed: %s", e)
+                    found = set()
+                ready = found == {FTS_TABLE, *FTS_TRIGGERS}
+                if not ready:
+                    logger.warning(
+                        "Company full-text index missing (%s); stored company search "
+                        "uses substring matching.",
+                        ", ".join(sorted({FTS_TABLE, *FTS_TRIGGERS} - found))
+                        or FTS_TABLE,
+                    )
+            _index_ready = ready
+    return _index_ready
+
+
+def query_terms(q: str) -> list:
+    """Lowercased words of a search box query (letters/digits only), at most MAX_QUERY_TERMS."""
+    return re.findall(r"[^\W_]+", (q or "").lower())[:MAX_QUERY_TERMS]
+
+
+def _fts_query(terms: list) -> str:
+    """Every term as a prefix: FTS5 MATCH syntax on SQLite, tsquery on Postgres."""
+    if connection.vendor == "postgresql":
+        return " & ".join(term + ":*" for term in terms)
+    return " ".join('"%s"*' % term for term in terms)
+
+
+def _match_text(qs, terms: list):
+    """qs narrowed to companies whose search_text matches every term."""
+    if not terms:
+        return qs
+    if not _fts_index_ready():
+        for term in terms:
+            qs = qs.filter(search_text__contains=term)
+        return qs
+    table = connection.ops.quote_name(Company._meta.db_table)
+    if connection.vendor == "postgresql":
+        sql = "to_tsvector('simple', %s.search_text) @@ to_tsquery('simple', %%s)"
+        sql %= table
+    else:
+        sql = "%s.id IN (SELECT rowid FROM %s WHERE %s MATCH %%s)"
+        sql %= (table, FTS_TABLE, FTS_TABLE)
+    return qs.filter(RawSQL(sql, (_fts_query(terms),), output_field=BooleanField()))
+
+
+def _ranked_rows(qs, terms: list, offset: int, limit: int) -> list:
+    """
+    Raw Apollo rows [offset:offset + limit] of the matching qs, best match first
+    (ts_rank / bm25), then by name.
+    """
+    if not terms or not _fts_index_ready():
+        return list(qs.values_list("data", flat=True)[offset : offset + limit])
+    if connection.vendor == "postgresql":
+        rank = RawSQL(
+            "ts_rank(to_tsvector('simple', %s.search_text), to_tsquery('simple', %%s))"
+            % connection.ops.quote_name(Company._meta.db_table),
+            (_fts_query(terms),),
+            output_field=FloatField(),
+        )
+        qs = qs.annotate(rank=rank).order_by("-rank", "name")
+        return list(qs.values_list("data", flat=True)[offset : offset + limit])
+    # bm25 as a correlated subquery re-runs the MATCH for every row (quadratic): rank
+    # all matches in one FTS pass instead and page the filtered ids in Python.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid, bm25(%s) FROM %s WHERE %s MATCH %%s"
+            % (FTS_TABLE, FTS_TABLE, FTS_TABLE),
+            (_fts_query(terms),),
+        )
+        ranks = dict(cursor.fetchall())
+    matches = sorted(
+        qs.order_by().values_list("id", "name"),
+        key=lambda row: (ranks.get(row[0], 0.0), row[1]),
+    )
+    ids = [pk for pk, _name in matches[offset : offset + limit]]
+    data = dict(Company.objects.filter(id__in=ids).values_list("id", "data"))
+    return [data[pk] for pk in ids if pk in data]
+
+
+def _band_q(values: list) -> Q:
+    condition = Q()
+    for value in values:
+        low, high = _BANDS[value]
+        band = Q(estimated_num_employees__gte=low)
+        if high is not None:
+            band &= Q(estimated_num_employees__lte=high)
+        condition |= band
+    return condition
+
+
+def _value_counts(qs, field: str) -> list:
+    rows = (
+        qs.exclude(**{field: ""})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("id"))
+        .order_by("-count", field)[:FACET_LIMIT]
+    )
+    return [{"value": row[field], "count": row["count"]} for row in rows]
+
+
+def _band_counts(qs) -> list:
+    counts = qs.order_by().aggregate(
+        **{
+            "band_%d" % i: Count("id", filter=_band_q([value]))
+            for i, (value, _label, _low, _high) in enumerate(EMPLOYEE_BANDS)
+        }
+    )
+    return [
+        {"value": value, "label": label, "count": counts["band_%d" % i]}
+        for i, (value, label, _low, _high) in enumerate(EMPLOYEE_BANDS)
+    ]
+
+
+def search_stored_companies(
+    q: str = "",
+    countries: Optional[list] = None,
+    industries: Optional[list] = None,
+    employee_bands: Optional[list] = None,
+    funding_stages: Optional[list] = None,
+    revenue_min: Optional[float] = None,
+    revenue_max: Optional[float] = None,
+    max_age: Optional[timedelta] = None,
+    page: int = 1,
+    per_page: int = 25,
+    facets: bool = True,
+) -> dict:
+    """
+    One page of warehouse companies matching the query text and filters:
+    {"companies": raw Apollo rows (best match first, else by name), "total_count",
+    "facets": {"country", "industry", "employees"}}.
+
+    countries / industries match the stored names case-insensitively (facet values);
+    employee_bands are EMPLOYEE_BANDS values; revenue is in dollars. max_age defaults
+    to 0 (any age): everything stored is searchable.
+    """
+    employee_bands = [b for b in employee_bands or [] if b in _BANDS]
+    terms = query_terms(q)
+    base = _match_text(
+        company_queryset(
+            funding_stages=funding_stages,
+            revenue_min=revenue_min,
+            revenue_max=revenue_max,
+            max_age=timedelta(0) if max_age is None else max_age,
+        ),
+        terms,
+    )
+    selected = {
+        "country": _iexact_any("country", countries) if countries else Q(),
+        "industry": _iexact_any("industry", industries) if industries else Q(),
+        "employees": _band_q(employee_bands) if employee_bands else Q(),
+    }
+
+    def narrowed(skip=None):
+        qs = base
+        for name, condition in selected.items():
+            if name != skip:
+                qs = qs.filter(condition)
+        return qs
+
+    qs = narrowed()
+    result = {
+        "total_count": qs.count(),
+        "companies": _ranked_rows(qs, terms, (max(1, page) - 1) * per_page, per_page),
+    }
+    if facets:
+        result["facets"] = {
+            "country": _value_counts(narrowed("country"), "country"),
+            "industry": _value_counts(narrowed("industry"), "industry"),
+            "employees": _band_counts(narrowed("employees")),
+        }
+    return result
@@ -0,0 +1,456 @@
+"""
+Per-call instrumentation for outbound API calls (Apollo, OpenAI).
+
+Every traced call produces one record: service, endpoint, method, status, latency,
+retries, request/response bytes, items returned and estimated credits. Records are
+aggregated per endpoint (counters plus a window of recent latencies for
+p50/p95/p99) and grouped under the Django request or export job that caused them.
+
+The group lives in a contextvar, set by InstrumentationMiddleware (per request,
+including while a streaming response is being iterated) or by call_group() (e.g.
+export jobs). Thread pools don't inherit contextvars: submit work with
+context_submit() / start threads with bind_context() to keep calls in their group.
+
+Read it in-process with summary() / recent_groups(), or via GET /debug/calls/.
+Every record is also counted in config.metrics (GET /metrics).
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from config import metrics
+
+# Set APP_INSTRUMENTATION=0 to stop recording (traced calls then cost one contextvar lookup).
+INSTRUMENTATION_ENABLED = os.getenv("APP_INSTRUMENTATION", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+# Latencies kept per endpoint for percentiles.
+INSTRUMENTATION_SAMPLES = max(10, int(os.getenv("INSTRUMENTATION_SAMPLES", "2000")))
+# Finished request/job groups kept for the debug endpoint, and call records kept per group.
+INSTRUMENTATION_GROUPS = max(1, int(os.getenv("INSTRUMENTATION_GROUPS", "50")))
+INSTRUMENTATION_GROUP_CALLS = max(0, int(os.getenv("INSTRUMENTATION_GROUP_CALLS", "200")))
+
+logger = logging.getLogger(__name__)
+
+_current_group = contextvars.ContextVar("instrumentation_group", default=None)
+_current_call = contextvars.ContextVar("instrumentation_call", default=None)
+
+
+class CallRecord:
+    """One outbound call. HTTP fields are filled in by the client's retry loop."""
+
+    __slots__ = (
+        "service",
+        "endpoint",
+        "method",
+        "status",
+        "seconds",
+        "retries",
+        "request_bytes",
+        "response_bytes",
+        "items",
+        "credits",
+        "error",
+        "started",
+    )
+
+    def __init__(self, service: str, endpoint: str, method: str = ""):
+        self.service = service
+        self.endpoint = endpoint
+        self.method = method
+        self.status = None
+        self.seconds = 0.0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.items = 0
+        self.credits = 0
+        self.error = None
+        self.started = time.time()
+
+    def note_response(
+        self, status: int, retries: int, request_bytes: int = 0, response_bytes: int = 0
+    ) -> None:
+        self.status = status
+        self.retries = retries
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+
+    def as_dict(self) -> dict:
+        out = {name: getattr(self, name) for name in self.__slots__}
+        out["ms"] = round(self.seconds * 1000, 1)
+        del out["seconds"]
+        return out
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _EndpointStats:
+    __slots__ = (
+        "calls",
+        "errors",
+        "retries",
+        "credits",
+        "items",
+        "request_bytes",
+        "response_bytes",
+        "latencies",
+    )
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = self.credits = self.items = 0
+        self.request_bytes = self.response_bytes = 0
+        self.latencies = deque(maxlen=INSTRUMENTATION_SAMPLES)
+
+    def add(self, call: CallRecord) -> None:
+        self.calls += 1
+        self.errors += 1 if call.error or (call.status or 0) >= 400 else 0
+        self.retries += call.retries
+        self.credits += call.credits
+        self.items += call.items
+        self.request_bytes += call.request_bytes
+        self.response_bytes += call.response_bytes
+        self.latencies.append(call.seconds)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+        ms = lambda seconds: round(seconds * 1000, 1)  # noqa: E731
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "credits": self.credits,
+            "items": self.items,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "p50_ms": ms(_percentile(ordered, 50)),
+            "p95_ms": ms(_percentile(ordered, 95)),
+            "p99_ms": ms(_percentile(ordered, 99)),
+            "max_ms": ms(ordered[-1] if ordered else 0.0),
+        }
+
+
+class CallGroup:
+    """Calls made on behalf of one request or job."""
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.seconds = None
+        self.endpoints: dict[str, _EndpointStats] = {}
+        self.calls = deque(maxlen=INSTRUMENTATION_GROUP_CALLS)
+        self._lock = threading.Lock()
+
+    def add(self, call: CallRecord) -> None:
+        key = "%s %s" % (call.service, call.endpoint)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = _EndpointStats()
+            stats.add(call)
+            self.calls.append(call)
+
+    def finish(self) -> None:
+        """Close the group; kept for recent_groups() if it made any calls."""
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self._t0
+        if not self.endpoints:
+            return
+        with _lock:
+            _recent_groups.append(self)
+        totals = self.totals()
+        logger.info(
+            "%s %s: %s call(s), %s error(s), %s credit(s) in %.2fs",
+            self.kind,
+            self.name,
+            totals["calls"],
+            totals["errors"],
+            totals["credits"],
+            self.seconds,
+        )
+
+    def totals(self) -> dict:
+        with self._lock:
+            stats = list(self.endpoints.values())
+        return {
+            "calls": sum(s.calls for s in stats),
+            "errors": sum(s.errors for s in stats),
+            "credits": sum(s.credits for s in stats),
+        }
+
+    def as_dict(self, include_calls: bool = False) -> dict:
+        with self._lock:
+            endpoints = {key: s.as_dict() for key, s in self.endpoints.items()}
+            calls = [c.as_dict() for c in self.calls] if include_calls else None
+        out = {
+            "kind": self.kind,
+            "name": self.name,
+            "started": self.started,
+            "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+            **self.totals(),
+            "endpoints": endpoints,
+        }
+        if calls is not None:
+            out["call_log"] = calls
+        return out
+
+
+_lock = threading.Lock()
+_endpoints: dict[str, _EndpointStats] = {}
+_recent_groups = deque(maxlen=INSTRUMENTATION_GROUPS)
+
+
+def _record(call: CallRecord) -> None:
+    key = "%s %s" % (call.service, call.endpoint)
+    with _lock:
+        stats = _endpoints.get(key)
+        if stats is None:
+            stats = _endpoints[key] = _EndpointStats()
+        stats.add(call)
+    metrics.observe_call(call)
+    group = _current_group.get()
+    if group is not None:
+        group.add(call)
+
+
+def current_call() -> Optional[CallRecord]:
+    """Record of the traced call running in this context (None if untraced)."""
+    return _current_call.get()
+
+
+def current_group() -> Optional[CallGroup]:
+    return _current_group.get()
+
+
+@contextmanager
+def trace_call(service: str, endpoint: str, method: str = ""):
+    """
+    Time the block as one call and record it on exit. Only recorded if the block
+    set a status (or raised): a traced function that returns early without calling
+    out leaves no record.
+    """
+    if not INSTRUMENTATION_ENABLED:
+        yield CallRecord(service, endpoint, method)
+        return
+    call = CallRecord(service, endpoint, method)
+    token = _current_call.set(call)
+    t0 = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        call.error = "%s: %s" % (type(e).__name__, e)
+        call.status = call.status or getattr(e, "status_code", None)
+        raise
+    finally:
+        call.seconds = time.perf_counter() - t0
+        _current_call.reset(token)
+        if call.status is not None or call.error is not None:
+            _record(call)
+
+
+def traced(service: str, endpoint: str, method: str = "", items=None, credits=0):
+    """
+    Decorator form of trace_call for sync and async functions. `items` and `credits`
+    are ints or callables of the return value.
+    """
+
+    def finish(call, result):
+        call.items = items(result) if callable(items) else (items or 0)
+        call.credits = credits(result) if callable(credits) else credits
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with trace_call(service, endpoint, method) as call:
+                    result = await fn(*args, **kwargs)
+                    finish(call, result)
+                    return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_call(service, endpoint, method) as call:
+                result = fn(*args, **kwargs)
+                finish(call, result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def call_group(kind: str, name: str):
+    """Group calls made in this context (and in work submitted with context_submit)."""
+    group = CallGroup(kind, name)
+    token = _current_group.set(group)
+    try:
+        yield group
+    finally:
+        _current_group.reset(token)
+        group.finish()
+
+
+def context_submit(executor, fn, *args, **kwargs):
+    """executor.submit() that runs fn in a copy of the caller's context (keeps its group)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def bind_context(fn):
+    """fn bound to a copy of the current context, for threading.Thread(target=...). Run it once."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+def summary() -> dict:
+    """'service endpoint' -> counters and p50/p95/p99/max latency (ms)."""
+    with _lock:
+        items = list(_endpoints.items())
+    return {key: stats.as_dict() for key, stats in sorted(items)}
+
+
+def recent_groups(limit: int = INSTRUMENTATION_GROUPS, include_calls: bool = False) -> list:
+    """Most recent finished groups that made calls, newest first."""
+    with _lock:
+        groups = list(_recent_groups)[-limit:]
+    return [g.as_dict(include_calls=include_calls) for g in reversed(groups)]
+
+
+def reset() -> None:
+    with _lock:
+        _endpoints.clear()
+        _recent_groups.clear()
+
+
+def _iter_in_group(group: CallGroup, content):
+    """Iterate a streaming response with `group` current while each chunk is produced."""
+    content = iter(content)
+    try:
+        while True:
+            token = _current_group.set(group)
+            try:
+                chunk = next(content)
+            except StopIteration:
+                return
+            finally:
+                _current_group.reset(token)
+            yield chunk
+    finally:
+        group.finish()
+
+
+async def _aiter_in_group(group: CallGroup, content):
+    try:
+        while True:
+            token = _current_group.set(group)
+            try:
+                chunk = await content.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current_group.reset(token)
+            yield chunk
+    finally:
+        group.finish()
+
+
+class InstrumentationMiddleware:
+    """Groups the calls of each request; streaming responses stay grouped until fully sent."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _group(request) -> CallGroup:
+        return CallGroup("request", "%s %s" % (request.method, request.path))
+
+    @staticmethod
+    def _attach(group: CallGroup, response):
+        if getattr(response, "streaming", False):
+            if response.is_async:
+                response.streaming_content = _aiter_in_group(
+                    group, response.streaming_content
+                )
+            else:
+                response.streaming_content = _iter_in_group(
+                    group, response.streaming_content
+                )
+        else:
+            group.finish()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+        group = self._group(request)
+        token = _current_group.set(group)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_group.reset(token)
+        return self._attach(group, response)
+
+    async def __acall__(self, request):
+        if not INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+        group = self._group(request)
+        token = _current_group.set(group)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_group.reset(token)
+        return self._attach(group, response)
+
+
+@require_http_methods(["GET"])
+def instrumentation_view(request):
+    """
+    GET /debug/calls/: per-endpoint summary and recent request/job groups.
+    ?groups=N limits the groups (default all kept); ?calls=1 adds each group's call log.
+    """
+    try:
+        limit = max(0, int(request.GET.get("groups", INSTRUMENTATION_GROUPS)))
+    except ValueError:
+        limit = INSTRUMENTATION_GROUPS
+    include_calls = request.GET.get("calls", "").strip().lower() in ("1", "true", "yes")
+    return JsonResponse(
+        {
+            "enabled": INSTRUMENTATION_ENABLED,
+            "endpoints": summary(),
+            "groups": recent_groups(limit, include_calls=include_calls) if limit else [],
+        }
+    )
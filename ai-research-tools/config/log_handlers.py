@@ -0,0 +1,35 @@
+"""
+Console logging off the request thread.
+
+settings.LOGGING routes the app loggers through a stdlib QueueHandler ("console")
+whose QueueListener feeds the real StreamHandler ("console_stream"): the calling
+thread only renders the message (`%`-args) and enqueues the record; the formatter and
+the stream write run on the listener thread. Under parallel exports, workers no longer
+take turns on the stdout lock. APP_LOG_QUEUE=0 writes inline instead (e.g. where
+background threads may be frozen).
+
+dictConfig builds the listener but does not start it: start_log_listeners() does,
+from ApolloIngestConfig.ready(), so every entry point (runserver, ASGI/WSGI,
+management commands, scripts calling django.setup()) gets it.
+"""
+
+import atexit
+import logging
+import threading
+
+LOG_QUEUE_HANDLERS = ("console",)
+
+_started_lock = threading.Lock()
+
+
+def start_log_listeners() -> None:
+    """Start the QueueListener of each LOG_QUEUE_HANDLERS handler (once per process)."""
+    with _started_lock:
+        for name in LOG_QUEUE_HANDLERS:
+            handler = logging.getHandlerByName(name)
+            listener = getattr(handler, "listener", None)
+            if listener is None or listener._thread is not None:
+                continue
+            listener.start()
+            # Flush what is still queued when the process exits.
+            atexit.register(listener.stop)
@@ -0,0 +1,263 @@
+"""
+Prometheus-style metrics (text exposition format), served at GET /metrics.
+
+Counters and histograms live in this process and are updated where things happen:
+outbound calls (via config.instrumentation), export bundles/rows/outcomes,
+export jobs, and credits passed to log_apollo_credits. Values that already have
+their own stats (caches, single-flight) are read at scrape time by collectors
+registered with register_collector().
+
+Works the same under WSGI and ASGI (a plain sync view, lock-protected state).
+Each process keeps its own values: scrape every worker/instance.
+
+Access: a logged-in session, or `Authorization: Bearer $METRICS_TOKEN` when
+METRICS_TOKEN is set (the login middleware lets /metrics through to check it).
+"""
+
+import hmac
+import math
+import os
+import threading
+from typing import Callable
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+
+METRICS_PATH = "/metrics"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+# Seconds; covers fast cache-backed calls up to Apollo's slow large searches.
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+EXPORT_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape(v)) for k, v in labels.items())
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                "%s expects labels %s, got %s" % (self.name, self.labelnames, sorted(labels))
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        out = []
+        for key, state in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                out.append(
+                    (self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+                )
+            out.append((self.name + "_sum", labels, state[-2]))
+            out.append((self.name + "_count", labels, state[-1]))
+        return out
+
+
+_registry: list[_Metric] = []
+_collectors: list[Callable] = []
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    metric = Counter(name, documentation, labelnames)
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def histogram(name, documentation, labelnames=(), buckets=DURATION_BUCKETS) -> Histogram:
+    metric = Histogram(name, documentation, labelnames, buckets)
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable) -> None:
+    """
+    collector() -> [(name, kind, documentation, [(labels, value), ...]), ...], called
+    on every scrape. For values some module already counts (cache stats, pools).
+    """
+    with _registry_lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+OUTBOUND_CALLS = counter(
+    "outbound_calls_total",
+    "Apollo/OpenAI calls by endpoint and final status (error = no response).",
+    ("service", "endpoint", "status"),
+)
+OUTBOUND_CALL_SECONDS = histogram(
+    "outbound_call_duration_seconds",
+    "Apollo/OpenAI call latency including retries and rate-limit waits.",
+    ("service", "endpoint"),
+)
+OUTBOUND_CALL_RETRIES = counter(
+    "outbound_call_retries_total", "Retries after 429/5xx/timeouts.", ("service", "endpoint")
+)
+OUTBOUND_CALL_ITEMS = counter(
+    "outbound_call_items_total",
+    "Items returned (organizations, people, matches, tags; OpenAI: tokens).",
+    ("service", "endpoint"),
+)
+OUTBOUND_CALL_CREDITS = counter(
+    "outbound_call_credits_total", "Estimated credits per call.", ("service", "endpoint")
+)
+APOLLO_CREDITS = counter(
+    "apollo_credits_logged_total",
+    "Estimated Apollo credits reported through log_apollo_credits.",
+    ("source",),
+)
+EXPORTS = counter(
+    "exports_total",
+    "Export ZIP streams by outcome (started, completed, failed, aborted = client went away).",
+    ("outcome",),
+)
+EXPORT_SECONDS = histogram(
+    "export_duration_seconds",
+    "Time to stream a completed export ZIP.",
+    buckets=EXPORT_DURATION_BUCKETS,
+)
+EXPORT_BUNDLES = counter(
+    "export_bundles_total", "Company bundles written to exports.", ("result",)
+)
+EXPORT_ERRORS = counter(
+    "export_errors_total",
+    "Export-level errors written to the ZIP (e.g. a company search page that failed).",
+)
+EXPORT_ROWS = counter("export_rows_total", "Rows written to export sheets.", ("sheet",))
+EXPORT_JOBS = counter("export_jobs_total", "Background export job runs by outcome.", ("outcome",))
+CREDIT_BUDGET_STOPS = counter(
+    "export_credit_budget_stops_total",
+    "Exports stopped early by a credit budget (export = per-export, daily = per-day).",
+    ("budget",),
+)
+
+
+def observe_call(call) -> None:
+    """Count a finished config.instrumentation.CallRecord."""
+    status = str(call.status) if call.status is not None else "error"
+    OUTBOUND_CALLS.inc(service=call.service, endpoint=call.endpoint, status=status)
+    OUTBOUND_CALL_SECONDS.observe(call.seconds, service=call.service, endpoint=call.endpoint)
+    if call.retries:
+        OUTBOUND_CALL_RETRIES.inc(call.retries, service=call.service, endpoint=call.endpoint)
+    if call.items:
+        OUTBOUND_CALL_ITEMS.inc(call.items, service=call.service, endpoint=call.endpoint)
+    if call.credits:
+        OUTBOUND_CALL_CREDITS.inc(call.credits, service=call.service, endpoint=call.endpoint)
+
+
+def render() -> str:
+    """All metrics in Prometheus text format 0.0.4."""
+    with _registry_lock:
+        metrics = list(_registry)
+        collectors = list(_collectors)
+    families = [
+        (m.name, m.kind, m.documentation, m.samples()) for m in metrics
+    ]
+    for collector in collectors:
+        for name, kind, documentation, values in collector():
+            families.append(
+                (name, kind, documentation, [(name, labels, v) for labels, v in values])
+            )
+    lines = []
+    for name, kind, documentation, samples in families:
+        lines.append("# HELP %s %s" % (name, documentation))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for sample_name, labels, value in samples:
+            lines.append("%s%s %s" % (sample_name, _format_labels(labels), _format_value(value)))
+    return "\n".join(lines) + "\n"
+
+
+def _authorized(request) -> bool:
+    if request.session.get("super_admin") is True:
+        return True
+    if not METRICS_TOKEN:
+        return False
+    auth = request.headers.get("Authorization", "")
+    scheme, _, token = auth.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode(), METRICS_TOKEN.encode()
+    )
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
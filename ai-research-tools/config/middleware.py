@@ -7,6 +7,8 @@ from django.conf import settings
 from django.shortcuts import redirect
 from django.utils.deprecation import MiddlewareMixin
 
+from config.metrics import METRICS_PATH
+
 
 class LoginRequiredMiddleware(MiddlewareMixin):
     """
@@ -26,6 +28,9 @@ class LoginRequiredMiddleware(MiddlewareMixin):
             return None
         if path.startswith("/static/") or path == "/favicon.ico":
             return None
+        # Scrapers: metrics_view checks the session or the METRICS_TOKEN bearer token itself.
+        if path == METRICS_PATH:
+            return None
 
         # Require super admin session
         if request.session.get("super_admin") is not True:
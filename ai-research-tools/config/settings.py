@@ -61,6 +61,8 @@ SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Groups outbound Apollo/OpenAI call records per request (GET /debug/calls/).
+    "config.instrumentation.InstrumentationMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -109,10 +111,17 @@ if _use_postgres:
         }
     }
 else:
+    # Exports write the caches from several threads and checkpoint jobs meanwhile:
+    # IMMEDIATE takes the write lock when a transaction starts, and writers wait up to
+    # DB_SQLITE_TIMEOUT seconds for it instead of failing with "database is locked".
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                "transaction_mode": "IMMEDIATE",
+                "timeout": float(os.getenv("DB_SQLITE_TIMEOUT", "30")),
+            },
         }
     }
 
@@ -154,6 +163,49 @@ STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 
+# Caches. Set APOLLO_CACHE_REDIS_URL (e.g. redis://localhost:6379/1) to share Apollo
+# search results between processes via the "apollo" cache (needs the redis package).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+_apollo_cache_redis_url = os.getenv("APOLLO_CACHE_REDIS_URL", "").strip()
+if _apollo_cache_redis_url:
+    CACHES["apollo"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": _apollo_cache_redis_url,
+        "KEY_PREFIX": "apollo",
+    }
+
+# Logging: app loggers to the console at APP_LOG_LEVEL (INFO). By default "console" is a
+# QueueHandler: records are formatted and written on a listener thread (started in
+# ApolloIngestConfig.ready(), config/log_handlers.py); APP_LOG_QUEUE=0 writes inline.
+# Per-call Apollo payload dumps only with APOLLO_LOG_PAYLOADS=1 (apollo_service).
+APP_LOG_LEVEL = os.getenv("APP_LOG_LEVEL", "INFO").upper()
+_log_queue = os.getenv("APP_LOG_QUEUE", "1").strip().lower() not in ("0", "false", "no")
+_console_stream = {"class": "logging.StreamHandler", "formatter": "console"}
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "console": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": (
+        {
+            "console": {
+                "class": "logging.handlers.QueueHandler",
+                "handlers": ["console_stream"],
+            },
+            "console_stream": _console_stream,
+        }
+        if _log_queue
+        else {"console": _console_stream}
+    ),
+    "loggers": {
+        name: {"handlers": ["console"], "level": APP_LOG_LEVEL, "propagate": False}
+        for name in ("apollo_ingest", "config", "openai_thinking")
+    },
+}
+
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
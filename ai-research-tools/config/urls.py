@@ -10,14 +10,28 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from config.instrumentation import instrumentation_view
+from config.metrics import metrics_view
 from config.simple_auth import login_view, logout_view
 from apollo_ingest.views import (
     company_search_view,
     CompanySearchAPIView,
+    StoredCompanySearchAPIView,
     TagsSearchAPIView,
     PeopleSearchAPIView,
     export_companies_view,
+    export_selected_view,
     export_all_matching_view,
+    export_plan_view,
+    export_job_create_view,
+    ExportJobAPIView,
+    ExportJobResumeAPIView,
+    export_job_download_view,
+)
+from apollo_ingest.async_views import (
+    async_company_search_view,
+    async_people_search_view,
+    async_export_companies_view,
 )
 
 urlpatterns = [
@@ -34,10 +48,53 @@ urlpatterns = [
         CompanySearchAPIView.as_view(),
         name="api_company_search",
     ),
+    path(
+        "api/companies/stored/",
+        StoredCompanySearchAPIView.as_view(),
+        name="api_company_stored_search",
+    ),
     path("api/tags/search/", TagsSearchAPIView.as_view(), name="api_tags_search"),
     path("api/people/search/", PeopleSearchAPIView.as_view(), name="api_people_search"),
     path("api/export/companies/", export_companies_view, name="api_export_companies"),
+    path("api/export/selected/", export_selected_view, name="api_export_selected"),
     path("export/all/", export_all_matching_view, name="export_all_matching"),
+    path("export/plan/", export_plan_view, name="export_plan"),
+    path("export/jobs/", export_job_create_view, name="export_job_create"),
+    path(
+        "export/jobs/<uuid:job_id>/download/",
+        export_job_download_view,
+        name="export_job_download",
+    ),
+    path(
+        "api/export/jobs/<uuid:job_id>/",
+        ExportJobAPIView.as_view(),
+        name="api_export_job",
+    ),
+    path(
+        "api/export/jobs/<uuid:job_id>/resume/",
+        ExportJobResumeAPIView.as_view(),
+        name="api_export_job_resume",
+    ),
+    # Async API (same shapes as above; serve via ASGI, config/asgi.py)
+    path(
+        "api/async/companies/search/",
+        async_company_search_view,
+        name="api_async_company_search",
+    ),
+    path(
+        "api/async/people/search/",
+        async_people_search_view,
+        name="api_async_people_search",
+    ),
+    path(
+        "api/async/export/companies/",
+        async_export_companies_view,
+        name="api_async_export_companies",
+    ),
+    # Prometheus scrape target (session or METRICS_TOKEN bearer token)
+    path("metrics", metrics_view, name="metrics"),
+    # Outbound call timings per endpoint and per request/job (login required)
+    path("debug/calls/", instrumentation_view, name="debug_calls"),
     # Swagger / OpenAPI
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -6,6 +6,8 @@ Uses OPEN_AI_API_KEY from environment (.env).
 import os
 from openai import OpenAI
 
+from config.instrumentation import trace_call
+
 
 # GPT-5.2 extended thinking: use "high" or "xhigh" for deeper reasoning
 DEFAULT_REASONING_EFFORT = "high"
@@ -41,7 +43,11 @@ def chat_with_thinking(
         if reasoning_effort and reasoning_effort != "none":
             kwargs["reasoning_effort"] = reasoning_effort
 
-        response = client.chat.completions.create(**kwargs)
+        with trace_call("openai", "chat.completions", "POST") as call:
+            call.request_bytes = len(prompt.encode("utf-8"))
+            response = client.chat.completions.create(**kwargs)
+            call.status = 200
+            call.items = getattr(response.usage, "total_tokens", 0) if response.usage else 0
         choice = response.choices[0] if response.choices else None
         if not choice:
             result["error"] = "Empty response from model"
@@ -124,7 +130,12 @@ def chat_with_web_search(
         if reasoning_effort and reasoning_effort != "none":
             kwargs["reasoning"] = {"effort": reasoning_effort}
 
-        response = client.responses.create(**kwargs)
+        with trace_call("openai", "responses", "POST") as call:
+            call.request_bytes = len(prompt.encode("utf-8"))
+            response = client.responses.create(**kwargs)
+            call.status = 200
+            usage = getattr(response, "usage", None)
+            call.items = getattr(usage, "total_tokens", 0) if usage else 0
         result["reply"], result["citations"] = _parse_responses_output(response)
         if not result["reply"]:
             result["error"] = "Empty response from model"
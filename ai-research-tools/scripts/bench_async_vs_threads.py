@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark: thread-pool Apollo client (apollo_service) vs asyncio client (apollo_async).
+
+Workload per company = what the export does: one people search, then bulk_match for
+the people found (10 per call). Runs against a local fake Apollo server with fixed
+latency, so no credits are spent and numbers are repeatable.
+
+Usage (from ai-research-tools/):
+  python scripts/bench_async_vs_threads.py --companies 500 --latency 0.2
+  python scripts/bench_async_vs_threads.py --companies 500 --threads 8 --concurrency 200
+
+Prints one JSON object per run: wall time, requests/sec, peak threads, peak RSS.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure client concurrency, not the rate limiter.
+for _key in ("API_SEARCH", "BULK_MATCH"):
+    os.environ.setdefault("APOLLO_RATE_LIMIT_%s" % _key, "0")
+os.environ.setdefault("APOLLO_API_KEY", "bench")
+
+from apollo_ingest import apollo_async, apollo_service  # noqa: E402
+
+PEOPLE_PER_COMPANY = 20
+
+
+def _fake_response(path: str, body: dict) -> dict:
+    if "bulk_match" in path:
+        return {"matches": [{"id": d["id"], "email": "x@example.com"} for d in body.get("details", [])]}
+    org = (body.get("organization_ids") or ["org"])[0]
+    return {
+        "people": [{"id": "%s-%s" % (org, i), "first_name": "P"} for i in range(PEOPLE_PER_COMPANY)],
+        "pagination": {"total_entries": PEOPLE_PER_COMPANY, "total_pages": 1},
+    }
+
+
+async def _handle(reader, writer, latency: float) -> None:
+    """Minimal keep-alive HTTP/1.1: JSON POST in, JSON out after `latency` seconds."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            path = lines[0].split(" ")[1]
+            headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            length = int({k.lower(): v for k, v in headers.items()}.get("content-length", 0))
+            raw_body = await reader.readexactly(length) if length else b"{}"
+            await asyncio.sleep(latency)
+            raw = json.dumps(_fake_response(path, json.loads(raw_body or b"{}"))).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(raw), raw)
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _serve(latency: float, ports) -> None:
+    async def main():
+        server = await asyncio.start_server(
+            lambda r, w: _handle(r, w, latency), "127.0.0.1", 0, backlog=2048
+        )
+        ports.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def start_server(latency: float) -> str:
+    """Fake Apollo in a child process, so its threads don't compete for our GIL."""
+    ports = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve, args=(latency, ports), daemon=True).start()
+    return "http://127.0.0.1:%s" % ports.get(timeout=10)
+
+
+def point_clients_at(base: str) -> None:
+    for module in (apollo_service, apollo_async):
+        module.APOLLO_PEOPLE_SEARCH_URL = base + "/api/v1/mixed_people/api_search"
+        module.APOLLO_PEOPLE_BULK_ENRICH_URL = base + "/api/v1/people/bulk_match"
+
+
+class PeakThreads:
+    """Samples threading.active_count() in the background."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def company_sync(org_id: str) -> int:
+    data = apollo_service.search_people({"organization_ids": [org_id], "page": 1, "per_page": 100})
+    ids = [p["id"] for p in data.get("people") or []]
+    return len(apollo_service.enrich_people_bulk(ids))
+
+
+async def company_async(org_id: str) -> int:
+    data = await apollo_async.search_people({"organization_ids": [org_id], "page": 1, "per_page": 100})
+    ids = [p["id"] for p in data.get("people") or []]
+    return len(await apollo_async.enrich_people_bulk(ids))
+
+
+def run_threads(org_ids: list, workers: int) -> int:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(company_sync, org_ids))
+
+
+def run_async(org_ids: list, concurrency: int) -> int:
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(org_id):
+            async with slots:
+                return await company_async(org_id)
+
+        try:
+            return sum(await asyncio.gather(*(one(o) for o in org_ids)))
+        finally:
+            await apollo_async.close_async_client()
+
+    return asyncio.run(main())
+
+
+def measure(label: str, fn, org_ids: list, width: int) -> dict:
+    calls_per_company = 1 + -(-PEOPLE_PER_COMPANY // apollo_service.BULK_MATCH_BATCH_SIZE)
+    with contextlib.redirect_stdout(io.StringIO()), PeakThreads() as threads:
+        start = time.perf_counter()
+        enriched = fn(org_ids, width)
+        wall = time.perf_counter() - start
+    requests_made = len(org_ids) * calls_per_company
+    return {
+        "mode": label,
+        "concurrency": width,
+        "companies": len(org_ids),
+        "requests": requests_made,
+        "enriched": enriched,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(requests_made / wall, 1),
+        "companies_per_second": round(len(org_ids) / wall, 1),
+        "peak_threads": threads.peak,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Apollo latency (s)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EXPORT_MAX_WORKERS", "8")))
+    parser.add_argument("--concurrency", type=int, default=100, help="async in-flight companies")
+    args = parser.parse_args()
+
+    point_clients_at(start_server(args.latency))
+    org_ids = ["org%s" % i for i in range(args.companies)]
+    # Peak RSS is process-wide (never goes down): run async first so thread-pool
+    # numbers are not hidden under it.
+    results = [
+        measure("asyncio", run_async, org_ids, args.concurrency),
+        measure("threads", run_threads, org_ids, args.threads),
+    ]
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+End-to-end export benchmark: export_selected_view ("selected") and
+export_all_matching_view ("all") against scripts/mock_apollo_server.py.
+
+Each run is a fresh child process with its own temporary sqlite DB (cold caches,
+honest peak RSS) and its own mock server sized to the run. Reported per run:
+wall time, companies/sec, time to first byte of the ZIP, peak RSS, credits
+estimated by log_apollo_credits, mock request counts per endpoint, and
+per-endpoint call latencies and retries (config.instrumentation).
+
+Usage (from ai-research-tools/):
+  python scripts/bench_export.py --sizes 10,100,1000 --latency 0.05
+  python scripts/bench_export.py --sizes 10000 --modes all --workers 4,8,16
+  python scripts/bench_export.py --sizes 10,100 --compare bench_results/previous.json
+  python scripts/bench_export.py --sizes 100 --people-totals top-level
+
+Every run is repeated per --people-totals shape of the mock's api_search responses
+(default both: a pagination block, and the real API's top-level total_entries), so the
+row counts show contacts lost to either shape.
+
+Results are written as JSON (default bench_results/export-<commit>-<time>.json);
+--compare prints wall-time ratios against an earlier results file.
+Rate limits are disabled unless --rate-limits is given (measure the export, not the limiter).
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_SERVER = os.path.join(ROOT, "scripts", "mock_apollo_server.py")
+RATE_LIMIT_KEYS = ("mixed_companies", "api_search", "bulk_match", "organizations_enrich", "tags")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _count_rows(zip_bytes: bytes) -> dict:
+    """Data rows per workbook in the exported ZIP (header row excluded)."""
+    from openpyxl import load_workbook
+
+    rows = {}
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
+        for name in archive.namelist():
+            workbook = load_workbook(io.BytesIO(archive.read(name)), read_only=True)
+            # Write-only workbooks have no dimension record, so count instead of max_row.
+            rows[name] = max(0, sum(1 for _ in workbook.active.iter_rows()) - 1)
+            workbook.close()
+    return rows
+
+
+# -- child: one export run ----------------------------------------------------
+
+
+def run_one(mode: str, size: int) -> dict:
+    """Runs inside the child process (env already points at the mock server)."""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    from django.conf import settings
+
+    db_dir = tempfile.mkdtemp(prefix="bench_export_")
+    django.setup()
+    # In place (keeps Django's filled-in defaults), before the first connection opens.
+    settings.DATABASES["default"].update(
+        ENGINE="django.db.backends.sqlite3",
+        NAME=os.path.join(db_dir, "bench.sqlite3"),
+    )
+    from django.core.management import call_command
+    from django.test import RequestFactory
+
+    call_command("migrate", verbosity=0)
+    from apollo_ingest import views
+    from apollo_ingest.records import as_dicts
+    from config import instrumentation
+
+    factory = RequestFactory()
+    if mode == "selected":
+        companies = []
+        page = 1
+        while len(companies) < size:
+            resp = views.search_companies({"page": page, "per_page": 100})
+            batch = views._export_companies(resp.get("organizations") or [])
+            if not batch:
+                break
+            companies.extend(batch)
+            page += 1
+        # What the search page sends: the selection (JSON rows, not ExportCompany
+        # records) plus the 25-contact cap.
+        request = factory.post(
+            "/api/export/selected/",
+            data=json.dumps({"companies": as_dicts(companies[:size]), "per_company": 25}),
+            content_type="application/json",
+        )
+        view = views.export_selected_view
+    else:
+        request = factory.post("/api/export/all/", data={})
+        view = views.export_all_matching_view
+    urllib.request.urlopen(
+        urllib.request.Request(os.environ["BENCH_MOCK_URL"] + "/__reset", data=b"", method="POST")
+    ).read()
+    views.credits_logged(reset=True)
+    instrumentation.reset()
+    rss_before = _peak_rss_mb()
+
+    chunks = []
+    started = time.perf_counter()
+    response = view(request)
+    first_byte = None
+    for chunk in response.streaming_content:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        chunks.append(chunk)
+    wall = time.perf_counter() - started
+    body = b"".join(chunks)
+    credits = views.credits_logged()
+    return {
+        "mode": mode,
+        "companies": size,
+        "status": response.status_code,
+        "wall_seconds": round(wall, 3),
+        "companies_per_second": round(size / wall, 2) if wall else None,
+        "ttfb_seconds": round(first_byte, 3) if first_byte is not None else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_before_export_mb": rss_before,
+        "zip_bytes": len(body),
+        "rows": _count_rows(body) if response.status_code == 200 else {},
+        "credits_estimated": credits["credits"],
+        "credit_log_lines": credits["calls"],
+        "export_max_workers": views.EXPORT_MAX_WORKERS,
+        "people_per_company_max": views.PEOPLE_PER_COMPANY_MAX,
+        "calls": instrumentation.summary(),
+    }
+
+
+# -- parent: matrix of runs ---------------------------------------------------
+
+
+def start_mock(args, size: int, people_totals: str):
+    cmd = [
+        sys.executable,
+        MOCK_SERVER,
+        "--port", "0",
+        "--companies", str(size),
+        "--people-per-company", str(args.people_per_company),
+        "--people-totals", people_totals,
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--rate-429", str(args.rate_429),
+        "--retry-after", "0.1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError("mock server did not start: %r" % line)
+    return proc, line[len("listening on "):]
+
+
+def run_child(args, mode: str, size: int, workers: int, people_totals: str) -> dict:
+    run = {"mode": mode, "companies": size, "export_max_workers": workers, "people_totals": people_totals}
+    proc, base = start_mock(args, size, people_totals)
+    env = dict(os.environ)
+    env.update(
+        {
+            "APOLLO_API_BASE_URL": base + "/api/v1",
+            "APOLLO_TAGS_BASE_URL": base + "/api/v1",
+            "APOLLO_API_KEY": "bench",
+            "BENCH_MOCK_URL": base,
+            "EXPORT_MAX_WORKERS": str(workers),
+            "APOLLO_BACKOFF_BASE_SECONDS": "0.1",
+            "APP_LOG_LEVEL": args.log_level,
+        }
+    )
+    if args.per_company_max:
+        env["APOLLO_PEOPLE_PER_COMPANY_MAX"] = str(args.per_company_max)
+    if not args.rate_limits:
+        for key in RATE_LIMIT_KEYS:
+            env["APOLLO_RATE_LIMIT_%s" % key.upper()] = "0"
+    try:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-one", mode, str(size)],
+            env=env,
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=args.timeout,
+        )
+        if out.returncode != 0:
+            return dict(run, error=out.stderr.strip().splitlines()[-1:] or ["exit %s" % out.returncode])
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result["people_totals"] = people_totals
+        with urllib.request.urlopen(base + "/__stats") as r:
+            result["mock_requests"] = {
+                name: counts["requests"] for name, counts in json.load(r).items() if counts["requests"]
+            }
+        return result
+    except subprocess.TimeoutExpired:
+        return dict(run, error="timeout")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    key = lambda r: (r["mode"], r["companies"], r.get("export_max_workers"), r.get("people_totals", "pagination"))  # noqa: E731
+    before = {key(r): r for r in previous.get("runs", []) if "wall_seconds" in r}
+    print("\nvs %s (%s):" % (previous_path, previous.get("commit")))
+    for run in results:
+        old = before.get(key(run))
+        if not old or "wall_seconds" not in run:
+            continue
+        print(
+            "  %-8s %6s companies  workers=%-3s %-10s wall %7.2fs -> %7.2fs (x%.2f)  rss %s -> %s MB"
+            % (run["mode"], run["companies"], run["export_max_workers"], run["people_totals"], old["wall_seconds"],
+               run["wall_seconds"], run["wall_seconds"] / old["wall_seconds"],
+               old["peak_rss_mb"], run["peak_rss_mb"])
+        )
+
+
+def _int_list(text: str) -> list:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run-one":
+        print(json.dumps(run_one(sys.argv[2], int(sys.argv[3]))))
+        return
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=_int_list, default=[10, 100, 1000, 10000])
+    parser.add_argument("--modes", default="selected,all", help="selected,all")
+    parser.add_argument("--workers", type=_int_list, default=[8], help="EXPORT_MAX_WORKERS values")
+    parser.add_argument("--people-per-company", type=int, default=25)
+    parser.add_argument(
+        "--people-totals", default="pagination,top-level", help="mock api_search shapes: pagination,top-level"
+    )
+    parser.add_argument("--per-company-max", type=int, default=0, help="APOLLO_PEOPLE_PER_COMPANY_MAX")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-limits", action="store_true", help="keep APOLLO_RATE_LIMIT_* defaults")
+    parser.add_argument("--log-level", default="WARNING", help="APP_LOG_LEVEL for the export process")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds per run")
+    parser.add_argument("--out", help="results JSON path")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results file")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    runs = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        for workers in args.workers:
+            for size in args.sizes:
+                for totals in [t.strip() for t in args.people_totals.split(",") if t.strip()]:
+                    result = run_child(args, mode, size, workers, totals)
+                    runs.append(result)
+                    if "error" in result:
+                        print("%-8s %6s companies  workers=%-3s %-10s ERROR %s"
+                              % (mode, size, workers, totals, result["error"]))
+                        continue
+                    print(
+                        "%-8s %6s companies  workers=%-3s %-10s %8.2fs  %8.1f co/s  ttfb %6.2fs  rss %7.1f MB"
+                        "  credits %s  rows %s"
+                        % (mode, size, workers, totals, result["wall_seconds"], result["companies_per_second"],
+                           result["ttfb_seconds"] or 0, result["peak_rss_mb"], result["credits_estimated"],
+                           sum(result["rows"].values())),
+                        flush=True,
+                    )
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "mock": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "people_per_company": args.people_per_company,
+            "error_rate": args.error_rate,
+            "rate_429": args.rate_429,
+        },
+        "rate_limits": args.rate_limits,
+        "runs": runs,
+    }
+    out = args.out or os.path.join(
+        ROOT, "bench_results", "export-%s-%s.json" % (commit, time.strftime("%Y%m%d-%H%M%S"))
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("results: %s" % out)
+    if args.compare:
+        compare(runs, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-row dicts (the old normalize_companies / normalize_people)
+vs the __slots__ records of apollo_ingest.records.
+
+For --pages pages of 100 companies and 100 people (synthetic rows from
+scripts/mock_apollo_server.py), measures:
+  - normalize: CPU time to turn the raw Apollo rows into rows
+  - export: raw company page -> rows the export workers take (the old path built
+    the UI dict and then copied five of its keys into a new dict)
+  - writer: ExportWriter.append_bundle for one bundle per company
+  - memory: bytes held by the normalized rows (tracemalloc), per 100 rows
+
+Usage (from ai-research-tools/):
+  python scripts/bench_records.py
+  python scripts/bench_records.py --pages 50 --repeat 7
+
+Prints one JSON object per measurement (best of --repeat runs).
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from apollo_ingest.records import (  # noqa: E402
+    ExportCompany,
+    company_records,
+    person_records,
+)
+from mock_apollo_server import Synthetic  # noqa: E402
+
+PAGE_SIZE = 100
+
+
+def legacy_normalize_companies(accounts: list) -> list:
+    """normalize_companies before apollo_ingest.records (one 16-key dict per row)."""
+    companies = []
+    for acc in accounts:
+        loc_parts = [
+            acc.get("organization_raw_address"),
+            acc.get("raw_address"),
+            acc.get("organization_city"),
+            acc.get("organization_state"),
+            acc.get("organization_country"),
+            acc.get("city"),
+            acc.get("state"),
+            acc.get("country"),
+        ]
+        searchable_location_string = " ".join(
+            str(p).strip() for p in loc_parts if p
+        ).lower()
+        companies.append(
+            {
+                "id": acc.get("id"),
+                "name": acc.get("name"),
+                "primary_domain": acc.get("primary_domain"),
+                "logo_url": acc.get("logo_url"),
+                "industry": acc.get("industry"),
+                "estimated_num_employees": acc.get("estimated_num_employees"),
+                "city": acc.get("organization_city") or acc.get("city"),
+                "state": acc.get("organization_state") or acc.get("state"),
+                "country": acc.get("organization_country") or acc.get("country"),
+                "searchable_location_string": searchable_location_string,
+                "linkedin_url": acc.get("linkedin_url"),
+                "founded_year": acc.get("founded_year"),
+                "annual_revenue": acc.get("organization_revenue"),
+                "annual_revenue_printed": acc.get("organization_revenue_printed"),
+                "phone": acc.get("phone"),
+                "website_url": acc.get("website_url"),
+            }
+        )
+    return companies
+
+
+def legacy_normalize_people(people: list) -> list:
+    """normalize_people before apollo_ingest.records (one dict per row)."""
+    contacts = []
+    for person in people:
+        phone_numbers = []
+        if person.get("phone_numbers"):
+            phone_numbers = [
+                p.get("sanitized_number") or p.get("raw_number")
+                for p in person.get("phone_numbers", [])
+                if p
+            ]
+        contacts.append(
+            {
+                "id": person.get("id"),
+                "first_name": person.get("first_name"),
+                "last_name": person.get("last_name"),
+                "name": person.get("name")
+                or f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
+                "email": person.get("email"),
+                "title": person.get("title"),
+                "seniority": person.get("seniority"),
+                "city": person.get("city"),
+                "state": person.get("state"),
+                "country": person.get("country"),
+                "linkedin_url": person.get("linkedin_url"),
+                "phone_numbers": phone_numbers,
+                "organization_name": (
+                    person.get("organization", {}).get("name")
+                    if person.get("organization")
+                    else None
+                ),
+            }
+        )
+    return contacts
+
+
+def legacy_export_companies(raw_list: list) -> list:
+    return [
+        {
+            "id": c.get("id"),
+            "name": c.get("name"),
+            "domain": c.get("primary_domain"),
+            "country": c.get("country"),
+            "city": c.get("city"),
+        }
+        for c in legacy_normalize_companies(raw_list)
+    ]
+
+
+def records_export_companies(raw_list: list) -> list:
+    return [ExportCompany.from_company(c) for c in company_records(raw_list)]
+
+
+def best_time(fn, pages: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        for page in pages:
+            fn(page)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def held_bytes(fn, pages: list) -> int:
+    """Bytes still allocated after fn() ran over all pages, with the results kept."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [fn(page) for page in pages]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def writer_time(
+    normalize, company_pages: list, people_pages: list, repeat: int
+) -> float:
+    from apollo_ingest.export_writer import ExportWriter
+
+    best = None
+    for _ in range(repeat):
+        bundles = []
+        for companies, people in zip(company_pages, people_pages):
+            rows = normalize(people)
+            for i, company in enumerate(companies):
+                bundles.append(
+                    {
+                        "cname": company["name"],
+                        "company_country": company.get("country") or "",
+                        "technologies": "",
+                        "people": rows[i % 10 * 10 : i % 10 * 10 + 10],
+                        "error": "",
+                    }
+                )
+        writer = ExportWriter()
+        gc.collect()
+        started = time.perf_counter()
+        for bundle in bundles:
+            writer.append_bundle(bundle)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        # Finish the workbooks so their temp files are closed and removed.
+        for _chunk in writer.iter_zip():
+            pass
+    return best
+
+
+def compare(name: str, rows: int, legacy: float, records: float, unit: str) -> dict:
+    return {
+        "measure": name,
+        "rows": rows,
+        "legacy_" + unit: round(legacy, 4),
+        "records_" + unit: round(records, 4),
+        "ratio": round(records / legacy, 3) if legacy else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=20, help="pages of 100 rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--no-writer", action="store_true", help="skip the ExportWriter measurement"
+    )
+    args = parser.parse_args()
+
+    data = Synthetic(args.pages * PAGE_SIZE, PAGE_SIZE, 1.0)
+    company_pages = [
+        data.search_companies({"page": page, "per_page": PAGE_SIZE})["organizations"]
+        for page in range(1, args.pages + 1)
+    ]
+    people_pages = [
+        [data.person(page, k) for k in range(PAGE_SIZE)] for page in range(args.pages)
+    ]
+    rows = args.pages * PAGE_SIZE
+
+    results = [
+        compare(
+            "normalize companies",
+            rows,
+            best_time(legacy_normalize_companies, company_pages, args.repeat),
+            best_time(company_records, company_pages, args.repeat),
+            "seconds",
+        ),
+        compare(
+            "normalize people",
+            rows,
+            best_time(legacy_normalize_people, people_pages, args.repeat),
+            best_time(person_records, people_pages, args.repeat),
+            "seconds",
+        ),
+        compare(
+            "export companies",
+            rows,
+            best_time(legacy_export_companies, company_pages, args.repeat),
+            best_time(records_export_companies, company_pages, args.repeat),
+            "seconds",
+        ),
+        compare(
+            "memory companies (bytes/100 rows)",
+            rows,
+            held_bytes(legacy_normalize_companies, company_pages) / args.pages,
+            held_bytes(company_records, company_pages) / args.pages,
+            "bytes",
+        ),
+        compare(
+            "memory people (bytes/100 rows)",
+            rows,
+            held_bytes(legacy_normalize_people, people_pages) / args.pages,
+            held_bytes(person_records, people_pages) / args.pages,
+            "bytes",
+        ),
+        compare(
+            "memory export companies (bytes/100 rows)",
+            rows,
+            held_bytes(legacy_export_companies, company_pages) / args.pages,
+            held_bytes(records_export_companies, company_pages) / args.pages,
+            "bytes",
+        ),
+    ]
+    if not args.no_writer:
+        results.append(
+            compare(
+                "writer append_bundle",
+                rows,
+                writer_time(
+                    legacy_normalize_people, company_pages, people_pages, args.repeat
+                ),
+                writer_time(person_records, company_pages, people_pages, args.repeat),
+                "seconds",
+            )
+        )
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Reports Apollo credit usage (usage_stats) before/after each phase.
 Usage:
   export APOLLO_API_KEY=your_key
   export API_BASE_URL=http://127.0.0.1:8000   # optional; your Django app
+  export APOLLO_API_BASE_URL=http://127.0.0.1:8765/api/v1   # optional; mock Apollo
   python scripts/check_apollo_credits.py
 
 Requires: requests (pip install requests)
@@ -21,7 +22,10 @@ except ImportError:
     print("Install: pip install requests")
     sys.exit(1)
 
-APOLLO_BASE = "https://api.apollo.io/api/v1"
+# Set to the mock server (scripts/mock_apollo_server.py) to run without spending credits.
+APOLLO_BASE = os.environ.get(
+    "APOLLO_API_BASE_URL", "https://api.apollo.io/api/v1"
+).rstrip("/")
 APOLLO_KEY = os.environ.get("APOLLO_API_KEY")
 API_BASE = os.environ.get("API_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
 
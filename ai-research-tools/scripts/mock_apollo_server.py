@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Apollo API: benchmark and debug without a key or credits.
+
+Serves the endpoints the app uses (mixed_companies/search, mixed_people/api_search,
+people/bulk_match, organizations/enrich, organizations/{id}, tags/search) with
+deterministic synthetic data, or with fixtures recorded from the real API.
+Latency, 5xx errors and 429s (random or from a requests/minute budget) can be injected.
+
+Usage (from ai-research-tools/):
+  python scripts/mock_apollo_server.py --port 8765 --latency 0.2 --jitter 0.1
+  export APOLLO_API_BASE_URL=http://127.0.0.1:8765/api/v1 APOLLO_API_KEY=mock
+  python manage.py runserver
+
+  # Record real responses once (spends credits), then replay them offline:
+  python scripts/mock_apollo_server.py --record fixtures/apollo
+  python scripts/mock_apollo_server.py --replay fixtures/apollo
+
+Faults:
+  --error-rate 0.02        random 500/502/503 on 2% of requests
+  --rate-429 0.01          random 429 (Retry-After: --retry-after) on 1% of requests
+  --rpm 100                429 once an endpoint exceeds 100 requests/minute
+  --latency-for bulk_match=0.5   per-endpoint latency (repeatable)
+
+Response shapes:
+  --people-totals top-level   api_search as the real API sends it: total_entries at
+                              the top level, no pagination block (default: pagination)
+
+GET /__stats returns per-endpoint counters; POST /__reset clears them.
+The first stdout line is "listening on http://HOST:PORT" (use --port 0 for any free port).
+
+Stdlib only (no Django, no requests).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import parse_qsl, urlsplit
+
+ENDPOINTS = (
+    "mixed_companies",
+    "api_search",
+    "bulk_match",
+    "organizations_enrich",
+    "organizations_get",
+    "tags",
+)
+COUNTRIES = ["United States", "United Kingdom", "Germany", "Pakistan", "India", "Canada"]
+INDUSTRIES = ["computer software", "banking", "biotechnology", "retail", "logistics"]
+TITLES = ["CEO", "CTO", "VP Engineering", "Head of Sales", "Software Engineer"]
+SENIORITIES = ["c_suite", "c_suite", "vp", "head", "senior"]
+FUNDING_STAGES = ["seed", "series_a", "series_b", "series_c", "ipo"]
+KEYWORDS = ["saas", "b2b", "fintech", "ai", "ecommerce", "healthcare", "logistics"]
+TECHNOLOGIES = [
+    ("Python", "Languages"),
+    ("React", "Frameworks"),
+    ("AWS", "Cloud"),
+    ("Salesforce", "CRM"),
+    ("Stripe", "Payments"),
+    ("HubSpot", "Marketing"),
+    ("Postgres", "Databases"),
+    ("Kubernetes", "Infrastructure"),
+]
+
+
+def endpoint_for(path: str):
+    """Map a request path to an endpoint name (None if unknown)."""
+    if path.endswith("/mixed_companies/search"):
+        return "mixed_companies"
+    if path.endswith("/mixed_people/api_search") or path.endswith("/mixed_people/search"):
+        return "api_search"
+    if path.endswith("/people/bulk_match"):
+        return "bulk_match"
+    if path.endswith("/organizations/enrich"):
+        return "organizations_enrich"
+    if "/organizations/" in path:
+        return "organizations_get"
+    if path.endswith("/tags/search"):
+        return "tags"
+    return None
+
+
+def fixture_key(method: str, path: str, query: dict, body: dict) -> str:
+    """Same request -> same fixture: path suffix, sorted query, body with sorted keys."""
+    suffix = path.split("/api/v1", 1)[-1]
+    raw = json.dumps(
+        [method, suffix, sorted(query.items()), body], sort_keys=True, default=str
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Synthetic:
+    """Deterministic fake Apollo data: company i has people_per_company contacts."""
+
+    def __init__(
+        self,
+        companies: int,
+        people_per_company: int,
+        title_match: float,
+        people_totals: str = "pagination",
+    ):
+        self.companies = companies
+        self.people_per_company = people_per_company
+        self.title_match = title_match
+        self.people_totals = people_totals
+
+    @staticmethod
+    def org_id(i: int) -> str:
+        return "%024x" % (0x5A0000000000 + i)
+
+    @staticmethod
+    def org_index(org_id: str):
+        try:
+            return int(org_id, 16) - 0x5A0000000000
+        except (TypeError, ValueError):
+            return None
+
+    def organization(self, i: int) -> dict:
+        techs = [TECHNOLOGIES[(i + k) % len(TECHNOLOGIES)] for k in range(3 + i % 4)]
+        return {
+            "id": self.org_id(i),
+            "name": "Company %s" % i,
+            "primary_domain": "company%s.example.com" % i,
+            "website_url": "http://company%s.example.com" % i,
+            "linkedin_url": "http://www.linkedin.com/company/company%s" % i,
+            "industry": INDUSTRIES[i % len(INDUSTRIES)],
+            "estimated_num_employees": 10 + (i * 37) % 5000,
+            "founded_year": 1990 + i % 34,
+            "city": "City %s" % (i % 50),
+            "country": COUNTRIES[i % len(COUNTRIES)],
+            "organization_revenue": float((i * 7919) % 100_000_000),
+            "latest_funding_stage": FUNDING_STAGES[i % len(FUNDING_STAGES)],
+            "keywords": [KEYWORDS[(i + k) % len(KEYWORDS)] for k in range(1 + i % 3)],
+            "current_technologies": [
+                {"name": name, "category": category} for name, category in techs
+            ],
+            "technology_names": [name for name, _ in techs],
+        }
+
+    def search_companies(self, body: dict) -> dict:
+        page = max(1, int(body.get("page") or 1))
+        per_page = max(1, min(100, int(body.get("per_page") or 25)))
+        start = (page - 1) * per_page
+        organizations = [
+            self.organization(i)
+            for i in range(start, min(start + per_page, self.companies))
+        ]
+        return {
+            "organizations": organizations,
+            "accounts": [],
+            "pagination": {
+                "page": page,
+                "per_page": per_page,
+                "total_entries": self.companies,
+                "total_pages": -(-self.companies // per_page),
+            },
+        }
+
+    def _people_count(self, org: int, filtered: bool) -> int:
+        if not filtered:
+            return self.people_per_company
+        # Some companies have nobody matching the filters (exercises the fallback).
+        if org % 5 == 4:
+            return 0
+        return max(1, int(self.people_per_company * self.title_match))
+
+    def person(self, org: int, k: int) -> dict:
+        return {
+            "id": "%012x%012x" % (org + 1, k + 1),
+            "first_name": "Person%s" % k,
+            "last_name": "Org%s" % org,
+            "title": TITLES[k % len(TITLES)],
+            "seniority": SENIORITIES[k % len(SENIORITIES)],
+            "organization_id": self.org_id(org),
+            "organization": {"id": self.org_id(org), "name": "Company %s" % org},
+        }
+
+    def search_people(self, body: dict) -> dict:
+        page = max(1, int(body.get("page") or 1))
+        per_page = max(1, min(100, int(body.get("per_page") or 25)))
+        orgs = [self.org_index(o) for o in body.get("organization_ids") or []]
+        for domain in body.get("q_organization_domains_list") or []:
+            digits = "".join(ch for ch in domain.split(".")[0] if ch.isdigit())
+            orgs.append(int(digits) if digits else None)
+        # Callers often send both the id and the domain of the same company.
+        orgs = list(dict.fromkeys(o for o in orgs if o is not None and 0 <= o < self.companies))
+        filtered = bool(body.get("person_titles") or body.get("person_seniorities"))
+        counts = [(org, self._people_count(org, filtered)) for org in orgs]
+        total = sum(count for _, count in counts)
+        start, end = (page - 1) * per_page, page * per_page
+        people, offset = [], 0
+        for org, count in counts:
+            if offset + count > start and offset < end:
+                for k in range(max(0, start - offset), min(count, end - offset)):
+                    people.append(self.person(org, k))
+            offset += count
+        if self.people_totals == "top-level":
+            return {"people": people, "total_entries": total}
+        return {
+            "people": people,
+            "pagination": {
+                "page": page,
+                "per_page": per_page,
+                "total_entries": total,
+                "total_pages": -(-total // per_page) if total else 0,
+            },
+        }
+
+    def bulk_match(self, body: dict) -> dict:
+        matches = []
+        for detail in body.get("details") or []:
+            pid = str(detail.get("id") or "")
+            org = int(pid[:12], 16) - 1 if len(pid) == 24 else 0
+            k = int(pid[12:], 16) - 1 if len(pid) == 24 else 0
+            match = self.person(org, k)
+            match.update(
+                {
+                    "email": "person%s@company%s.example.com" % (k, org),
+                    "linkedin_url": "http://www.linkedin.com/in/person-%s-%s" % (org, k),
+                    "city": "City %s" % (org % 50),
+                    "state": None,
+                    "country": COUNTRIES[org % len(COUNTRIES)],
+                }
+            )
+            matches.append(match)
+        return {"matches": matches, "credits_consumed": len(matches)}
+
+    def enrich_organization(self, query: dict) -> dict:
+        domain = query.get("domain") or ""
+        digits = "".join(ch for ch in domain.split(".")[0] if ch.isdigit())
+        if not digits:
+            return {"organization": {}}
+        return {"organization": self.organization(int(digits))}
+
+    def get_organization(self, path: str) -> dict:
+        index = self.org_index(path.rstrip("/").rsplit("/", 1)[-1])
+        if index is None or not 0 <= index < self.companies:
+            return {"organization": {}}
+        return {"organization": self.organization(index)}
+
+    def search_tags(self, query: dict) -> dict:
+        q = (query.get("q_tag_fuzzy_name") or "").strip().lower()
+        names = [n for n in INDUSTRIES if q in n] or ([q, q + " services"] if q else [])
+        return {
+            "tags": [
+                {
+                    "id": hashlib.md5(name.encode()).hexdigest()[:24],
+                    "cleaned_name": name,
+                    "tag_name_unanalyzed_downcase": name,
+                    "kind": "linkedin_industry",
+                }
+                for name in names
+            ]
+        }
+
+
+class MockApollo:
+    def __init__(self, args):
+        self.args = args
+        self.synthetic = Synthetic(
+            args.companies, args.people_per_company, args.title_match, args.people_totals
+        )
+        self.latency_for = {}
+        for item in args.latency_for or []:
+            name, _, seconds = item.partition("=")
+            self.latency_for[name.strip()] = float(seconds)
+        self.random = random.Random(args.seed)
+        self.reset()
+
+    def reset(self):
+        self.stats = {
+            name: {"requests": 0, "errors": 0, "429": 0, "replayed": 0, "recorded": 0}
+            for name in ENDPOINTS
+        }
+        self.buckets = {}
+
+    # -- faults ------------------------------------------------------------
+
+    def _over_rpm(self, endpoint: str) -> bool:
+        if not self.args.rpm:
+            return False
+        rate = self.args.rpm / 60.0
+        tokens, updated = self.buckets.get(endpoint, (float(self.args.rpm) / 6, time.monotonic()))
+        now = time.monotonic()
+        tokens = min(self.args.rpm / 6.0, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[endpoint] = (tokens, now)
+            return True
+        self.buckets[endpoint] = (tokens - 1, now)
+        return False
+
+    def fault(self, endpoint: str):
+        """(status, headers, body) to inject instead of a real answer, or None."""
+        if self._over_rpm(endpoint) or self.random.random() < self.args.rate_429:
+            self.stats[endpoint]["429"] += 1
+            return (
+                429,
+                {"Retry-After": str(self.args.retry_after)},
+                {"error": "rate limit exceeded (mock)"},
+            )
+        if self.random.random() < self.args.error_rate:
+            self.stats[endpoint]["errors"] += 1
+            return (self.random.choice([500, 502, 503]), {}, {"error": "injected (mock)"})
+        return None
+
+    def latency(self, endpoint: str) -> float:
+        base = self.latency_for.get(endpoint, self.args.latency)
+        return base + (self.random.uniform(0, self.args.jitter) if self.args.jitter else 0)
+
+    # -- answers -----------------------------------------------------------
+
+    def synthetic_answer(self, endpoint, path, query, body) -> dict:
+        if endpoint == "mixed_companies":
+            return self.synthetic.search_companies(body)
+        if endpoint == "api_search":
+            return self.synthetic.search_people(body)
+        if endpoint == "bulk_match":
+            return self.synthetic.bulk_match(body)
+        if endpoint == "organizations_enrich":
+            return self.synthetic.enrich_organization(query)
+        if endpoint == "organizations_get":
+            return self.synthetic.get_organization(path)
+        return self.synthetic.search_tags(query)
+
+    def _fixture_path(self, directory, endpoint, key) -> str:
+        return os.path.join(directory, endpoint, key + ".json")
+
+    def replay(self, endpoint, key):
+        if not self.args.replay:
+            return None
+        try:
+            with open(self._fixture_path(self.args.replay, endpoint, key)) as f:
+                fixture = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.stats[endpoint]["replayed"] += 1
+        return fixture["status"], fixture["body"]
+
+    def record(self, endpoint, key, method, path, query, body, headers):
+        """Forward to the real API and save the answer as a fixture."""
+        base = self.args.tags_upstream if endpoint == "tags" else self.args.upstream
+        url = base.rstrip("/") + path.split("/api/v1", 1)[-1]
+        if query:
+            url += "?" + "&".join("%s=%s" % item for item in sorted(query.items()))
+        data = json.dumps(body).encode() if method == "POST" else None
+        request = urllib.request.Request(url, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        request.add_header("X-Api-Key", headers.get("x-api-key", ""))
+        try:
+            with urllib.request.urlopen(request, timeout=120) as r:
+                status, payload = r.status, json.loads(r.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, {"error": e.read().decode("utf-8", "replace")}
+        if status == 200:
+            out = self._fixture_path(self.args.record, endpoint, key)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "w") as f:
+                json.dump({"request": {"method": method, "path": path, "query": query, "body": body}, "status": status, "body": payload}, f)
+            self.stats[endpoint]["recorded"] += 1
+        return status, payload
+
+    async def answer(self, method, target, headers, body):
+        split = urlsplit(target)
+        path, query = split.path, dict(parse_qsl(split.query))
+        if path == "/__stats":
+            return 200, {}, self.stats
+        if path == "/__reset" and method == "POST":
+            self.reset()
+            return 200, {}, {"ok": True}
+        endpoint = endpoint_for(path)
+        if endpoint is None:
+            return 404, {}, {"error": "unknown endpoint (mock): %s" % path}
+        self.stats[endpoint]["requests"] += 1
+        if self.args.require_key and not headers.get("x-api-key"):
+            return 401, {}, {"error": "missing X-Api-Key (mock)"}
+        await asyncio.sleep(self.latency(endpoint))
+        injected = self.fault(endpoint)
+        if injected is not None:
+            return injected
+        key = fixture_key(method, path, query, body)
+        if self.args.record:
+            status, payload = await asyncio.to_thread(
+                self.record, endpoint, key, method, path, query, body, headers
+            )
+            return status, {}, payload
+        replayed = self.replay(endpoint, key)
+        if replayed is not None:
+            return replayed[0], {}, replayed[1]
+        if self.args.replay and self.args.strict:
+            return 404, {}, {"error": "no fixture for this request (mock --strict)"}
+        return 200, {}, self.synthetic_answer(endpoint, path, query, body)
+
+    async def handle(self, reader, writer):
+        """Keep-alive HTTP/1.1 loop for one connection."""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                status, extra_headers, payload = await self.answer(
+                    method.upper(), target, headers, body
+                )
+                data = json.dumps(payload).encode()
+                response = [
+                    "HTTP/1.1 %s %s" % (status, "OK" if status == 200 else "Error"),
+                    "Content-Type: application/json",
+                    "Content-Length: %s" % len(data),
+                ] + ["%s: %s" % item for item in extra_headers.items()]
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Apollo API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--companies", type=int, default=1000, help="total companies matching any search")
+    parser.add_argument("--people-per-company", type=int, default=25)
+    parser.add_argument("--title-match", type=float, default=0.4, help="share of people matching title/seniority filters")
+    parser.add_argument("--people-totals", choices=("pagination", "top-level"), default="pagination", help="where api_search reports total_entries")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, 0..N seconds")
+    parser.add_argument("--latency-for", action="append", metavar="ENDPOINT=SECONDS", help="per-endpoint latency (%s)" % ", ".join(ENDPOINTS))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=int, default=0, help="per-endpoint requests/minute before 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--require-key", action="store_true", help="401 without X-Api-Key")
+    parser.add_argument("--record", metavar="DIR", help="proxy to the real API and save fixtures")
+    parser.add_argument("--replay", metavar="DIR", help="serve saved fixtures (synthetic data when missing)")
+    parser.add_argument("--strict", action="store_true", help="with --replay: 404 when no fixture")
+    parser.add_argument("--upstream", default="https://api.apollo.io/api/v1")
+    parser.add_argument("--tags-upstream", default="https://app.apollo.io/api/v1")
+    return parser.parse_args(argv)
+
+
+async def serve(args) -> None:
+    mock = MockApollo(args)
+    server = await asyncio.start_server(mock.handle, args.host, args.port, backlog=2048)
+    host, port = server.sockets[0].getsockname()[:2]
+    print("listening on http://%s:%s" % (host, port), flush=True)
+    print("  export APOLLO_API_BASE_URL=http://%s:%s/api/v1" % (host, port), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()